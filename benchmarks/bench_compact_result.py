@@ -0,0 +1,46 @@
+"""Compare the memory held by ExpansionResult and CompactExpansionResult.
+
+Usage: python benchmarks/bench_compact_result.py [node_count ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from story_gen import generate_story_toml  # noqa: E402
+import tomllib  # noqa: E402
+
+from lunii_cyoa.compact import expand_story_compact  # noqa: E402
+from lunii_cyoa.expansion import expand_story  # noqa: E402
+from lunii_cyoa.models import StoryDocument  # noqa: E402
+
+
+def _measure(build: Callable[[], object]) -> Tuple[object, int, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+
+def main(node_counts: list[int]) -> None:
+    print(f"{'nodes':>6} {'physical':>9} {'dataclass MiB':>14} {'compact MiB':>12} {'ratio':>6} {'dataclass s':>12} {'compact s':>10}")
+    for node_count in node_counts:
+        doc = StoryDocument.model_validate(tomllib.loads(generate_story_toml(node_count, seed=1)))
+        full, full_bytes, full_time = _measure(lambda: expand_story(doc, max_states=10_000_000))
+        compact, compact_bytes, compact_time = _measure(lambda: expand_story_compact(doc, max_states=10_000_000))
+        physical = len(compact)  # type: ignore[arg-type]
+        del full
+        print(f"{node_count:>6} {physical:>9} {full_bytes / 2**20:>14.2f} {compact_bytes / 2**20:>12.2f} {full_bytes / max(compact_bytes, 1):>6.1f} {full_time:>12.2f} {compact_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 400, 800])
@@ -0,0 +1,63 @@
+"""Compare the per-pixel RLE4 BMP encoder bundled with lunii-packs and the NumPy one.
+
+Both encoders receive the same PNG bytes and must produce identical bitmaps.
+
+Usage: python benchmarks/bench_image_convert.py [repeat]
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+from pkg.api.convert_image import image_to_bitmap_rle4 as reference_rle4  # noqa: E402
+
+from lunii_cyoa.image_convert import image_to_bitmap_rle4  # noqa: E402
+
+
+def _inputs() -> List[Tuple[str, bytes]]:
+    rng = np.random.default_rng(0)
+    images = {
+        "noise 1024x768": Image.fromarray(rng.integers(0, 256, (768, 1024, 3), dtype=np.uint8)),
+        "illustration 1024x768": Image.fromarray((rng.integers(0, 6, (48, 64, 3)) * 50).astype(np.uint8)).resize((1024, 768), Image.Resampling.BICUBIC),
+        "flat 320x240": Image.new("RGB", (320, 240), (90, 120, 200)),
+    }
+    encoded = []
+    for name, image in images.items():
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        encoded.append((name, buffer.getvalue()))
+    return encoded
+
+
+def _best(function: Callable[[bytes], bytes], data: bytes, repeat: int) -> Tuple[float, bytes]:
+    best = float("inf")
+    output = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = function(data)
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main(repeat: int) -> None:
+    warnings.simplefilter("ignore", DeprecationWarning)
+    print(f"{'input':<24}{'per-pixel':>12}{'numpy':>12}{'speedup':>10}{'bytes':>10}")
+    for name, data in _inputs():
+        reference_seconds, reference = _best(reference_rle4, data, repeat)
+        numpy_seconds, converted = _best(image_to_bitmap_rle4, data, repeat)
+        if converted != reference:
+            raise SystemExit(f"{name}: outputs differ")
+        print(f"{name:<24}{reference_seconds * 1000:>10.1f}ms{numpy_seconds * 1000:>10.1f}ms{reference_seconds / numpy_seconds:>9.1f}x{len(converted):>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,92 @@
+"""Compare a full re-expansion with IncrementalExpander after a single-node edit.
+
+Each scenario edits the guard of one menu choice (adding `&& key`), chosen by where the node first
+appears in the breadth-first numbering: the later the edit, the larger the spliced
+prefix. Incremental results are checked against expand_story.
+
+Usage: python benchmarks/bench_incremental.py [node_count ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tomllib
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from story_gen import generate_story_toml  # noqa: E402
+
+from lunii_cyoa.expansion import ExpansionError, expand_story  # noqa: E402
+from lunii_cyoa.incremental import IncrementalExpander  # noqa: E402
+from lunii_cyoa.models import StoryDocument  # noqa: E402
+from lunii_cyoa.structures import ExpansionResult  # noqa: E402
+
+MAX_STATES = 10_000_000
+
+
+def _timed(run: Callable[[], ExpansionResult], repeat: int = 3) -> Tuple[ExpansionResult, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def _with_stricter_guard(doc: StoryDocument, node_id: str) -> StoryDocument:
+    edited = doc.model_copy(deep=True)
+    choice = next(node for node in edited.nodes if node.id == node_id).choices[-1]
+    choice.guard = f"({choice.guard}) && key" if choice.guard else "key"
+    return StoryDocument.model_validate(edited.model_dump())
+
+
+def _edits(doc: StoryDocument, base: ExpansionResult) -> List[Tuple[str, StoryDocument]]:
+    first_seen: Dict[str, int] = {}
+    for node in base.physical_nodes:
+        first_seen.setdefault(node.logical_id, node.physical_id)
+    menus = sorted((pid, node_id) for node_id, pid in first_seen.items() if doc.node_map[node_id].choices)
+    scenarios = [("early", menus[len(menus) // 10][1]), ("middle", menus[len(menus) // 2][1]), ("late", menus[-len(menus) // 10][1])]
+    edits = [(f"{label} ({node_id})", _with_stricter_guard(doc, node_id)) for label, node_id in scenarios]
+    assets_only = doc.model_copy(deep=True)
+    assets_only.nodes[0].bg = "img/other.png"
+    edits.append(("assets only", assets_only))
+    return edits
+
+
+def main(node_counts: List[int]) -> None:
+    print(f"{'nodes':>6} {'edit':<22} {'physical':>9} {'full s':>8} {'incr s':>8} {'speedup':>8} {'spliced':>8} {'reused':>8} {'recomputed':>10}")
+    for node_count in node_counts:
+        doc = StoryDocument.model_validate(tomllib.loads(generate_story_toml(node_count, seed=1)))
+        base = expand_story(doc, max_states=MAX_STATES)
+        for label, edited in _edits(doc, base):
+            try:
+                expected, full_seconds = _timed(lambda: expand_story(edited, max_states=MAX_STATES))
+            except ExpansionError as exc:
+                print(f"{node_count:>6} {label:<22} skipped: {exc}")
+                continue
+            incremental = IncrementalExpander(max_states=MAX_STATES)
+
+            def apply_edit() -> ExpansionResult:
+                incremental.expand(doc)  # untimed below: reset to the base revision
+                started = time.perf_counter()
+                result = incremental.expand(edited)
+                timings.append(time.perf_counter() - started)
+                return result
+
+            timings: List[float] = []
+            result, _ = _timed(apply_edit)
+            incremental_seconds = min(timings)
+            if result != expected:
+                raise SystemExit(f"{label}: incremental result differs from expand_story")
+            stats = incremental.stats
+            print(
+                f"{node_count:>6} {label:<22} {len(result.physical_nodes):>9} {full_seconds:>8.3f} {incremental_seconds:>8.3f}"
+                f" {full_seconds / incremental_seconds:>7.1f}x {stats.spliced:>8} {stats.reused:>8} {stats.recomputed:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 800])
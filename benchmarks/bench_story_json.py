@@ -0,0 +1,96 @@
+"""Compare writing story.json through StudioStoryBuilder and through StudioJsonWriter.
+
+The builder path deep-copies the whole document, resolves every action option with a
+linear scan in `StudioStory.load`, then serializes one big string; it is only run up
+to `--builder-limit` stage nodes.
+
+Usage: python benchmarks/bench_story_json.py [stage_count ...]
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from pkg.api.studio_builder import ActionNodeSpec, StageNodeSpec, StudioStoryBuilder  # noqa: E402
+
+from lunii_cyoa.studio_json import StudioJsonWriter, orjson  # noqa: E402
+
+BUILDER_LIMIT = 5_000
+
+
+def _nodes(stage_count: int) -> Tuple[List[StageNodeSpec], List[ActionNodeSpec]]:
+    ids = [str(uuid.UUID(int=index + 1)).upper() for index in range(stage_count)]
+    actions: List[ActionNodeSpec] = []
+    for index in range(stage_count):
+        action_id = str(uuid.UUID(int=stage_count + index + 1)).upper()
+        actions.append({"id": action_id, "options": [ids[(index + 1) % stage_count], ids[(index * 7) % stage_count]]})
+    stages: List[StageNodeSpec] = [
+        {
+            "uuid": node_id,
+            "image": f"img/n{index % 50}.bmp",
+            "audio": f"audio/n{index % 50}.mp3",
+            "okTransition": {"actionNode": actions[index]["id"], "optionIndex": -1},
+            "homeTransition": {"actionNode": actions[index]["id"], "optionIndex": -1},
+        }
+        for index, node_id in enumerate(ids)
+    ]
+    return stages, actions
+
+
+class _Sink(io.RawIOBase):
+    """Discards output, so the peak only accounts for the writer itself."""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        return len(data)
+
+
+def _measure(run: Callable[[], object]) -> Tuple[float, int]:
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def _builder(stages: List[StageNodeSpec], actions: List[ActionNodeSpec]) -> None:
+    builder = StudioStoryBuilder(title="bench", description="", format_version=1, pack_version=1)
+    builder.stage_nodes = stages
+    builder.action_nodes = [dict(action) for action in actions]  # type: ignore[misc]
+    _Sink().write(builder.to_studio_story().to_json().encode("utf-8"))
+
+
+def _streaming(stages: List[StageNodeSpec], actions: List[ActionNodeSpec], **options: object) -> None:
+    StudioJsonWriter(_Sink(), **options).write("bench", "", 1, 1, iter(stages), iter(actions))  # type: ignore[arg-type]
+
+
+def main(stage_counts: List[int]) -> None:
+    modes = [("stream", {}), ("compact", {"indent": None})]
+    if orjson is not None:
+        modes.append(("orjson", {"backend": "orjson", "indent": None}))
+    print(f"{'stages':>8} {'mode':>8} {'seconds':>8} {'peak MiB':>9}")
+    for stage_count in stage_counts:
+        stages, actions = _nodes(stage_count)
+        if stage_count <= BUILDER_LIMIT:
+            elapsed, peak = _measure(lambda: _builder(stages, actions))
+            print(f"{stage_count:>8} {'builder':>8} {elapsed:>8.2f} {peak / 2**20:>9.1f}")
+        for name, options in modes:
+            elapsed, peak = _measure(lambda: _streaming(stages, actions, **options))
+            print(f"{stage_count:>8} {name:>8} {elapsed:>8.2f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [5_000, 100_000])
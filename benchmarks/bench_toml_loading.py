@@ -0,0 +1,45 @@
+"""Compare load_story with the tomllib (default) and tomlkit parsers.
+
+Usage: python benchmarks/bench_toml_loading.py [node_count ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from story_gen import generate_story_toml  # noqa: E402
+
+from lunii_cyoa.expansion import expand_story  # noqa: E402
+from lunii_cyoa.loader import load_story  # noqa: E402
+
+
+def _best_of(run: Callable[[], object], repeat: int = 3) -> float:
+    timings = []
+    for index_repeat in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(node_counts: list[int]) -> None:
+    print(f"{'nodes':>6} {'KiB':>8} {'tomlkit s':>10} {'tomllib s':>10} {'speedup':>8} {'expand s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for node_count in node_counts:
+            path = Path(tmp) / f"story_{node_count}.toml"
+            path.write_text(generate_story_toml(node_count, seed=1), encoding="utf-8")
+            slow = _best_of(lambda: load_story(path, parser="tomlkit"), repeat=1)
+            fast = _best_of(lambda: load_story(path))
+            doc = load_story(path)
+            expand = _best_of(lambda: expand_story(doc, max_states=10_000_000), repeat=1)
+            print(f"{node_count:>6} {path.stat().st_size / 1024:>8.0f} {slow:>10.2f} {fast:>10.3f} {slow / fast:>8.1f} {expand:>9.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 1000, 4000])
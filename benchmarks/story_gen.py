@@ -0,0 +1,96 @@
+"""Deterministic generator of large synthetic stories used by the benchmarks."""
+
+from __future__ import annotations
+
+import random
+from typing import List
+
+_STATE_TOML = """
+[state.hp]
+type = "int"
+min = 0
+max = 4
+default = 2
+
+[state.gold]
+type = "int"
+min = 0
+max = 5
+
+[state.key]
+type = "bool"
+
+[state.torch]
+type = "bool"
+
+[state.mood]
+type = "enum"
+values = ["calm", "alert", "scared"]
+"""
+
+# (effect, guard that keeps it within bounds)
+_EFFECTS = [
+    (None, None),
+    ('{ var = "hp", op = "-=", value = 1 }', "hp > 0"),
+    ('{ var = "hp", op = "+=", value = 1 }', "hp < 4"),
+    ('{ var = "gold", op = "+=", value = 1 }', "gold < 5"),
+    ('{ var = "key", op = "=", value = true }', None),
+    ('{ var = "torch", op = "=", value = true }', None),
+    ('{ var = "mood", op = "=", value = "alert" }', None),
+]
+_GUARDS = [None, None, "key == true", "gold >= 2 && !torch", 'mood != "scared"', "hp >= 1 || key"]
+
+
+def generate_story_toml(node_count: int, seed: int = 0, back_edge_ratio: float = 0.2) -> str:
+    """Return the TOML source of a random but valid story.
+
+    Args:
+        node_count: Number of logical nodes; the last one is the terminal story node.
+        seed: Seed for the pseudo-random generator, so runs are reproducible.
+        back_edge_ratio: Probability that a choice loops back to an earlier node.
+
+    Returns:
+        TOML text accepted by `load_story`.
+    """
+    rnd = random.Random(seed)
+    lines: List[str] = [
+        "[story]",
+        'id = "generated"',
+        'start_node = "n0"',
+        'title.en = "Generated"',
+        "",
+        "[assets]",
+        'base_dir = "assets"',
+        'audio_ext = "mp3"',
+        'image_ext = "png"',
+        _STATE_TOML,
+    ]
+
+    def pick_target(index: int) -> str:
+        if index == node_count - 1 or rnd.random() < back_edge_ratio:
+            return f"n{rnd.randrange(0, max(index, 1))}"
+        return f"n{rnd.randrange(index + 1, node_count)}"
+
+    for index in range(node_count):
+        kind = "story" if index == node_count - 1 else rnd.choice(["menu", "menu", "branch", "story", "random"])
+        lines += ["[[nodes]]", f'id = "n{index}"', f'kind = "{kind}"', f'bg = "img/n{index % 7}.png"', f'audio = "audio/n{index % 5}.mp3"']
+        if kind == "story":
+            if index < node_count - 1:
+                lines.append(f'target = "{pick_target(index)}"')
+            lines.append("")
+        elif kind == "random":
+            lines.append("")
+            for index_option in range(rnd.randint(2, 3)):
+                lines += ["[[nodes.random.options]]", f'target = "{pick_target(index)}"', ""]
+        else:
+            lines.append("")
+            for index_choice in range(rnd.randint(2, 4)):
+                lines += ["[[nodes.choices]]", f'id = "c{index_choice}"', f'target = "{pick_target(index)}"']
+                effect, bound = rnd.choice(_EFFECTS)
+                guard = bound or (rnd.choice(_GUARDS) if index_choice else None)
+                if guard:
+                    lines.append(f"guard = '{guard}'")
+                if effect:
+                    lines.append(f"effects = [{effect}]")
+                lines.append("")
+    return "\n".join(lines)
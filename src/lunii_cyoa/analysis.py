@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from math import prod
+from typing import Any, Deque, Dict, List, Set, Tuple
+
+from .expansion import InitialStateBuilder
+from .models import Effect, StateBool, StateDeclaration, StateInt, StoryDocument, StoryNode
+
+ValueSets = Dict[str, Set[Any]]
+
+
+@dataclass
+class StateSpaceEstimate:
+    """Static bounds on the number of physical nodes `StoryExpander` can produce.
+
+    Attributes:
+        declared_states: Product of every variable's cardinality (size of the packed layout).
+        product_upper_bound: Reachable logical nodes times `declared_states`.
+        estimate: Sum over reachable logical nodes of `per_node`; still an upper bound, as guards are ignored.
+        per_node: Per logical node, the product of the number of values each var can hold there.
+    """
+
+    declared_states: int
+    product_upper_bound: int
+    estimate: int
+    per_node: Dict[str, int] = field(default_factory=dict)
+
+    def fits(self, max_states: int) -> bool:
+        """True when expansion is guaranteed not to exceed `max_states`."""
+        return self.estimate <= max_states
+
+
+def _cardinality(decl: StateDeclaration) -> int:
+    if isinstance(decl, StateInt):
+        return decl.max - decl.min + 1
+    if isinstance(decl, StateBool):
+        return 2
+    return len(decl.values)
+
+
+def _node_edges(node: StoryNode) -> List[Tuple[str, List[Effect]]]:
+    if node.kind == "random":
+        return [(option.target, []) for option in node.random.get("options", [])]
+    if node.kind in ("menu", "branch"):
+        return [(choice.target, choice.effects) for choice in node.choices]
+    return [(node.target, [])] if node.target else []
+
+
+def _apply_effects(effects: List[Effect], values: ValueSets, state_decl: Dict[str, StateDeclaration]) -> ValueSets | None:
+    """Abstractly apply `effects` to per-variable value sets; None when every concrete run would fail."""
+    result = dict(values)
+    for eff in effects:
+        decl = state_decl.get(eff.var)
+        if decl is None:
+            return None
+        updated: Set[Any]
+        if isinstance(decl, StateInt):
+            if not isinstance(eff.value, int):
+                return None
+            if eff.op == "=":
+                candidates = {eff.value}
+            else:
+                delta = eff.value if eff.op == "+=" else -eff.value
+                candidates = {current + delta for current in result[eff.var]}
+            updated = {value for value in candidates if decl.min <= value <= decl.max}
+        elif isinstance(decl, StateBool):
+            updated = {eff.value} if eff.op == "=" and isinstance(eff.value, bool) else set()
+        else:
+            updated = {eff.value} if eff.op == "=" and eff.value in decl.values else set()
+        if not updated:
+            return None
+        result[eff.var] = updated
+    return result
+
+
+def estimate_state_space(doc: StoryDocument) -> StateSpaceEstimate:
+    """Bound reachable (logical node, state) pairs without expanding the story.
+
+    A forward dataflow pass propagates, per logical node, the set of values each state
+    variable may hold. Effects are applied abstractly and guards are ignored, so the
+    per-node products are sound upper bounds. Variables no choice writes keep their
+    initial value and contribute a factor of one.
+
+    Args:
+        doc: Validated story document.
+
+    Returns:
+        StateSpaceEstimate with the naive product bound and the dataflow estimate.
+    """
+    node_map = doc.node_map
+    initial = InitialStateBuilder(doc).build()
+    values: Dict[str, ValueSets] = {doc.story.start_node: {name: {value} for name, value in initial.items()}}
+    worklist: Deque[str] = deque([doc.story.start_node])
+    queued = {doc.story.start_node}
+
+    while worklist:
+        node_id = worklist.popleft()
+        queued.discard(node_id)
+        for target, effects in _node_edges(node_map[node_id]):
+            if target not in node_map:
+                continue
+            outgoing = _apply_effects(effects, values[node_id], doc.state)
+            if outgoing is None:
+                continue
+            known = values.get(target)
+            if known is None:
+                values[target] = {name: set(sets) for name, sets in outgoing.items()}
+                changed = True
+            else:
+                changed = False
+                for name, sets in outgoing.items():
+                    if not sets <= known[name]:
+                        known[name] |= sets
+                        changed = True
+            if changed and target not in queued:
+                worklist.append(target)
+                queued.add(target)
+
+    declared_states = prod(_cardinality(decl) for decl in doc.state.values())
+    per_node = {node_id: prod(len(sets) for sets in values[node_id].values()) for node_id in node_map if node_id in values}
+    return StateSpaceEstimate(
+        declared_states=declared_states,
+        product_upper_bound=len(per_node) * declared_states,
+        estimate=sum(per_node.values()),
+        per_node=per_node,
+    )
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Literal, Tuple
+
+from .content_store import atomic_path
+
+TransferMethod = Literal["hardlink", "reflink", "copy"]
+
+_FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+@dataclass
+class AssetCopyReport:
+    """Outcome of `copy_assets`.
+
+    Attributes:
+        requested: Asset references received, duplicates included.
+        unique: Distinct destination files after deduplication.
+        skipped: Destinations already up to date (same size and mtime, or same content).
+        hardlinked: Files published as hardlinks to the source.
+        reflinked: Files published as copy-on-write clones.
+        copied: Files copied byte by byte.
+        missing: Sources that do not exist.
+        bytes_written: Bytes actually copied (links and clones write none).
+    """
+
+    requested: int = 0
+    unique: int = 0
+    skipped: int = 0
+    hardlinked: int = 0
+    reflinked: int = 0
+    copied: int = 0
+    missing: int = 0
+    bytes_written: int = 0
+
+
+def _file_digest(path: Path) -> bytes:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def is_up_to_date(src: Path, dest: Path) -> bool:
+    """True when `dest` already holds the content of `src`."""
+    try:
+        src_stat, dest_stat = src.stat(), dest.stat()
+    except FileNotFoundError:
+        return False
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if (src_stat.st_dev, src_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+        return True
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return _file_digest(src) == _file_digest(dest)
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only attempted on Linux")
+    import fcntl
+
+    with src.open("rb") as source, dest.open("wb") as target:
+        fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+    shutil.copystat(src, dest)
+
+
+def link_or_copy(src: Path, dest: Path, link: bool = True) -> TransferMethod:
+    """Publish `src` at `dest`, trying a hardlink, then a reflink, then a plain copy.
+
+    The file is staged next to `dest` and moved in place with `os.replace`, so an
+    existing destination is swapped atomically and never left half written.
+    """
+    method: TransferMethod | None = None
+    with atomic_path(dest) as tmp:
+        if link:
+            tmp.unlink()
+            try:
+                os.link(src, tmp)
+                method = "hardlink"
+            except OSError:
+                pass
+            if method is None:
+                try:
+                    _reflink(src, tmp)
+                    method = "reflink"
+                except OSError:
+                    tmp.unlink(missing_ok=True)
+        if method is None:
+            shutil.copy2(src, tmp)
+            method = "copy"
+    return method
+
+
+def copy_assets(pairs: Iterable[Tuple[Path, Path]], workers: int | None = None, link: bool = True) -> AssetCopyReport:
+    """Copy (source, destination) pairs on a thread pool, once per destination.
+
+    Args:
+        pairs: Asset references; the same pair may appear many times.
+        workers: Thread pool size (defaults to `ThreadPoolExecutor`'s).
+        link: Try hardlinks and reflinks before copying.
+
+    Returns:
+        AssetCopyReport with per-outcome counts and the bytes written.
+    """
+    report = AssetCopyReport()
+    unique: Dict[Path, Path] = {}
+    for src, dest in pairs:
+        report.requested += 1
+        unique.setdefault(dest, src)
+    report.unique = len(unique)
+
+    def transfer(dest: Path, src: Path) -> str:
+        if not src.exists():
+            return "missing"
+        if is_up_to_date(src, dest):
+            return "skipped"
+        return link_or_copy(src, dest, link=link)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda item: (item[1], transfer(*item)), unique.items()))
+    for src, outcome in outcomes:
+        if outcome == "missing":
+            report.missing += 1
+        elif outcome == "skipped":
+            report.skipped += 1
+        elif outcome == "hardlink":
+            report.hardlinked += 1
+        elif outcome == "reflink":
+            report.reflinked += 1
+        else:
+            report.copied += 1
+            report.bytes_written += src.stat().st_size
+    return report
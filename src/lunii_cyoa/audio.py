@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import re
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+from .content_store import atomic_path
+
+_TARGET_PATTERN = re.compile(r"^(?P<codec>[a-z0-9]+)_(?P<rate>\d+)k(?P<fraction>\d*)_(?P<channels>mono|stereo)_(?P<bitrate>\d+)kbps$")
+_ENCODERS = {"mp3": ("libmp3lame", "mp3"), "ogg": ("libvorbis", "ogg"), "aac": ("aac", "adts")}
+
+
+class AudioTranscodeError(Exception):
+    """Raised when an audio target is invalid or ffmpeg fails."""
+
+
+@dataclass(frozen=True)
+class AudioTarget:
+    """Device audio format, parsed from `assets.audio_target` (e.g. `mp3_44k1_mono_64kbps`)."""
+
+    codec: str
+    sample_rate: int
+    channels: int
+    bitrate_kbps: int
+
+    @classmethod
+    def parse(cls, spec: str) -> AudioTarget:
+        match = _TARGET_PATTERN.match(spec)
+        if match is None or match["codec"] not in _ENCODERS:
+            raise AudioTranscodeError(f"Unsupported audio target: {spec}")
+        # "44k1" is 44.1 kHz, "22k05" is 22.05 kHz, "48k" is 48 kHz
+        sample_rate = int(match["rate"]) * 1000 + (int(match["fraction"].ljust(3, "0")) if match["fraction"] else 0)
+        return cls(
+            codec=match["codec"],
+            sample_rate=sample_rate,
+            channels=1 if match["channels"] == "mono" else 2,
+            bitrate_kbps=int(match["bitrate"]),
+        )
+
+    def ffmpeg_output_args(self) -> List[str]:
+        encoder, container = _ENCODERS[self.codec]
+        return ["-vn", "-codec:a", encoder, "-ar", str(self.sample_rate), "-ac", str(self.channels), "-b:a", f"{self.bitrate_kbps}k", "-f", container]
+
+
+def transcode_stream(chunks: Iterable[bytes], output_path: Path, target: AudioTarget, ffmpeg: str = "ffmpeg") -> Path:
+    """
+    Pipe encoded audio chunks into ffmpeg as they arrive and write the device-ready file.
+
+    ffmpeg decodes from stdin and encodes to a temporary file next to `output_path`,
+    moved in place once ffmpeg exits successfully; no intermediate copy of the source
+    audio is written.
+
+    Raises:
+        AudioTranscodeError: if ffmpeg cannot be started or exits with an error.
+    """
+    with atomic_path(output_path, suffix=output_path.suffix) as tmp:
+        command = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", "pipe:0", *target.ffmpeg_output_args(), str(tmp)]
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as exc:
+            raise AudioTranscodeError(f"Failed to start ffmpeg '{ffmpeg}': {exc}") from exc
+
+        stderr: List[bytes] = []
+        # Drain stderr concurrently so a chatty ffmpeg cannot block while we feed stdin.
+        reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)  # type: ignore[union-attr]
+        reader.start()
+        try:
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)  # type: ignore[union-attr]
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its status and stderr explain why
+            finally:
+                try:
+                    process.stdin.close()  # type: ignore[union-attr]
+                except BrokenPipeError:
+                    pass
+            returncode = process.wait()
+            reader.join()
+        except BaseException:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            raise
+        if returncode != 0:
+            message = b"".join(stderr).decode("utf-8", "replace").strip()
+            raise AudioTranscodeError(f"ffmpeg exited with status {returncode}: {message}")
+    return output_path
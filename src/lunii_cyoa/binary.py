@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from pydantic import TypeAdapter
+
+from .content_store import atomic_write
+from .models import AssetsConfig, Choice, Effect, RandomOption, StateDeclaration, StoryDocument, StoryMetadata, StoryNode
+
+COMPILED_SUFFIX = ".cyoab"
+
+_MAGIC = b"CYOAB\x00"
+_FORMAT_VERSION = 1
+_NONE = 0xFFFFFFFF
+_KINDS = ("story", "menu", "branch", "random")
+_OPS = ("=", "+=", "-=")
+_VALUE_INT, _VALUE_BOOL, _VALUE_STR = 0, 1, 2
+
+# magic, version, metadata length, string/node/choice/option/effect counts
+_HEADER = struct.Struct("<6sHIIIIII")
+# id, kind, bg, audio, target, first choice, choice count, first option, option count
+_NODE = struct.Struct("<IBIIIIIII")
+# id, label_audio, label_text, target, guard, first effect, effect count
+_CHOICE = struct.Struct("<IIIIIII")
+_OPTION = struct.Struct("<I")
+# var, op, value tag, value (int, bool or string index)
+_EFFECT = struct.Struct("<IBBq")
+
+_STATE_ADAPTER: TypeAdapter[StateDeclaration] = TypeAdapter(StateDeclaration)
+
+
+class CompiledStoryError(Exception):
+    """Raised when a compiled story cannot be written or read."""
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.values: List[bytes] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: str | None) -> int:
+        if value is None:
+            return _NONE
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value.encode("utf-8"))
+        return index
+
+
+def _encode(doc: StoryDocument) -> bytes:
+    strings = _StringTable()
+    nodes: List[bytes] = []
+    choices: List[bytes] = []
+    options: List[bytes] = []
+    effects: List[bytes] = []
+    for node in doc.nodes:
+        first_choice, first_option = len(choices), len(options)
+        for choice in node.choices:
+            first_effect = len(effects)
+            for eff in choice.effects:
+                if isinstance(eff.value, bool):
+                    tag, value = _VALUE_BOOL, int(eff.value)
+                elif isinstance(eff.value, int):
+                    tag, value = _VALUE_INT, eff.value
+                else:
+                    tag, value = _VALUE_STR, strings.add(eff.value)
+                effects.append(_EFFECT.pack(strings.add(eff.var), _OPS.index(eff.op), tag, value))
+            choices.append(
+                _CHOICE.pack(
+                    strings.add(choice.id),
+                    strings.add(choice.label_audio),
+                    strings.add(choice.label_text),
+                    strings.add(choice.target),
+                    strings.add(choice.guard),
+                    first_effect,
+                    len(choice.effects),
+                )
+            )
+        for option in node.random.get("options", []):
+            options.append(_OPTION.pack(strings.add(option.target)))
+        nodes.append(
+            _NODE.pack(
+                strings.add(node.id),
+                _KINDS.index(node.kind),
+                strings.add(node.bg),
+                strings.add(node.audio),
+                strings.add(node.target),
+                first_choice,
+                len(choices) - first_choice,
+                first_option,
+                len(options) - first_option,
+            )
+        )
+
+    metadata = json.dumps(
+        {
+            "story": doc.story.model_dump(mode="json"),
+            "assets": doc.assets.model_dump(mode="json"),
+            "state": [[name, decl.model_dump(mode="json")] for name, decl in doc.state.items()],
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    string_offsets = [0]
+    for encoded in strings.values:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(metadata), len(strings.values), len(nodes), len(choices), len(options), len(effects))
+    return b"".join(
+        [
+            header,
+            metadata,
+            struct.pack(f"<{len(string_offsets)}I", *string_offsets),
+            *strings.values,
+            *nodes,
+            *choices,
+            *options,
+            *effects,
+        ]
+    )
+
+
+def compile_story(doc: StoryDocument, path: Path) -> Path:
+    """
+    Write a validated StoryDocument to the binary `.cyoab` format.
+
+    The file holds a header, the story/assets/state metadata as JSON, an interned UTF-8
+    string table and fixed-size node, choice, random option and effect tables. Effects
+    are stored pre-parsed (variable, operator, typed value); guards keep their source
+    text, which `GuardEvaluator` compiles once per expression.
+
+    Args:
+        doc: Document to compile; it was validated when it was built.
+        path: Output file, replaced atomically.
+
+    Returns:
+        The written path.
+    """
+    data = _encode(doc)
+    return atomic_write(path, lambda handle: handle.write(data))
+
+
+class CompiledStory:
+    """Memory-mapped `.cyoab` story with lazy, cached node access.
+
+    Opening only reads the header and the metadata; nodes are decoded on first access
+    with `model_construct`, skipping Pydantic validation that already ran at compile time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            with path.open("rb") as handle:
+                self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise CompiledStoryError(f"Failed to open compiled story '{path}': {exc}") from exc
+        try:
+            self._read_layout()
+        except (CompiledStoryError, struct.error, KeyError, ValueError) as exc:
+            self.close()
+            if isinstance(exc, CompiledStoryError):
+                raise
+            raise CompiledStoryError(f"Corrupt compiled story '{path}': {exc}") from exc
+        self._nodes: List[StoryNode | None] = [None] * self.node_count
+        self._index: Dict[str, int] | None = None
+
+    def _read_layout(self) -> None:
+        buffer = self._mmap
+        if len(buffer) < _HEADER.size:
+            raise CompiledStoryError(f"Compiled story '{self.path}' is truncated")
+        magic, version, metadata_length, string_count, node_count, choice_count, option_count, effect_count = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            raise CompiledStoryError(f"'{self.path}' is not a compiled story")
+        if version != _FORMAT_VERSION:
+            raise CompiledStoryError(f"Compiled story '{self.path}' has unsupported version {version}")
+        offset = _HEADER.size
+        metadata: Dict[str, Any] = json.loads(bytes(buffer[offset : offset + metadata_length]).decode("utf-8"))
+        offset += metadata_length
+        self._string_offsets = offset
+        self._string_count = string_count
+        offset += 4 * (string_count + 1)
+        self._string_data = offset
+        self._string_size = struct.unpack_from("<I", buffer, self._string_offsets + 4 * string_count)[0]
+        offset += self._string_size
+        self._node_table = offset
+        self._choice_table = self._node_table + _NODE.size * node_count
+        self._option_table = self._choice_table + _CHOICE.size * choice_count
+        self._effect_table = self._option_table + _OPTION.size * option_count
+        if self._effect_table + _EFFECT.size * effect_count != len(buffer):
+            raise CompiledStoryError(f"Compiled story '{self.path}' has an unexpected size")
+        self.node_count: int = node_count
+        self._choice_count = choice_count
+        self._option_count = option_count
+        self._effect_count = effect_count
+        self.story = StoryMetadata.model_validate(metadata["story"])
+        self.assets = AssetsConfig.model_validate(metadata["assets"])
+        self.state = {name: _STATE_ADAPTER.validate_python(decl) for name, decl in metadata["state"]}
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> CompiledStory:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def _corrupt(self, detail: str) -> CompiledStoryError:
+        return CompiledStoryError(f"Corrupt compiled story '{self.path}': {detail}")
+
+    def _string(self, index: int) -> str | None:
+        if index == _NONE:
+            return None
+        if not 0 <= index < self._string_count:
+            raise self._corrupt(f"string index {index} out of range")
+        start, end = struct.unpack_from("<II", self._mmap, self._string_offsets + 4 * index)
+        if not start <= end <= self._string_size:
+            raise self._corrupt(f"string {index} has invalid bounds {start}..{end}")
+        try:
+            return self._mmap[self._string_data + start : self._string_data + end].decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise self._corrupt(f"string {index} is not valid UTF-8") from exc
+
+    def _required_string(self, index: int, field: str) -> str:
+        value = self._string(index)
+        if value is None:
+            raise self._corrupt(f"missing {field}")
+        return value
+
+    def _rows(self, first: int, count: int, total: int, table: str) -> range:
+        if first + count > total:
+            raise self._corrupt(f"{table} rows {first}..{first + count} exceed the table of {total}")
+        return range(first, first + count)
+
+    def node_id(self, index: int) -> str:
+        return self._required_string(_NODE.unpack_from(self._mmap, self._node_table + _NODE.size * index)[0], "node id")
+
+    @property
+    def node_ids(self) -> List[str]:
+        return [self.node_id(index) for index in range(self.node_count)]
+
+    def node_at(self, index: int) -> StoryNode:
+        node = self._nodes[index]
+        if node is None:
+            node = self._nodes[index] = self._decode_node(index)
+        return node
+
+    def node(self, node_id: str) -> StoryNode:
+        if self._index is None:
+            self._index = {node_id: index for index, node_id in enumerate(self.node_ids)}
+        try:
+            return self.node_at(self._index[node_id])
+        except KeyError:
+            raise CompiledStoryError(f"Unknown node '{node_id}' in compiled story '{self.path}'") from None
+
+    def iter_nodes(self) -> Iterator[StoryNode]:
+        for index in range(self.node_count):
+            yield self.node_at(index)
+
+    def document(self) -> StoryDocument:
+        """Materialize every node into a StoryDocument (without re-validation)."""
+        return StoryDocument.model_construct(story=self.story, assets=self.assets, state=dict(self.state), nodes=list(self.iter_nodes()))
+
+    def _decode_node(self, index: int) -> StoryNode:
+        node_id, kind, bg, audio, target, first_choice, choice_count, first_option, option_count = _NODE.unpack_from(self._mmap, self._node_table + _NODE.size * index)
+        if kind >= len(_KINDS):
+            raise self._corrupt(f"node {index} has unknown kind {kind}")
+        choices = [self._decode_choice(choice_index) for choice_index in self._rows(first_choice, choice_count, self._choice_count, "choice")]
+        random: Dict[str, List[RandomOption]] = {}
+        if option_count:
+            random["options"] = [
+                RandomOption.model_construct(target=self._required_string(_OPTION.unpack_from(self._mmap, self._option_table + _OPTION.size * option_index)[0], "option target"))
+                for option_index in self._rows(first_option, option_count, self._option_count, "random option")
+            ]
+        return StoryNode.model_construct(
+            id=self._required_string(node_id, "node id"),
+            kind=_KINDS[kind],
+            bg=self._required_string(bg, "node bg"),
+            audio=self._required_string(audio, "node audio"),
+            target=self._string(target),
+            choices=choices,
+            random=random,
+        )
+
+    def _decode_choice(self, index: int) -> Choice:
+        choice_id, label_audio, label_text, target, guard, first_effect, effect_count = _CHOICE.unpack_from(self._mmap, self._choice_table + _CHOICE.size * index)
+        effects: List[Effect] = []
+        for effect_index in self._rows(first_effect, effect_count, self._effect_count, "effect"):
+            var, op, tag, raw = _EFFECT.unpack_from(self._mmap, self._effect_table + _EFFECT.size * effect_index)
+            if op >= len(_OPS):
+                raise self._corrupt(f"effect {effect_index} has unknown operator {op}")
+            value: int | bool | str
+            if tag == _VALUE_INT:
+                value = raw
+            elif tag == _VALUE_BOOL:
+                value = bool(raw)
+            elif tag == _VALUE_STR:
+                value = self._required_string(raw, "effect value")
+            else:
+                raise self._corrupt(f"effect {effect_index} has unknown value tag {tag}")
+            effects.append(Effect.model_construct(var=self._required_string(var, "effect variable"), op=_OPS[op], value=value))
+        return Choice.model_construct(
+            id=self._required_string(choice_id, "choice id"),
+            label_audio=self._string(label_audio),
+            label_text=self._string(label_text),
+            target=self._required_string(target, "choice target"),
+            effects=effects,
+            guard=self._string(guard),
+        )
+
+
+def load_compiled_story(path: Path) -> CompiledStory:
+    return CompiledStory(path)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterator, List
+
+from .expansion import StoryExpander
+from .models import StoryDocument
+from .state_layout import StateLayout
+from .structures import Edge, ExpansionResult, PackedState, PhysicalNode, StateSnapshot
+
+_INT64_MAX = 2**63 - 1
+
+
+class CompactNodeView:
+    """Lightweight per-node accessor over a `CompactExpansionResult` row."""
+
+    __slots__ = ("_result", "_row", "physical_id")
+
+    def __init__(self, result: CompactExpansionResult, row: int, physical_id: int):
+        self._result = result
+        self._row = row
+        self.physical_id = physical_id
+
+    @property
+    def logical_id(self) -> str:
+        return self._result.logical_ids[self._result.node_logical[self._row]]
+
+    @property
+    def kind(self) -> str:
+        return self._result.logical_kinds[self._result.node_logical[self._row]]
+
+    @property
+    def packed_state(self) -> PackedState:
+        return self._result.node_states[self._row]
+
+    @property
+    def state(self) -> StateSnapshot:
+        return self._result.layout.decode(self._result.node_states[self._row])
+
+    @property
+    def outgoing(self) -> List[int]:
+        start, end = self._result.offsets[self._row], self._result.offsets[self._row + 1]
+        return self._result.targets[start:end].tolist()
+
+    @property
+    def labels(self) -> List[str | None]:
+        start, end = self._result.offsets[self._row], self._result.offsets[self._row + 1]
+        return [self._result.labels[label_index] for label_index in self._result.edge_labels[start:end]]
+
+    def to_physical_node(self) -> PhysicalNode:
+        return PhysicalNode(physical_id=self.physical_id, logical_id=self.logical_id, kind=self.kind, state=self.state, outgoing=self.outgoing)
+
+
+class CompactExpansionResult:
+    """Columnar, array-backed counterpart of `ExpansionResult`.
+
+    Rows are stored in expansion (visit) order; `row_of` maps physical ids back to rows.
+    Outgoing edges are kept as a CSR adjacency (`offsets` into `targets`/`edge_labels`),
+    logical ids and edge labels are interned, and states stay packed by `layout`.
+    """
+
+    def __init__(self, layout: StateLayout, logical_ids: List[str], logical_kinds: List[str]):
+        self.layout = layout
+        self.logical_ids = logical_ids
+        self.logical_kinds = logical_kinds
+        self.labels: List[str | None] = []
+        self._label_index: Dict[str | None, int] = {}
+        self.node_ids = array("i")
+        self.node_logical = array("i")
+        self.node_states: array[int] | List[int] = array("q") if layout.size - 1 <= _INT64_MAX else []
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        self.edge_labels = array("i")
+        self.row_of = array("i")
+        self.unreachable_logical: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __getitem__(self, physical_id: int) -> CompactNodeView:
+        return CompactNodeView(self, self.row_of[physical_id], physical_id)
+
+    def __iter__(self) -> Iterator[CompactNodeView]:
+        for physical_id in range(len(self.node_ids)):
+            yield self[physical_id]
+
+    @property
+    def dead_ends(self) -> List[int]:
+        dead_ends: List[int] = []
+        for physical_id, row in enumerate(self.row_of):
+            if self.offsets[row] == self.offsets[row + 1]:
+                dead_ends.append(physical_id)
+        return dead_ends
+
+    def append_node(self, physical_id: int, logical_index: int, state: PackedState, targets: List[int], labels: List[str | None]) -> None:
+        self.node_ids.append(physical_id)
+        self.node_logical.append(logical_index)
+        self.node_states.append(state)
+        self.targets.extend(targets)
+        self.edge_labels.extend(self._intern_label(label) for label in labels)
+        self.offsets.append(len(self.targets))
+
+    def finalize(self) -> None:
+        """Build the physical id -> row index and the unreachable logical list."""
+        self.row_of = array("i", [0]) * len(self.node_ids)
+        for row, physical_id in enumerate(self.node_ids):
+            self.row_of[physical_id] = row
+        reachable = set(self.node_logical)
+        self.unreachable_logical = [logical_id for index, logical_id in enumerate(self.logical_ids) if index not in reachable]
+
+    def to_expansion_result(self) -> ExpansionResult:
+        physical_nodes = [self[physical_id].to_physical_node() for physical_id in range(len(self.node_ids))]
+        edges: List[Edge] = []
+        for row, physical_id in enumerate(self.node_ids):
+            for edge_index in range(self.offsets[row], self.offsets[row + 1]):
+                edges.append(Edge(source=physical_id, target=self.targets[edge_index], label=self.labels[self.edge_labels[edge_index]]))
+        return ExpansionResult(
+            physical_nodes=physical_nodes,
+            edges=edges,
+            unreachable_logical=list(self.unreachable_logical),
+            dead_ends=self.dead_ends,
+        )
+
+    def _intern_label(self, label: str | None) -> int:
+        index = self._label_index.get(label)
+        if index is None:
+            index = self._label_index[label] = len(self.labels)
+            self.labels.append(label)
+        return index
+
+    @classmethod
+    def make_from_expander(cls, expander: StoryExpander) -> CompactExpansionResult:
+        """Run `expander` and store its graph directly in columnar form."""
+        compact = cls(expander.layout, [node.id for node in expander.logical_nodes], [node.kind for node in expander.logical_nodes])
+        size = expander.layout.size
+        for physical_id, key, targets in expander.walk():
+            logical_index, state = divmod(key, size)
+            compact.append_node(physical_id, logical_index, state, [target[0] for target in targets], [target[2] for target in targets])
+        compact.finalize()
+        return compact
+
+    @classmethod
+    def make_from_expansion_result(cls, result: ExpansionResult, doc: StoryDocument) -> CompactExpansionResult:
+        layout = StateLayout(doc.state)
+        logical_index = {node.id: index for index, node in enumerate(doc.nodes)}
+        compact = cls(layout, list(logical_index), [node.kind for node in doc.nodes])
+        labels_by_source: Dict[int, List[str | None]] = {}
+        for edge in result.edges:
+            labels_by_source.setdefault(edge.source, []).append(edge.label)
+        for node in result.physical_nodes:
+            compact.append_node(node.physical_id, logical_index[node.logical_id], layout.encode(node.state), node.outgoing, labels_by_source.get(node.physical_id, []))
+        compact.finalize()
+        return compact
+
+
+def expand_story_compact(doc: StoryDocument, max_states: int = 5000, collapse_dead_state: bool = True) -> CompactExpansionResult:
+    """Columnar counterpart of `expand_story`, with the same dead-state collapse and numbering."""
+    return CompactExpansionResult.make_from_expander(StoryExpander(doc, max_states=max_states, collapse_dead_state=collapse_dead_state))
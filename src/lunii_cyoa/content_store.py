@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Tuple
+
+
+@contextmanager
+def atomic_path(path: Path, suffix: str = ".tmp") -> Iterator[Path]:
+    """Yield an empty temporary file next to `path`, moved over `path` when the block succeeds.
+
+    If the block raises, the temporary file is deleted and `path` is left as it was.
+    Readers never see a partial file, and an existing `path` (possibly a hardlink to a
+    cached blob) is swapped out rather than rewritten in place.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=suffix)
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write(path: Path, write: Callable[[BinaryIO], object], buffering: int = -1) -> Path:
+    """Publish what `write` writes to the handle it receives at `path`, atomically (see `atomic_path`)."""
+    with atomic_path(path) as tmp:
+        with tmp.open("wb", buffering=buffering) as handle:
+            write(handle)
+    return path
+
+
+@dataclass
+class CacheStats:
+    """Counters of a `ContentStore`; updated through `add`, which is safe across threads."""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def add(self, hits: int = 0, misses: int = 0, writes: int = 0, evictions: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.writes += writes
+            self.evictions += evictions
+
+    def record(self, hit: bool) -> None:
+        """Count one lookup as a hit or a miss."""
+        self.add(hits=int(hit), misses=int(not hit))
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ContentStore:
+    """Directory of immutable blobs addressed by a hex digest.
+
+    Blobs live under `root/<first two hex chars>/<key>`. Writes go to a temporary file
+    in the same directory and are published with `os.replace`, so concurrent readers
+    (threads or processes) only ever see complete blobs. Reading a blob refreshes its
+    mtime; when `max_bytes` is set, the least recently used blobs are evicted once a
+    write takes the store over budget.
+
+    The store size is measured by one scan on the first bounded write and then kept up
+    to date by this instance's writes and deletions; eviction rescans the directory, so
+    blobs added by other processes are accounted for at that point.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._size: int | None = None
+        self._size_lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def lookup(self, key: str, count: bool = True) -> Path | None:
+        """Return the path of a stored blob (marking it as recently used), or None.
+
+        With `count=False` the lookup is not recorded in `stats`; callers that still
+        have to read the blob (which another process may evict first) record the
+        outcome themselves with `stats.record` once the read has succeeded or failed.
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+            found = True
+        except FileNotFoundError:
+            found = False
+        if count:
+            self.stats.record(found)
+        return path if found else None
+
+    def get(self, key: str, count: bool = True) -> bytes | None:
+        """Return a stored blob, or None; `count` is as for `lookup`."""
+        data = None
+        path = self.lookup(key, count=False)
+        if path is not None:
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                pass  # evicted by another process between lookup and read
+        if count:
+            self.stats.record(data is not None)
+        return data
+
+    def put(self, key: str, data: bytes) -> Path:
+        return self.put_chunks(key, [data])
+
+    def put_chunks(self, key: str, chunks: Iterable[bytes]) -> Path:
+        """Store a blob produced incrementally; nothing is published if `chunks` raises."""
+        path = self.path_for(key)
+        written = replaced = 0
+
+        def write(handle: BinaryIO) -> None:
+            nonlocal written, replaced
+            for chunk in chunks:
+                handle.write(chunk)
+            written = handle.tell()
+            replaced = _file_size(path)
+
+        atomic_write(path, write)
+        self.stats.add(writes=1)
+        if self.max_bytes is not None:
+            with self._size_lock:
+                if self._size is None:
+                    # Includes the blob just written.
+                    self._size = self._scan()[1]
+                else:
+                    self._size += written - replaced
+                over_budget = self._size > self.max_bytes
+            if over_budget:
+                self.evict(self.max_bytes, keep=path)
+        return path
+
+    def discard(self, key: str) -> None:
+        path = self.path_for(key)
+        size = _file_size(path)
+        path.unlink(missing_ok=True)
+        with self._size_lock:
+            if self._size is not None:
+                self._size = max(0, self._size - size)
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, Path]], int]:
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for path in self.root.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        return entries, total
+
+    def evict(self, max_bytes: int, keep: Path | None = None) -> int:
+        """Delete least recently used blobs until the store holds at most `max_bytes`.
+
+        Args:
+            max_bytes: Size budget for all blobs.
+            keep: Blob that must survive (typically the one just written).
+
+        Returns:
+            Number of blobs removed.
+        """
+        entries, total = self._scan()
+        removed = 0
+        for mtime, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with self._size_lock:
+            self._size = total
+        self.stats.add(evictions=removed)
+        return removed
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import ast
+import heapq
+import operator
 import re
-from typing import Any, Dict, List, Tuple
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterator, List, Literal, Protocol, Tuple
 
-from .models import Effect, StateBool, StateDeclaration, StateEnum, StateInt, StoryDocument, StoryNode
-from .structures import Edge, ExpansionResult, PhysicalNode, StateSnapshot
+from .models import Choice, Effect, StateBool, StateDeclaration, StateEnum, StateInt, StoryDocument, StoryNode
+from .liveness import live_variables
+from .state_layout import StateLayout, StateLayoutError
+from .structures import Edge, ExpansionResult, ExpansionStats, ExpansionSummary, PackedState, PhysicalNode, StateSnapshot
 
 
 class GuardEvaluationError(Exception):
@@ -40,129 +46,284 @@ class InitialStateBuilder:
         return state
 
 
+_GUARD_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Name,
+    ast.Constant,
+    ast.Load,
+    ast.And,
+    ast.Or,
+    ast.Not,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+)
+
+_GUARD_COMPARATORS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+CompiledGuard = Callable[[Any], bool]  # takes a StateSnapshot, or a PackedState when compiled with a layout
+_GuardTerm = Callable[[Any], Any]
+
+
 class GuardEvaluator:
-    def __init__(self, state_decl: Dict[str, StateDeclaration]):
-        self.state_decl = state_decl
+    """Compiles guard expressions into reusable closures.
+
+    Each distinct expression is normalized, parsed and validated once; the resulting
+    callable is cached and evaluated directly against states afterwards. Without a
+    layout, closures read `StateSnapshot` dicts; with one, they read packed states.
+    """
 
-    def evaluate(self, expr: str, current_state: StateSnapshot) -> bool:
+    def __init__(self, state_decl: Dict[str, StateDeclaration], layout: StateLayout | None = None):
+        self.state_decl = state_decl
+        self.layout = layout
+        self._compiled: Dict[str, CompiledGuard] = {}
+        self._variables: Dict[str, FrozenSet[str]] = {}
+
+    def evaluate(self, expr: str, current_state: StateSnapshot | PackedState) -> bool:
+        return self.compile(expr)(current_state)
+
+    def compile(self, expr: str) -> CompiledGuard:
+        """Return the cached closure for `expr`, compiling it on first use.
+
+        Raises:
+            GuardEvaluationError: if the expression is malformed or references undeclared vars.
+        """
+        compiled = self._compiled.get(expr)
+        if compiled is None:
+            compiled = self._compile(expr)
+            self._compiled[expr] = compiled
+        return compiled
+
+    def variables(self, expr: str) -> FrozenSet[str]:
+        """Return the state variables read by `expr` (compiling it if needed)."""
+        self.compile(expr)
+        return self._variables[expr]
+
+    def _compile(self, expr: str) -> CompiledGuard:
         normalized = expr.replace("&&", " and ").replace("||", " or ")
         normalized = re.sub(r"!(?!=)", " not ", normalized)
         normalized = re.sub(r"\btrue\b", "True", normalized, flags=re.IGNORECASE)
         normalized = re.sub(r"\bfalse\b", "False", normalized, flags=re.IGNORECASE)
 
         try:
-            tree = ast.parse(normalized, mode="eval")
+            tree = ast.parse(normalized.strip(), mode="eval")
         except SyntaxError as exc:
             raise GuardEvaluationError(f"Invalid guard syntax: {expr}") from exc
 
-        allowed_nodes = (
-            ast.Expression,
-            ast.BoolOp,
-            ast.BinOp,
-            ast.UnaryOp,
-            ast.Compare,
-            ast.Name,
-            ast.Constant,
-            ast.Load,
-            ast.And,
-            ast.Or,
-            ast.Not,
-            ast.Eq,
-            ast.NotEq,
-            ast.Lt,
-            ast.LtE,
-            ast.Gt,
-            ast.GtE,
-        )
-
         for node in ast.walk(tree):
-            if not isinstance(node, allowed_nodes):
+            if not isinstance(node, _GUARD_ALLOWED_NODES):
                 raise GuardEvaluationError(f"Unsupported syntax in guard: {expr}")
-            if isinstance(node, ast.Call):
-                raise GuardEvaluationError("Function calls not allowed in guards")
-            if isinstance(node, ast.Attribute):
-                raise GuardEvaluationError("Attributes not allowed in guards")
-
-        def _eval(node: ast.AST) -> Any:
-            if isinstance(node, ast.Expression):
-                return _eval(node.body)
-            if isinstance(node, ast.BoolOp):
-                values = [_eval(v) for v in node.values]
-                if isinstance(node.op, ast.And):
-                    return all(values)
-                if isinstance(node.op, ast.Or):
-                    return any(values)
-            if isinstance(node, ast.UnaryOp):
-                operand = _eval(node.operand)
-                if isinstance(node.op, ast.Not):
-                    return not operand
+
+        term = self._compile_term(tree, expr)
+        self._variables[expr] = frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+
+        def guard(current_state: StateSnapshot | PackedState) -> bool:
+            try:
+                result = term(current_state)
+            except KeyError as exc:
+                raise GuardEvaluationError(f"Unknown variable in guard: {exc.args[0]}") from exc
+            if not isinstance(result, bool):
+                raise GuardEvaluationError("Guard did not evaluate to a boolean")
+            return result
+
+        return guard
+
+    def _compile_term(self, node: ast.AST, expr: str) -> _GuardTerm:
+        if isinstance(node, ast.Expression):
+            return self._compile_term(node.body, expr)
+        if isinstance(node, ast.BoolOp):
+            operands = tuple(self._compile_term(value, expr) for value in node.values)
+            if isinstance(node.op, ast.And):
+                return lambda state: all(operand(state) for operand in operands)
+            if isinstance(node.op, ast.Or):
+                return lambda state: any(operand(state) for operand in operands)
+        if isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, ast.Not):
                 raise GuardEvaluationError("Unsupported unary operator")
-            if isinstance(node, ast.Compare):
-                left = _eval(node.left)
-                for op, comparator in zip(node.ops, node.comparators):
-                    right = _eval(comparator)
-                    if isinstance(op, ast.Eq):
-                        ok = left == right
-                    elif isinstance(op, ast.NotEq):
-                        ok = left != right
-                    elif isinstance(op, ast.Lt):
-                        ok = left < right
-                    elif isinstance(op, ast.LtE):
-                        ok = left <= right
-                    elif isinstance(op, ast.Gt):
-                        ok = left > right
-                    elif isinstance(op, ast.GtE):
-                        ok = left >= right
-                    else:
-                        raise GuardEvaluationError("Unsupported comparison")
-                    if not ok:
-                        return False
-                    left = right
-                return True
-            if isinstance(node, ast.Name):
-                if node.id not in current_state:
-                    raise GuardEvaluationError(f"Unknown variable in guard: {node.id}")
-                return current_state[node.id]
-            if isinstance(node, ast.Constant):
-                return node.value
-            raise GuardEvaluationError(f"Unsupported syntax in guard: {expr}")
-
-        result = _eval(tree)
-        if not isinstance(result, bool):
-            raise GuardEvaluationError("Guard did not evaluate to a boolean")
-        return result
+            inner = self._compile_term(node.operand, expr)
+            return lambda state: not inner(state)
+        if isinstance(node, ast.Compare):
+            return self._compile_compare(node, expr)
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name not in self.state_decl:
+                raise GuardEvaluationError(f"Unknown variable in guard: {name}")
+            if self.layout is not None:
+                return self.layout.getter(name)
+            return operator.itemgetter(name)
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda state: value
+        raise GuardEvaluationError(f"Unsupported syntax in guard: {expr}")
+
+    def _compile_compare(self, node: ast.Compare, expr: str) -> _GuardTerm:
+        terms = [self._compile_term(node.left, expr)]
+        comparators: List[Callable[[Any, Any], bool]] = []
+        for op, comparator in zip(node.ops, node.comparators):
+            compare = _GUARD_COMPARATORS.get(type(op))
+            if compare is None:
+                raise GuardEvaluationError("Unsupported comparison")
+            comparators.append(compare)
+            terms.append(self._compile_term(comparator, expr))
+
+        if len(comparators) == 1:
+            compare = comparators[0]
+            left, right = terms
+            return lambda state: bool(compare(left(state), right(state)))
+
+        chain = tuple(zip(comparators, terms[1:]))
+        first = terms[0]
+
+        def compare_chain(state: Any) -> bool:
+            left_value = first(state)
+            for compare_op, right_term in chain:
+                right_value = right_term(state)
+                if not compare_op(left_value, right_value):
+                    return False
+                left_value = right_value
+            return True
+
+        return compare_chain
+
+
+def compile_guards(doc: StoryDocument, evaluator: GuardEvaluator | None = None) -> Dict[str, CompiledGuard]:
+    """Compile every guard declared in `doc` so malformed expressions fail before expansion.
+
+    Args:
+        doc: Validated story document.
+        evaluator: Evaluator whose cache should be filled; a fresh one is created if omitted.
+
+    Returns:
+        Mapping of guard expression to its compiled closure.
+
+    Raises:
+        ExpansionError: naming the first node/choice whose guard does not compile.
+    """
+    guard_evaluator = evaluator or GuardEvaluator(doc.state)
+    compiled: Dict[str, CompiledGuard] = {}
+    for node in doc.nodes:
+        for choice in node.choices:
+            if not choice.guard:
+                continue
+            try:
+                compiled[choice.guard] = guard_evaluator.compile(choice.guard)
+            except GuardEvaluationError as exc:
+                raise ExpansionError(f"Guard error in node '{node.id}', choice '{choice.id}': {exc}") from exc
+    return compiled
+
+
+CompiledEffects = Callable[[PackedState], PackedState]
+
+
+def _unchanged_state(packed: PackedState) -> PackedState:
+    return packed
 
 
 class EffectApplier:
-    def __init__(self, state_decl: Dict[str, StateDeclaration]):
+    def __init__(self, state_decl: Dict[str, StateDeclaration], layout: StateLayout | None = None):
         self.state_decl = state_decl
+        self.layout = layout or StateLayout(state_decl)
 
     def apply(self, effects: List[Effect], state: StateSnapshot) -> StateSnapshot:
         new_state = dict(state)
         for eff in effects:
-            if eff.var not in self.state_decl:
-                raise EffectApplicationError(f"Effect references unknown var '{eff.var}'")
-            decl = self.state_decl[eff.var]
-            current = new_state[eff.var]
-            if isinstance(decl, StateInt):
-                updated = self._apply_int_effect(eff, current)
-                if not (decl.min <= updated <= decl.max):
-                    raise EffectApplicationError(f"Value {updated} out of bounds for '{eff.var}'")
-                new_state[eff.var] = updated
-            elif isinstance(decl, StateBool):
-                if eff.op != "=":
-                    raise EffectApplicationError(f"Bool var '{eff.var}' only supports '='")
-                if not isinstance(eff.value, bool):
-                    raise EffectApplicationError(f"Bool var '{eff.var}' requires boolean value")
-                new_state[eff.var] = eff.value
-            elif isinstance(decl, StateEnum):
-                if eff.op != "=":
-                    raise EffectApplicationError(f"Enum var '{eff.var}' only supports '='")
-                if eff.value not in decl.values:
-                    raise EffectApplicationError(f"Enum var '{eff.var}' value '{eff.value}' not in {decl.values}")
-                new_state[eff.var] = eff.value
+            decl = self._declaration(eff)
+            new_state[eff.var] = self._resolve(eff, decl, new_state[eff.var])
         return new_state
 
+    def compile(self, effects: List[Effect]) -> CompiledEffects:
+        """Validate `effects` once and build a packed-state transition function.
+
+        Var existence, declaration type, op and value type are checked here; the returned
+        function only does digit arithmetic plus a bounds check per effect.
+
+        Raises:
+            EffectApplicationError: if an effect can never be applied.
+        """
+        steps = [self._compile_step(eff) for eff in effects]
+        if not steps:
+            return _unchanged_state
+        if len(steps) == 1:
+            return steps[0]
+        program = tuple(steps)
+
+        def apply_all(packed: PackedState) -> PackedState:
+            for step in program:
+                packed = step(packed)
+            return packed
+
+        return apply_all
+
+    def _compile_step(self, eff: Effect) -> CompiledEffects:
+        decl = self._declaration(eff)
+        slot = self.layout.slots[eff.var]
+        stride, radix, var = slot.stride, slot.radix, eff.var
+        if isinstance(decl, StateInt):
+            if not isinstance(eff.value, int):
+                raise EffectApplicationError(f"Int var '{eff.var}' requires integer value")
+            if eff.op == "=":
+                return self._assign_step(eff.value - decl.min, f"Value {eff.value} out of bounds for '{var}'", stride, radix)
+            if eff.op not in ("+=", "-="):
+                raise EffectApplicationError(f"Unsupported op '{eff.op}' for int var '{eff.var}'")
+            delta = eff.value if eff.op == "+=" else -eff.value
+            offset = decl.min
+
+            def add_step(packed: PackedState) -> PackedState:
+                digit = (packed // stride) % radix + delta
+                if not 0 <= digit < radix:
+                    raise EffectApplicationError(f"Value {digit + offset} out of bounds for '{var}'")
+                return packed + delta * stride
+
+            return add_step
+        value = self._resolve(eff, decl, None)
+        return self._assign_step(self.layout.digit(var, value), "", stride, radix)
+
+    def _assign_step(self, digit: int, out_of_bounds: str, stride: int, radix: int) -> CompiledEffects:
+        if not 0 <= digit < radix:
+
+            def fail_step(packed: PackedState) -> PackedState:
+                raise EffectApplicationError(out_of_bounds)
+
+            return fail_step
+        return lambda packed: packed + (digit - (packed // stride) % radix) * stride
+
+    def _declaration(self, eff: Effect) -> StateDeclaration:
+        if eff.var not in self.state_decl:
+            raise EffectApplicationError(f"Effect references unknown var '{eff.var}'")
+        return self.state_decl[eff.var]
+
+    def _resolve(self, eff: Effect, decl: StateDeclaration, current: Any) -> Any:
+        if isinstance(decl, StateInt):
+            updated = self._apply_int_effect(eff, current)
+            if not (decl.min <= updated <= decl.max):
+                raise EffectApplicationError(f"Value {updated} out of bounds for '{eff.var}'")
+            return updated
+        if isinstance(decl, StateBool):
+            if eff.op != "=":
+                raise EffectApplicationError(f"Bool var '{eff.var}' only supports '='")
+            if not isinstance(eff.value, bool):
+                raise EffectApplicationError(f"Bool var '{eff.var}' requires boolean value")
+            return eff.value
+        if eff.op != "=":
+            raise EffectApplicationError(f"Enum var '{eff.var}' only supports '='")
+        if eff.value not in decl.values:
+            raise EffectApplicationError(f"Enum var '{eff.var}' value '{eff.value}' not in {decl.values}")
+        return eff.value
+
     def _apply_int_effect(self, eff: Effect, current: int) -> int:
         if not isinstance(eff.value, int):
             raise EffectApplicationError(f"Int var '{eff.var}' requires integer value")
@@ -176,53 +337,216 @@ class EffectApplier:
         raise EffectApplicationError(f"Unsupported op '{eff.op}' for int var '{eff.var}'")
 
 
+ExpansionVisit = Tuple[int, int, List[Tuple[int, int, str | None]]]
+FrontierOrder = Literal["bfs", "dfs", "priority"]
+FrontierItem = Tuple[str, PackedState, int]  # logical id, packed state, physical id
+PriorityKey = Callable[[str, StateSnapshot], Any]
+FrontierKey = Callable[[str, PackedState], Any]
+
+
+class Frontier(Protocol):
+    """Work list of discovered-but-unprocessed physical nodes."""
+
+    def push(self, item: FrontierItem) -> None: ...
+
+    def pop(self) -> FrontierItem: ...
+
+    def __len__(self) -> int: ...
+
+
+class FifoFrontier:
+    """Breadth-first frontier backed by a deque (O(1) push and pop)."""
+
+    def __init__(self) -> None:
+        self._items: Deque[FrontierItem] = deque()
+
+    def push(self, item: FrontierItem) -> None:
+        self._items.append(item)
+
+    def pop(self) -> FrontierItem:
+        return self._items.popleft()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class LifoFrontier:
+    """Depth-first frontier backed by a list used as a stack."""
+
+    def __init__(self) -> None:
+        self._items: List[FrontierItem] = []
+
+    def push(self, item: FrontierItem) -> None:
+        self._items.append(item)
+
+    def pop(self) -> FrontierItem:
+        return self._items.pop()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class PriorityFrontier:
+    """Best-first frontier ordered by `key(logical_id, packed_state)`; ties pop in discovery order."""
+
+    def __init__(self, key: FrontierKey) -> None:
+        self.key = key
+        self._heap: List[Tuple[Any, int, FrontierItem]] = []
+
+    def push(self, item: FrontierItem) -> None:
+        node_id, state, pid = item
+        heapq.heappush(self._heap, (self.key(node_id, state), pid, item))
+
+    def pop(self) -> FrontierItem:
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+def make_frontier(order: FrontierOrder = "bfs", priority_key: FrontierKey | None = None) -> Frontier:
+    """Build the frontier implementation for the requested expansion order.
+
+    Physical ids are assigned at discovery time, so any order yields deterministic ids;
+    only "bfs" reproduces the historical numbering.
+    """
+    if order == "bfs":
+        return FifoFrontier()
+    if order == "dfs":
+        return LifoFrontier()
+    if order == "priority":
+        if priority_key is None:
+            raise ExpansionError("Priority frontier requires a priority_key")
+        return PriorityFrontier(priority_key)
+    raise ExpansionError(f"Unknown frontier order '{order}'")
+
+
+@dataclass
+class CompiledChoice:
+    """A menu/branch choice with its guard closure and (lazily built) effect program."""
+
+    choice: Choice
+    guard: CompiledGuard | None
+    effects: CompiledEffects | None = None
+
+
 class StoryExpander:
-    def __init__(self, doc: StoryDocument, max_states: int = 5000):
+    def __init__(
+        self,
+        doc: StoryDocument,
+        max_states: int = 5000,
+        frontier: FrontierOrder = "bfs",
+        priority_key: PriorityKey | None = None,
+        collapse_dead_state: bool = True,
+    ):
         self.doc = doc
         self.max_states = max_states
-        self.logical_map = {n.id: n for n in doc.nodes}
-        self.guard = GuardEvaluator(doc.state)
-        self.effects = EffectApplier(doc.state)
+        self.collapse_dead_state = collapse_dead_state
+        self.frontier_order = frontier
+        self.priority_key = priority_key
+        self.logical_map = doc.node_map
+        self.logical_nodes = list(self.logical_map.values())
+        self.logical_index = {node_id: index for index, node_id in enumerate(self.logical_map)}
+        self.layout = StateLayout(doc.state)
+        self.guard = GuardEvaluator(doc.state, layout=self.layout)
+        self.effects = EffectApplier(doc.state, layout=self.layout)
         self.initial_state_builder = InitialStateBuilder(doc)
+        self._compiled_choices: Dict[str, List[CompiledChoice]] = {}
+        self._projectors: Dict[str, Callable[[PackedState], int]] = {}
+        self._transition_cache: Dict[int, List[Tuple[str, str | None, int]]] = {}
+        self._canonicalizers: Dict[str, Callable[[PackedState], PackedState] | None] = {}
+        self.stats = ExpansionStats()
 
     def expand(self) -> ExpansionResult:
-        if self.doc.story.start_node not in self.logical_map:
-            raise ExpansionError("start_node does not exist in nodes")
-
-        initial_state = self.initial_state_builder.build()
-        start_key = self._state_key(self.doc.story.start_node, initial_state)
-        queue: List[Tuple[str, StateSnapshot, int]] = [(self.doc.story.start_node, initial_state, 0)]
-        assigned_ids: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], int] = {start_key: 0}
         nodes_by_id: Dict[int, PhysicalNode] = {}
         edges: List[Edge] = []
+        for pid, key, targets in self.walk():
+            node = self.physical_node(pid, key)
+            for target_pid, target_key, label in targets:
+                edges.append(Edge(source=pid, target=target_pid, label=label))
+                node.outgoing.append(target_pid)
+            nodes_by_id[pid] = node
+
+        physical_nodes = [nodes_by_id[i] for i in sorted(nodes_by_id)]
+        return self.build_result(physical_nodes, edges)
+
+    def iter_expand(self) -> Iterator[PhysicalNode | Edge]:
+        """Yield each physical node (with its outgoing ids) followed by its edges, as discovered.
+
+        Only the dedup table and the frontier are kept in memory; consumers decide what to retain.
+        """
+        for pid, key, targets in self.walk():
+            node = self.physical_node(pid, key)
+            node.outgoing = [target_pid for target_pid, target_key, label in targets]
+            yield node
+            for target_pid, target_key, label in targets:
+                yield Edge(source=pid, target=target_pid, label=label)
+
+    def summarize(self) -> ExpansionSummary:
+        """Single-pass validation summary that never materializes the physical graph."""
+        seen_logical: set[int] = set()
+        summary = ExpansionSummary()
+        size = self.layout.size
+        for pid, key, targets in self.walk():
+            seen_logical.add(key // size)
+            summary.node_count += 1
+            summary.edge_count += len(targets)
+            if not targets:
+                summary.dead_ends.append(pid)
+        summary.dead_ends.sort()
+        summary.unreachable_logical = [node.id for index, node in enumerate(self.logical_nodes) if index not in seen_logical]
+        summary.stats = self.stats
+        return summary
+
+    def walk(self) -> Iterator[ExpansionVisit]:
+        """Core expansion loop yielding `(physical_id, state_key, [(target_id, target_key, label)])` per node."""
+        start_key = self.start_key()
+        self.stats = ExpansionStats()
+        start_id, initial_state = divmod(start_key, self.layout.size)
+        queue = make_frontier(self.frontier_order, self._frontier_key())
+        queue.push((self.logical_nodes[start_id].id, initial_state, 0))
+        assigned_ids: Dict[int, int] = {start_key: 0}
+        processed = 0
         next_id = 1
 
         while queue:
-            node_id, state, pid = queue.pop(0)
-            if pid in nodes_by_id:
-                continue
-            if len(nodes_by_id) >= self.max_states:
+            node_id, state, pid = queue.pop()
+            if processed >= self.max_states:
                 raise ExpansionError(f"Reached max_states ({self.max_states}) during expansion")
+            processed += 1
 
             logical_node: StoryNode = self.logical_map[node_id]
-            nodes_by_id[pid] = PhysicalNode(physical_id=pid, logical_id=node_id, kind=logical_node.kind, state=state)
-
-            outgoing = self._collect_outgoing(logical_node, state)
-            for target_id, label, next_state in outgoing:
+            targets: List[Tuple[int, int, str | None]] = []
+            for target_id, label, next_state in self._transitions(logical_node, state):
                 if target_id not in self.logical_map:
                     raise ExpansionError(f"Node '{node_id}' references unknown target '{target_id}'")
                 next_key = self._state_key(target_id, next_state)
-                if next_key in assigned_ids:
-                    target_pid = assigned_ids[next_key]
-                else:
+                target_pid = assigned_ids.get(next_key)
+                if target_pid is None:
                     target_pid = next_id
                     assigned_ids[next_key] = target_pid
-                    queue.append((target_id, next_state, target_pid))
+                    queue.push((target_id, next_state, target_pid))
                     next_id += 1
-                edges.append(Edge(source=pid, target=target_pid, label=label))
-                nodes_by_id[pid].outgoing.append(target_pid)
+                targets.append((target_pid, next_key, label))
+            yield pid, self._state_key(node_id, state), targets
 
-        physical_nodes = [nodes_by_id[i] for i in sorted(nodes_by_id)]
+    def start_key(self) -> int:
+        """Validate the story guards and return the state key of the start node."""
+        if self.doc.story.start_node not in self.logical_map:
+            raise ExpansionError("start_node does not exist in nodes")
+        compile_guards(self.doc, self.guard)
+        initial_state = self._initial_packed_state()
+        if self.collapse_dead_state and not self._canonicalizers:
+            live = live_variables(self.doc, self.guard.variables)
+            self._canonicalizers = {node_id: self.layout.canonicalizer(names, initial_state) for node_id, names in live.items()}
+        return self._state_key(self.doc.story.start_node, self._canonical(self.doc.story.start_node, initial_state))
+
+    def physical_node(self, physical_id: int, key: int) -> PhysicalNode:
+        logical_index, state = divmod(key, self.layout.size)
+        node = self.logical_nodes[logical_index]
+        return PhysicalNode(physical_id=physical_id, logical_id=node.id, kind=node.kind, state=self.layout.decode(state))
+
+    def build_result(self, physical_nodes: List[PhysicalNode], edges: List[Edge]) -> ExpansionResult:
         reachable_logical = {node.logical_id for node in physical_nodes}
         unreachable = [nid for nid in self.logical_map if nid not in reachable_logical]
         dead_ends = [node.physical_id for node in physical_nodes if not node.outgoing]
@@ -232,23 +556,74 @@ class StoryExpander:
             edges=edges,
             unreachable_logical=unreachable,
             dead_ends=dead_ends,
+            stats=self.stats,
         )
 
-    def _collect_outgoing(self, node: StoryNode, state: StateSnapshot) -> List[Tuple[str, str | None, StateSnapshot]]:
-        outgoing_targets: List[Tuple[str, str | None, StateSnapshot]] = []
+    def _initial_packed_state(self) -> PackedState:
+        try:
+            return self.layout.encode(self.initial_state_builder.build())
+        except StateLayoutError as exc:
+            raise ExpansionError(f"Invalid initial state: {exc}") from exc
+
+    def _frontier_key(self) -> FrontierKey | None:
+        priority_key = self.priority_key
+        if priority_key is None:
+            return None
+        decode = self.layout.decode
+        return lambda node_id, packed: priority_key(node_id, decode(packed))
+
+    def _transitions(self, node: StoryNode, state: PackedState) -> List[Tuple[str, str | None, PackedState]]:
+        """Memoized `_collect_outgoing`, keyed by the node and the state projected on the vars it reads.
+
+        Guards and effects of a node only look at (and write) its read set, so two states that
+        agree on it take the same choices and receive the same digit deltas.
+        """
+        projector = self._projectors.get(node.id)
+        if projector is None:
+            projector = self._projectors[node.id] = self.layout.projector(self._read_set(node))
+        key = self.logical_index[node.id] * self.layout.size + projector(state)
+        cached = self._transition_cache.get(key)
+        if cached is None:
+            self.stats.transition_cache_misses += 1
+            outgoing = self._collect_outgoing(node, state)
+            cached = self._transition_cache[key] = [(target_id, label, next_state - state) for target_id, label, next_state in outgoing]
+        else:
+            self.stats.transition_cache_hits += 1
+        return [(target_id, label, self._canonical(target_id, state + delta)) for target_id, label, delta in cached]
+
+    def _canonical(self, node_id: str, state: PackedState) -> PackedState:
+        """Reset variables that are dead on entry to `node_id` (see `live_variables`) to their initial value."""
+        canonicalize = self._canonicalizers.get(node_id)
+        return state if canonicalize is None else canonicalize(state)
+
+    def _read_set(self, node: StoryNode) -> FrozenSet[str]:
+        names: set[str] = set()
+        for choice in node.choices:
+            if choice.guard:
+                names |= self.guard.variables(choice.guard)
+            names.update(eff.var for eff in choice.effects)
+        return frozenset(names)
+
+    def _collect_outgoing(self, node: StoryNode, state: PackedState) -> List[Tuple[str, str | None, PackedState]]:
+        outgoing_targets: List[Tuple[str, str | None, PackedState]] = []
         if node.kind == "story":
             if node.target:
                 outgoing_targets.append((node.target, None, state))
         elif node.kind in ("menu", "branch"):
-            for choice in node.choices:
+            for compiled in self._choices_of(node):
+                choice = compiled.choice
                 try:
-                    guard_ok = True if not choice.guard else self.guard.evaluate(choice.guard, state)
+                    guard_ok = True if compiled.guard is None else compiled.guard(state)
                 except GuardEvaluationError as exc:
                     raise ExpansionError(f"Guard error in node '{node.id}', choice '{choice.id}': {exc}") from exc
                 if not guard_ok:
                     continue
                 try:
-                    next_state = self.effects.apply(choice.effects, state)
+                    program = compiled.effects
+                    if program is None:
+                        # Compiled on first use so effect errors surface exactly when they used to.
+                        program = compiled.effects = self.effects.compile(choice.effects)
+                    next_state = program(state)
                 except EffectApplicationError as exc:
                     raise ExpansionError(f"Effect error in node '{node.id}', choice '{choice.id}': {exc}") from exc
                 outgoing_targets.append((choice.target, choice.id, next_state))
@@ -260,10 +635,40 @@ class StoryExpander:
                 outgoing_targets.append((opt.target, "random", state))
         return outgoing_targets
 
-    def _state_key(self, node_id: str, state: StateSnapshot) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
-        return node_id, tuple(sorted(state.items()))
+    def _choices_of(self, node: StoryNode) -> List[CompiledChoice]:
+        compiled = self._compiled_choices.get(node.id)
+        if compiled is None:
+            compiled = [CompiledChoice(choice=choice, guard=self.guard.compile(choice.guard) if choice.guard else None) for choice in node.choices]
+            self._compiled_choices[node.id] = compiled
+        return compiled
+
+    def _state_key(self, node_id: str, state: PackedState) -> int:
+        return self.logical_index[node_id] * self.layout.size + state
+
+
+def expand_story(
+    doc: StoryDocument,
+    max_states: int = 5000,
+    frontier: FrontierOrder = "bfs",
+    priority_key: PriorityKey | None = None,
+    collapse_dead_state: bool = True,
+) -> ExpansionResult:
+    """Expand `doc` into its physical (node, state) graph.
+
+    With `collapse_dead_state`, variables that are dead at a node are reset to their
+    initial value before deduplication, so `PhysicalNode.state` only reports live
+    variables faithfully; pass False to keep the exact reached values.
+    """
+    expander = StoryExpander(doc, max_states=max_states, frontier=frontier, priority_key=priority_key, collapse_dead_state=collapse_dead_state)
+    return expander.expand()
 
 
-def expand_story(doc: StoryDocument, max_states: int = 5000) -> ExpansionResult:
-    expander = StoryExpander(doc, max_states=max_states)
-    return expander.expand()
+def iter_expand(
+    doc: StoryDocument,
+    max_states: int = 5000,
+    frontier: FrontierOrder = "bfs",
+    priority_key: PriorityKey | None = None,
+    collapse_dead_state: bool = True,
+) -> Iterator[PhysicalNode | Edge]:
+    expander = StoryExpander(doc, max_states=max_states, frontier=frontier, priority_key=priority_key, collapse_dead_state=collapse_dead_state)
+    return expander.iter_expand()
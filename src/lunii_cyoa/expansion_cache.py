@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+from .content_store import CacheStats, ContentStore
+from .expansion import expand_story
+from .models import StoryDocument
+from .state_layout import StateLayout
+from .structures import Edge, ExpansionResult, PhysicalNode
+
+_MAGIC = b"LCYX"
+_FORMAT_VERSION = 1
+# magic, version, state width in bytes, node count, edge count, string table length
+_HEADER = struct.Struct("<4sBBIII")
+
+
+class ExpansionCacheError(Exception):
+    """Raised when a cached expansion cannot be decoded."""
+
+
+def story_digest(doc: StoryDocument, **options: object) -> str:
+    """Canonical SHA-256 of a validated document plus the expansion options.
+
+    Mappings are serialized with sorted keys, so formatting and table order in the
+    TOML source do not matter; the order of state declarations does, as it fixes the
+    packed state layout, and is hashed explicitly.
+    """
+    payload = {
+        "format": _FORMAT_VERSION,
+        "doc": doc.model_dump(mode="json"),
+        "state_order": list(doc.state),
+        "options": options,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _u32(values: List[int]) -> bytes:
+    return struct.pack(f"<{len(values)}I", *values)
+
+
+def _read_u32(payload: memoryview, offset: int, count: int) -> List[int]:
+    return list(struct.unpack_from(f"<{count}I", payload, offset))
+
+
+def encode_expansion(result: ExpansionResult, layout: StateLayout) -> bytes:
+    """Serialize `result` as interned strings plus little-endian CSR tables, zlib-compressed.
+
+    Layout: header, JSON string table (logical ids, labels, unreachable ids), then u32
+    columns node_ids, node_logical, offsets (n + 1), targets, edge_labels, followed by
+    the packed states as fixed-width little-endian integers.
+    """
+    strings: List[str | None] = []
+    index_of: Dict[str | None, int] = {}
+
+    def intern(value: str | None) -> int:
+        if value not in index_of:
+            index_of[value] = len(strings)
+            strings.append(value)
+        return index_of[value]
+
+    labels: Dict[int, List[str | None]] = {}
+    for edge in result.edges:
+        labels.setdefault(edge.source, []).append(edge.label)
+    node_ids: List[int] = []
+    node_logical: List[int] = []
+    offsets = [0]
+    targets: List[int] = []
+    edge_labels: List[int] = []
+    for node in result.physical_nodes:
+        node_ids.append(node.physical_id)
+        node_logical.append(intern(node.logical_id))
+        targets.extend(node.outgoing)
+        edge_labels.extend(intern(label) for label in labels.get(node.physical_id, []))
+        offsets.append(len(targets))
+    width = max(1, ((layout.size - 1).bit_length() + 7) // 8)
+    states = b"".join(layout.encode(node.state).to_bytes(width, "little") for node in result.physical_nodes)
+    table = json.dumps({"strings": strings, "unreachable": result.unreachable_logical}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, width, len(node_ids), len(targets), len(table))
+    body = table + _u32(node_ids) + _u32(node_logical) + _u32(offsets) + _u32(targets) + _u32(edge_labels) + states
+    return header + zlib.compress(body, 6)
+
+
+def decode_expansion(data: bytes, doc: StoryDocument) -> ExpansionResult:
+    """Inverse of `encode_expansion`; kinds and state names come from `doc`."""
+    if len(data) < _HEADER.size:
+        raise ExpansionCacheError("Truncated expansion cache entry")
+    magic, version, width, node_count, edge_count, table_length = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ExpansionCacheError("Not an expansion cache entry of a supported version")
+    try:
+        body = memoryview(zlib.decompress(data[_HEADER.size :]))
+    except zlib.error as exc:
+        raise ExpansionCacheError(f"Corrupt expansion cache entry: {exc}") from exc
+    expected = table_length + 4 * (3 * node_count + 1 + 2 * edge_count) + width * node_count
+    if len(body) != expected:
+        raise ExpansionCacheError("Corrupt expansion cache entry: unexpected size")
+
+    table = json.loads(bytes(body[:table_length]).decode("utf-8"))
+    strings: List[str | None] = table["strings"]
+    offset = table_length
+    columns: List[List[int]] = []
+    for count in (node_count, node_count, node_count + 1, edge_count, edge_count):
+        columns.append(_read_u32(body, offset, count))
+        offset += 4 * count
+    node_ids, node_logical, offsets, targets, edge_labels = columns
+
+    layout = StateLayout(doc.state)
+    node_map = doc.node_map
+    physical_nodes: List[PhysicalNode] = []
+    edges: List[Edge] = []
+    for row, physical_id in enumerate(node_ids):
+        start = offset + row * width
+        state = layout.decode(int.from_bytes(body[start : start + width], "little"))
+        logical_id = strings[node_logical[row]]
+        if logical_id is None:
+            raise ExpansionCacheError("Corrupt expansion cache entry: node without a logical id")
+        outgoing = targets[offsets[row] : offsets[row + 1]]
+        physical_nodes.append(PhysicalNode(physical_id=physical_id, logical_id=logical_id, kind=node_map[logical_id].kind, state=state, outgoing=outgoing))
+        for edge_index in range(offsets[row], offsets[row + 1]):
+            edges.append(Edge(source=physical_id, target=targets[edge_index], label=strings[edge_labels[edge_index]]))
+    return ExpansionResult(
+        physical_nodes=physical_nodes,
+        edges=edges,
+        unreachable_logical=table["unreachable"],
+        dead_ends=[node.physical_id for node in physical_nodes if not node.outgoing],
+    )
+
+
+class ExpansionCache:
+    """Persistent, content-addressed cache of `expand_story` results.
+
+    Entries are keyed by `story_digest(doc, max_states=..., collapse_dead_state=...)`,
+    so any change to the validated document or the options misses. Storage, atomic
+    publication and LRU eviction are handled by `ContentStore`.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.store = ContentStore(root, max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+    def get(self, doc: StoryDocument, max_states: int = 5000, collapse_dead_state: bool = True) -> ExpansionResult | None:
+        key = story_digest(doc, max_states=max_states, collapse_dead_state=collapse_dead_state)
+        data = self.store.get(key, count=False)
+        result = None
+        if data is not None:
+            try:
+                result = decode_expansion(data, doc)
+            except (ExpansionCacheError, KeyError, IndexError, ValueError):
+                self.store.discard(key)
+        self.stats.record(result is not None)
+        return result
+
+    def put(self, doc: StoryDocument, result: ExpansionResult, max_states: int = 5000, collapse_dead_state: bool = True) -> Path:
+        key = story_digest(doc, max_states=max_states, collapse_dead_state=collapse_dead_state)
+        return self.store.put(key, encode_expansion(result, StateLayout(doc.state)))
+
+    def expand(self, doc: StoryDocument, max_states: int = 5000, collapse_dead_state: bool = True) -> ExpansionResult:
+        """Return the cached expansion of `doc`, expanding and storing it on a miss."""
+        cached = self.get(doc, max_states=max_states, collapse_dead_state=collapse_dead_state)
+        if cached is not None:
+            return cached
+        result = expand_story(doc, max_states=max_states, collapse_dead_state=collapse_dead_state)
+        self.put(doc, result, max_states=max_states, collapse_dead_state=collapse_dead_state)
+        return result
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
-import shutil
+import json
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
-from uuid import uuid4
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+from uuid import NAMESPACE_URL, UUID, uuid5
 
-from .expansion import expand_story
+from .assets import AssetCopyReport, copy_assets
+from .content_store import atomic_write
+from .expansion import StoryExpander, expand_story
+from .expansion_cache import ExpansionCache
+from .image_convert import DEFAULT_IMAGE_TARGET, ImageConvertReport, ImageTarget, convert_images
 from .loader import load_story
-from .models import StoryDocument
-from .structures import ExpansionResult
+from .minimize import minimize_expansion
+from .models import StoryDocument, StoryNode
+from .structures import ExpansionResult, PhysicalNode
+from .studio_json import JsonBackend, StudioJsonWriter
 from pkg.api.studio_builder import ActionNodeSpec, StageNodeSpec, StudioStoryBuilder
 from pkg.api.stories import StudioStory
 
@@ -17,17 +24,105 @@ class ExportError(Exception):
     """Raised when export to Studio format fails."""
 
 
+@dataclass
+class ExportReport:
+    """Counters collected by the last `StudioExporter.export` call."""
+
+    physical_nodes: int = 0
+    stage_nodes: int = 0
+    action_nodes: int = 0
+    action_references: int = 0
+    expansion_cached: bool = False
+    assets: AssetCopyReport = field(default_factory=AssetCopyReport)
+    images: ImageConvertReport = field(default_factory=ImageConvertReport)
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of expanded physical nodes merged away before export."""
+        if not self.physical_nodes:
+            return 0.0
+        return 1 - self.stage_nodes / self.physical_nodes
+
+    @property
+    def action_dedup_ratio(self) -> float:
+        """Fraction of per-stage action nodes saved by sharing identical option lists."""
+        if not self.action_references:
+            return 0.0
+        return 1 - self.action_nodes / self.action_references
+
+
+def story_namespace(doc: StoryDocument) -> UUID:
+    """UUID namespace of a pack: `story.output_uuid` when set, else derived from `story.id`."""
+    if doc.story.output_uuid:
+        try:
+            return UUID(doc.story.output_uuid)
+        except ValueError:
+            return uuid5(NAMESPACE_URL, doc.story.output_uuid)
+    return uuid5(NAMESPACE_URL, f"lunii-cyoa:{doc.story.id}")
+
+
+def node_uuid(namespace: UUID, role: str, node: PhysicalNode) -> str:
+    """Deterministic UUIDv5 of a stage or action node, from its logical id and canonical state."""
+    canonical_state = json.dumps(node.state, sort_keys=True, separators=(",", ":"))
+    return str(uuid5(namespace, f"{role}:{node.logical_id}:{canonical_state}")).upper()
+
+
+def action_uuid(namespace: UUID, options: Tuple[str, ...]) -> str:
+    """Deterministic UUIDv5 of a shared action node, from its ordered option stage ids."""
+    return str(uuid5(namespace, "action:" + ",".join(options))).upper()
+
+
 class StudioExporter:
-    def __init__(self, story_path: Path, output_dir: Path, copy_assets: bool = True):
+    def __init__(
+        self,
+        story_path: Path,
+        output_dir: Path,
+        copy_assets: bool = True,
+        minimize: bool = True,
+        expansion_cache: ExpansionCache | None = None,
+        asset_workers: int | None = None,
+        link_assets: bool = True,
+        share_action_nodes: bool = True,
+        stream: bool = True,
+        json_indent: int | None = 2,
+        json_backend: JsonBackend = "json",
+        convert_images: bool = False,
+        collapse_dead_state: bool = True,
+    ):
         self.story_path = story_path
         self.output_dir = output_dir
         self.copy_assets = copy_assets
+        self.minimize = minimize
+        self.expansion_cache = expansion_cache
+        self.asset_workers = asset_workers
+        self.link_assets = link_assets
+        self.share_action_nodes = share_action_nodes
+        self.stream = stream
+        self.json_indent = json_indent
+        self.json_backend = json_backend
+        self.convert_images = convert_images
+        self.collapse_dead_state = collapse_dead_state
+        self.report = ExportReport()
 
     def export(self) -> Path:
         doc = load_story(self.story_path)
-        expansion = expand_story(doc)
+        self.report = ExportReport()
+        if self.stream and not self.minimize and self.expansion_cache is None:
+            # Minimization and the expansion cache both need the whole physical graph.
+            return self._export_from_walk(doc)
+        expansion = self._expand(doc)
+        self.report.physical_nodes = len(expansion.physical_nodes)
+        if self.minimize:
+            expansion = minimize_expansion(expansion).expansion
         stage_map = self._build_stage_map(expansion, doc)
-        action_nodes, action_lookup = self._build_action_nodes(expansion, stage_map)
+        action_nodes, action_lookup = self._build_action_nodes(expansion, doc, stage_map)
+        self.report.action_nodes = len(action_nodes)
+        if self.stream:
+            self.report.stage_nodes = self._write_story_streaming(doc, self._iter_stage_nodes(expansion, doc, stage_map, action_lookup), action_nodes)
+            if self.copy_assets:
+                self._copy_assets(doc, self._iter_stage_nodes(expansion, doc, stage_map, action_lookup))
+            return self.output_dir / "story.json"
+
         stage_nodes = self._build_stage_nodes(expansion, doc, stage_map, action_lookup)
         builder = StudioStoryBuilder(
             title=self._primary_title(doc),
@@ -37,72 +132,160 @@ class StudioExporter:
         )
         builder.stage_nodes = stage_nodes
         builder.action_nodes = action_nodes
+        self.report.stage_nodes = len(stage_nodes)
         story = builder.to_studio_story()
         self._write_story(story)
         if self.copy_assets:
             self._copy_assets(doc, stage_nodes)
         return self.output_dir / "story.json"
 
+    def _export_from_walk(self, doc: StoryDocument) -> Path:
+        action_nodes: List[ActionNodeSpec] = []
+        reached: Dict[str, StageNodeSpec] = {}
+        self.report.stage_nodes = self._write_story_streaming(doc, self._walk_stage_nodes(doc, action_nodes, reached), action_nodes)
+        self.report.action_nodes = len(action_nodes)
+        if self.copy_assets:
+            self._copy_assets(doc, reached.values())
+        return self.output_dir / "story.json"
+
+    def _walk_stage_nodes(self, doc: StoryDocument, action_nodes: List[ActionNodeSpec], reached: Dict[str, StageNodeSpec]) -> Iterator[StageNodeSpec]:
+        """Stage nodes straight from the expansion walk, without building an ExpansionResult.
+
+        Only the stage id of every discovered state is kept. Action nodes are appended to
+        `action_nodes` as their stages are produced, so the list is complete once the stage
+        nodes are consumed (`StudioJsonWriter` writes action nodes after them), and the
+        first stage of each logical node is kept in `reached` for asset copying.
+        """
+        namespace = story_namespace(doc)
+        expander = StoryExpander(doc, collapse_dead_state=self.collapse_dead_state)
+        node_map = doc.node_map
+        stage_ids: Dict[int, str] = {}
+        interned: Dict[Tuple[str, ...], str] = {}
+
+        def stage_id(pid: int, key: int) -> str:
+            stage_uuid = stage_ids.get(pid)
+            if stage_uuid is None:
+                stage_uuid = stage_ids[pid] = node_uuid(namespace, "stage", expander.physical_node(pid, key))
+            return stage_uuid
+
+        for pid, key, targets in expander.walk():
+            node = expander.physical_node(pid, key)
+            self.report.physical_nodes += 1
+            action_id = None
+            if targets:
+                options = tuple(stage_id(target_pid, target_key) for target_pid, target_key, label in targets)
+                action_id = self._intern_action(namespace, node, options, action_nodes, interned)
+            stage = self._stage_node(node_map[node.logical_id], stage_id(pid, key), action_id)
+            reached.setdefault(node.logical_id, stage)
+            yield stage
+
+    def _expand(self, doc: StoryDocument) -> ExpansionResult:
+        if self.expansion_cache is None:
+            return expand_story(doc, collapse_dead_state=self.collapse_dead_state)
+        hits = self.expansion_cache.stats.hits
+        expansion = self.expansion_cache.expand(doc, collapse_dead_state=self.collapse_dead_state)
+        self.report.expansion_cached = self.expansion_cache.stats.hits > hits
+        return expansion
+
     def _primary_title(self, doc: StoryDocument) -> str:
         if doc.story.title:
             return next(iter(doc.story.title.values()))
         return doc.story.id
 
     def _build_stage_map(self, expansion: ExpansionResult, doc: StoryDocument) -> Dict[int, str]:
-        return {node.physical_id: str(uuid4()).upper() for node in expansion.physical_nodes}
+        namespace = story_namespace(doc)
+        return {node.physical_id: node_uuid(namespace, "stage", node) for node in expansion.physical_nodes}
 
-    def _build_action_nodes(self, expansion: ExpansionResult, stage_map: Dict[int, str]) -> Tuple[List[ActionNodeSpec], Dict[int, str]]:
+    def _build_action_nodes(self, expansion: ExpansionResult, doc: StoryDocument, stage_map: Dict[int, str]) -> Tuple[List[ActionNodeSpec], Dict[int, str]]:
+        namespace = story_namespace(doc)
         action_nodes: List[ActionNodeSpec] = []
         action_lookup: Dict[int, str] = {}
+        interned: Dict[Tuple[str, ...], str] = {}
         for node in expansion.physical_nodes:
-            if not node.outgoing:
-                continue
-            action_id = str(uuid4()).upper()
-            options = [stage_map[target] for target in node.outgoing]
-            action_nodes.append({"id": action_id, "options": options})
-            action_lookup[node.physical_id] = action_id
+            if node.outgoing:
+                options = tuple(stage_map[target] for target in node.outgoing)
+                action_lookup[node.physical_id] = self._intern_action(namespace, node, options, action_nodes, interned)
         return action_nodes, action_lookup
 
+    def _intern_action(self, namespace: UUID, node: PhysicalNode, options: Tuple[str, ...], action_nodes: List[ActionNodeSpec], interned: Dict[Tuple[str, ...], str]) -> str:
+        """Action node id for `node`'s options, appending a new action node unless an identical one is shared."""
+        self.report.action_references += 1
+        if not self.share_action_nodes:
+            action_id = node_uuid(namespace, "action", node)
+        elif options in interned:
+            return interned[options]
+        else:
+            action_id = interned[options] = action_uuid(namespace, options)
+        action_nodes.append({"id": action_id, "options": list(options)})
+        return action_id
+
     def _build_stage_nodes(self, expansion: ExpansionResult, doc: StoryDocument, stage_map: Dict[int, str], action_lookup: Dict[int, str]) -> List[StageNodeSpec]:
-        logical_lookup = {n.id: n for n in doc.nodes}
-        stage_nodes: List[StageNodeSpec] = []
+        return list(self._iter_stage_nodes(expansion, doc, stage_map, action_lookup))
+
+    def _iter_stage_nodes(self, expansion: ExpansionResult, doc: StoryDocument, stage_map: Dict[int, str], action_lookup: Dict[int, str]) -> Iterator[StageNodeSpec]:
+        logical_lookup = doc.node_map
         for phys in expansion.physical_nodes:
-            logical = logical_lookup[phys.logical_id]
-            stage_uuid = stage_map[phys.physical_id]
-            stage: StageNodeSpec = {
-                "uuid": stage_uuid,
-                "image": logical.bg,
-                "audio": logical.audio,
-            }
-            if phys.outgoing:
-                action_id = action_lookup[phys.physical_id]
-                if logical.kind == "random":
-                    option_index = -1
-                elif logical.kind in ("menu", "branch"):
-                    option_index = -1
-                else:
-                    option_index = 0
-                stage["okTransition"] = {"actionNode": action_id, "optionIndex": option_index}
-                stage["homeTransition"] = {"actionNode": action_id, "optionIndex": option_index}
-            stage_nodes.append(stage)
-        return stage_nodes
+            yield self._stage_node(logical_lookup[phys.logical_id], stage_map[phys.physical_id], action_lookup.get(phys.physical_id))
+
+    def _stage_node(self, logical: StoryNode, stage_uuid: str, action_id: str | None) -> StageNodeSpec:
+        stage: StageNodeSpec = {
+            "uuid": stage_uuid,
+            "image": self._device_image_path(logical.bg),
+            "audio": logical.audio,
+        }
+        if action_id is not None:
+            if logical.kind == "random":
+                option_index = -1
+            elif logical.kind in ("menu", "branch"):
+                option_index = -1
+            else:
+                option_index = 0
+            stage["okTransition"] = {"actionNode": action_id, "optionIndex": option_index}
+            stage["homeTransition"] = {"actionNode": action_id, "optionIndex": option_index}
+        return stage
+
+    def _device_image_path(self, image: str | None) -> str | None:
+        """Path of a stage image in the pack: converted images are renamed to `.bmp`."""
+        if not self.convert_images or not image:
+            return image
+        return Path(image).with_suffix(".bmp").as_posix()
 
     def _write_story(self, story: StudioStory) -> None:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         target = self.output_dir / "story.json"
         target.write_text(story.to_json(), encoding="utf-8")
 
-    def _copy_assets(self, doc: StoryDocument, stage_nodes: List[StageNodeSpec]) -> None:
+    def _write_story_streaming(self, doc: StoryDocument, stage_nodes: Iterable[StageNodeSpec], action_nodes: List[ActionNodeSpec]) -> int:
+        """Stream story.json to a temporary file, then move it in place; returns the stage count."""
+        writer: StudioJsonWriter | None = None
+
+        def write(handle: BinaryIO) -> None:
+            nonlocal writer
+            writer = StudioJsonWriter(handle, indent=self.json_indent, backend=self.json_backend)
+            writer.write(self._primary_title(doc), "", 1, 1, stage_nodes, action_nodes)
+
+        atomic_write(self.output_dir / "story.json", write, buffering=1 << 20)
+        assert writer is not None
+        return writer.stage_count
+
+    def _copy_assets(self, doc: StoryDocument, stage_nodes: Iterable[StageNodeSpec]) -> None:
         base_dir = (self.story_path.parent / doc.assets.base_dir).resolve()
         assets_out = self.output_dir / "assets"
+        # Converted images are referenced by their `.bmp` name; map back to the source file.
+        image_sources = {self._device_image_path(node.bg): node.bg for node in doc.nodes if node.bg} if self.convert_images else {}
+        pairs: List[Tuple[Path, Path]] = []
+        image_pairs: List[Tuple[Path, Path]] = []
         for stage in stage_nodes:
             for key in ("image", "audio"):
                 rel_obj = stage.get(key)
                 if not isinstance(rel_obj, str) or not rel_obj:
                     continue
                 rel_path = Path(rel_obj)
-                src = base_dir / rel_path
-                dest = assets_out / rel_path
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                if src.exists():
-                    shutil.copy2(src, dest)
+                if key == "image" and rel_obj in image_sources:
+                    image_pairs.append((base_dir / image_sources[rel_obj], assets_out / rel_path))
+                else:
+                    pairs.append((base_dir / rel_path, assets_out / rel_path))
+        self.report.assets = copy_assets(pairs, workers=self.asset_workers, link=self.link_assets)
+        if image_pairs:
+            target = ImageTarget.parse(doc.assets.image_target or DEFAULT_IMAGE_TARGET)
+            self.report.images = convert_images(image_pairs, target=target, workers=self.asset_workers)
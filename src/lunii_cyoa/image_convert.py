@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import io
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+from PIL import BmpImagePlugin, Image
+
+from .content_store import atomic_write
+
+DEFAULT_IMAGE_TARGET = "bmp_320x240_4bpp"
+
+_TARGET_PATTERN = re.compile(r"^bmp_(?P<width>\d+)x(?P<height>\d+)_4bpp$")
+_RLE4 = BmpImagePlugin.BmpImageFile.COMPRESSIONS["RLE4"]
+_HEADER_SIZE = 54
+# 16-entry gray palette (B, G, R, reserved), as written by the device tools.
+_PALETTE = b"".join(bytes((gray, gray, gray, 0)) for gray in (int((255 / 16) * index) for index in range(16)))
+
+
+class ImageConvertError(Exception):
+    """Raised when an image target is invalid or an image cannot be converted."""
+
+
+@dataclass(frozen=True)
+class ImageTarget:
+    """Device image format, parsed from `assets.image_target` (e.g. `bmp_320x240_4bpp`)."""
+
+    width: int
+    height: int
+
+    @classmethod
+    def parse(cls, spec: str) -> ImageTarget:
+        match = _TARGET_PATTERN.match(spec)
+        if match is None or not int(match["width"]) or not int(match["height"]):
+            raise ImageConvertError(f"Unsupported image target: {spec}")
+        return cls(width=int(match["width"]), height=int(match["height"]))
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+
+def _gray4(image: Image.Image) -> np.ndarray:
+    """Quantize to 16 grays with the same arithmetic as the per-pixel reference encoder."""
+    if image.mode in ("1", "L"):
+        return np.asarray(image.convert("L") if image.mode == "1" else image, dtype=np.uint8) >> 4
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float64)
+    # Same operation order as the reference so float truncation matches bit for bit.
+    return ((rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114) / 16).astype(np.uint8)
+
+
+def encode_rle4(gray: np.ndarray) -> bytes:
+    """RLE4-encode a (height, width) array of 4-bit values, rows in file order.
+
+    Each run is emitted as (count, value << 4 | value) with counts capped at 255; rows
+    end with `00 00` and the bitmap with `00 01`.
+    """
+    height, width = gray.shape
+    starts = np.ones(gray.shape, dtype=bool)
+    starts[:, 1:] = gray[:, 1:] != gray[:, :-1]
+    start_index = np.flatnonzero(starts)
+    lengths = np.diff(np.append(start_index, gray.size))
+    values = gray.reshape(-1)[start_index]
+
+    # Split runs longer than 255 into full chunks plus a remainder.
+    chunks = (lengths + 254) // 255
+    counts = np.full(int(chunks.sum()), 255, dtype=np.int64)
+    counts[np.cumsum(chunks) - 1] = lengths - 255 * (chunks - 1)
+    colors = np.repeat(values, chunks).astype(np.uint8)
+    pairs = np.empty((counts.size, 2), dtype=np.uint8)
+    pairs[:, 0] = counts
+    pairs[:, 1] = (colors << 4) | colors
+
+    row_chunks = np.bincount(start_index // width, weights=chunks, minlength=height).astype(np.int64)
+    markers = np.zeros((height, 2), dtype=np.uint8)
+    markers[-1, 1] = 1
+    return np.insert(pairs, np.cumsum(row_chunks), markers, axis=0).tobytes()
+
+
+def _bmp_file(width: int, height: int, bitmap: bytes) -> bytes:
+    data_offset = _HEADER_SIZE + len(_PALETTE)
+    file_size = data_offset + len(bitmap)
+    header = struct.pack("<2sIIIIiiHHIIiiII", b"BM", file_size, 0, data_offset, 40, width, height, 1, 4, _RLE4, len(bitmap), 0, 0, 0, 0)
+    return header + _PALETTE + bitmap
+
+
+def convert_to_device_bmp(image: Image.Image, target: ImageTarget | None = None) -> bytes:
+    """Resize, quantize and RLE4-encode an image into a 4bpp gray BMP.
+
+    Output is byte-identical to `pkg.api.convert_image.image_to_bitmap_rle4` for the
+    320x240 target: rows are stored bottom-up, so the image is flipped unless it is a
+    BMP that is already at the target size.
+    """
+    target = target or ImageTarget.parse(DEFAULT_IMAGE_TARGET)
+    flip = image.format != "BMP" or image.size != target.size
+    if image.size != target.size:
+        image = image.resize(target.size)
+    gray = _gray4(image)
+    if flip:
+        gray = gray[::-1]
+    return _bmp_file(target.width, target.height, encode_rle4(np.ascontiguousarray(gray)))
+
+
+def image_to_bitmap_rle4(image_data: bytes, target: ImageTarget | None = None) -> bytes:
+    """Convert encoded image bytes; an RLE4 BMP already at the target size is returned unchanged."""
+    target = target or ImageTarget.parse(DEFAULT_IMAGE_TARGET)
+    try:
+        image = Image.open(io.BytesIO(image_data))
+    except OSError as exc:
+        raise ImageConvertError(f"Cannot read image: {exc}") from exc
+    if image.format == "BMP" and image.info.get("compression") == _RLE4 and image.size == target.size:
+        return image_data
+    return convert_to_device_bmp(image, target)
+
+
+def convert_image_file(src: Path, dest: Path, target: ImageTarget | None = None) -> Path:
+    """Convert `src` into a device BMP at `dest`, published atomically."""
+    bitmap = image_to_bitmap_rle4(src.read_bytes(), target)
+    return atomic_write(dest, lambda handle: handle.write(bitmap))
+
+
+@dataclass
+class ImageConvertReport:
+    """Outcome of `convert_images`.
+
+    Attributes:
+        requested: Image references received, duplicates included.
+        converted: Files written.
+        skipped: Destinations newer than their source.
+        missing: Sources that do not exist.
+    """
+
+    requested: int = 0
+    converted: int = 0
+    skipped: int = 0
+    missing: int = 0
+
+
+def convert_images(pairs: Iterable[Tuple[Path, Path]], target: ImageTarget | None = None, workers: int | None = None) -> ImageConvertReport:
+    """Convert (source, destination) pairs on a thread pool, once per destination."""
+    report = ImageConvertReport()
+    unique: Dict[Path, Path] = {}
+    for src, dest in pairs:
+        report.requested += 1
+        unique.setdefault(dest, src)
+
+    def convert(dest: Path, src: Path) -> str:
+        try:
+            src_mtime = src.stat().st_mtime_ns
+        except FileNotFoundError:
+            return "missing"
+        try:
+            if dest.stat().st_mtime_ns >= src_mtime:
+                return "skipped"
+        except FileNotFoundError:
+            pass
+        convert_image_file(src, dest, target)
+        return "converted"
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(lambda item: convert(*item), unique.items()))
+    report.converted = outcomes.count("converted")
+    report.skipped = outcomes.count("skipped")
+    report.missing = outcomes.count("missing")
+    return report
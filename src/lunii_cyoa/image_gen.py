@@ -2,18 +2,265 @@
 
 from __future__ import annotations
 
+import hashlib
+import io
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, List, Protocol, Sequence, Tuple, runtime_checkable
 
-from google import genai
-from PIL import Image
+from PIL import Image, ImageDraw
+
+from .assets import link_or_copy
+from .content_store import CacheStats, ContentStore, atomic_write
+from .image_convert import ImageTarget, convert_to_device_bmp
+
+DEFAULT_IMAGE_MODEL = "gemini-2.5-flash-image"
+
+ImageSize = Tuple[int, int]
+
+
+class ImageGenerationError(RuntimeError):
+    """Raised when a backend returns no usable image."""
+
+
+@runtime_checkable
+class ImageBackend(Protocol):
+    """Anything that turns a prompt into a PIL image; must be safe to call from several threads."""
+
+    def generate(self, prompt: str, model: str) -> Image.Image:
+        """Generate one image for `prompt` with `model`."""
+        ...
+
+
+class GeminiImageBackend:
+    """Gemini image generation through one `genai.Client`, built on first use and then shared."""
+
+    def __init__(self, api_key: str | None = None, client: Any | None = None):
+        self.api_key = api_key
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                # Imported here so offline backends work without the Gemini SDK.
+                from google import genai
+
+                key = self.api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+                self._client = genai.Client(api_key=key) if key else genai.Client()
+            return self._client
+
+    def generate(self, prompt: str, model: str) -> Image.Image:
+        response = self.client.models.generate_content(model=model, contents=[prompt])
+        for part in response.parts or []:
+            inline = getattr(part, "inline_data", None)
+            if inline is None or not inline.data:
+                continue
+            image = Image.open(io.BytesIO(inline.data))
+            image.load()
+            return image
+        raise ImageGenerationError("Gemini response contained no image data.")
+
+
+class LocalImageBackend:
+    """Deterministic offline stand-in: the same (prompt, model) always yields the same picture."""
+
+    def __init__(self, size: ImageSize = (640, 480)):
+        self.size = size
+
+    def generate(self, prompt: str, model: str) -> Image.Image:
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).digest()
+        width, height = self.size
+        image = Image.new("RGB", self.size, tuple(digest[0:3]))
+        draw = ImageDraw.Draw(image)
+        for offset in range(3, 27, 6):
+            x0, y0 = digest[offset] * width // 256, digest[offset + 1] * height // 256
+            x1, y1 = x0 + (digest[offset + 2] * width // 512) + 1, y0 + (digest[offset + 2] * height // 512) + 1
+            draw.rectangle((x0, y0, x1, y1), fill=tuple(digest[offset + 3 : offset + 6]))
+        return image
+
+
+class ImageCache:
+    """Persistent cache of generated images, addressed by (prompt, model, size).
+
+    Images are stored as PNG in a `ContentStore` and materialized as a hardlink (or copy)
+    for `.png` outputs, or re-encoded to the output's format otherwise.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.store = ContentStore(root, max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+    @staticmethod
+    def key(prompt: str, model: str, size: ImageSize | None) -> str:
+        payload = json.dumps([prompt, model, list(size) if size else None], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, key: str, output_path: Path) -> bool:
+        """Materialize a cached image at `output_path`; False on a miss."""
+        cached = self.store.lookup(key, count=False)
+        hit = False
+        if cached is not None:
+            try:
+                if output_path.suffix.lower() == ".png":
+                    link_or_copy(cached, output_path)
+                else:
+                    with Image.open(cached) as image:
+                        _save_image(image, output_path)
+                hit = True
+            except FileNotFoundError:
+                pass  # evicted concurrently; treat as a miss
+        self.stats.record(hit)
+        return hit
+
+    def load(self, key: str) -> Image.Image | None:
+        """Decode a cached image, or None on a miss."""
+        cached = self.store.lookup(key, count=False)
+        loaded = None
+        if cached is not None:
+            try:
+                with Image.open(cached) as image:
+                    image.load()
+                    loaded = image
+            except FileNotFoundError:
+                pass  # evicted concurrently; treat as a miss
+        self.stats.record(loaded is not None)
+        return loaded
+
+    def save(self, key: str, image: Image.Image) -> Path:
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return self.store.put(key, buffer.getvalue())
+
+
+@dataclass
+class ImageRequest:
+    prompt: str
+    output_path: Path
+    size: ImageSize | None = None
+
+
+@dataclass
+class ImageResult:
+    """Outcome of one `generate_images` item.
+
+    Attributes:
+        request: The item as submitted.
+        output_path: Written file, or None when generation failed.
+        error: Exception raised by the backend or while saving.
+        cached: Served from the image cache.
+        seconds: Wall time spent on the item.
+    """
+
+    request: ImageRequest
+    output_path: Path | None
+    error: Exception | None = None
+    cached: bool = False
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _save_image(image: Image.Image, path: Path) -> None:
+    image_format = Image.registered_extensions().get(path.suffix.lower())
+    if image_format is None:
+        raise ValueError(f"unknown file extension: {path.suffix}")
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    atomic_write(path, lambda handle: image.save(handle, format=image_format))
+
+
+def _write_device_bmp(image: Image.Image, path: Path, target: ImageTarget) -> None:
+    bitmap = convert_to_device_bmp(image, target)
+    atomic_write(path, lambda handle: handle.write(bitmap))
+
+
+def _render(backend: ImageBackend, prompt: str, model: str, size: ImageSize | None) -> Image.Image:
+    image = backend.generate(prompt, model)
+    if size is not None and image.size != tuple(size):
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def generate_images(
+    items: Sequence[ImageRequest],
+    backend: ImageBackend | None = None,
+    model: str = DEFAULT_IMAGE_MODEL,
+    max_concurrency: int = 4,
+    cache: ImageCache | None = None,
+    image_target: str | None = None,
+) -> List[ImageResult]:
+    """Generate many images concurrently with one shared backend.
+
+    Args:
+        items: Prompts and destinations; `size` resizes the generated image.
+        backend: Image backend; a `GeminiImageBackend` (one client for the batch) when omitted.
+        model: Model handle passed to the backend and part of the cache key.
+        max_concurrency: Maximum number of generations in flight.
+        cache: Optional image cache consulted before calling the backend.
+        image_target: Device format (e.g. `bmp_320x240_4bpp`); when set, every output is
+            written directly as a device BMP and `size` defaults to the target size.
+
+    Returns:
+        One ImageResult per item, in input order. Failures are reported per item.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if not items:
+        return []
+    target = ImageTarget.parse(image_target) if image_target is not None else None
+    shared_backend: ImageBackend = backend if backend is not None else GeminiImageBackend()
+
+    def run(item: ImageRequest) -> ImageResult:
+        started = time.perf_counter()
+        result = ImageResult(request=item, output_path=None)
+        size = item.size or (target.size if target is not None else None)
+        key = ImageCache.key(item.prompt, model, size)
+        try:
+            item.output_path.parent.mkdir(parents=True, exist_ok=True)
+            if target is not None:
+                image = cache.load(key) if cache is not None else None
+                result.cached = image is not None
+                if image is None:
+                    image = _render(shared_backend, item.prompt, model, size)
+                    if cache is not None:
+                        cache.save(key, image)
+                _write_device_bmp(image, item.output_path, target)
+            elif cache is not None and cache.fetch(key, item.output_path):
+                result.cached = True
+            else:
+                image = _render(shared_backend, item.prompt, model, size)
+                if cache is not None:
+                    cache.save(key, image)
+                _save_image(image, item.output_path)
+            result.output_path = item.output_path
+        except Exception as exc:  # reported per item
+            result.error = exc
+        result.seconds = time.perf_counter() - started
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        return list(pool.map(run, items))
 
 
 def generate_gemini_image(
     prompt: str,
     output_path: str | Path = "generated_image.png",
-    model: str = "gemini-2.5-flash-image",
+    model: str = DEFAULT_IMAGE_MODEL,
     api_key: str | None = None,
+    backend: ImageBackend | None = None,
+    cache: ImageCache | None = None,
 ) -> Path:
     """Generate an image with Gemini and save it to disk.
 
@@ -22,24 +269,21 @@ def generate_gemini_image(
         output_path: Where to write the image (directories are created).
         model: Gemini image model handle (defaults to gemini-2.5-flash-image).
         api_key: Explicit Gemini API key; falls back to env `GEMINI_API_KEY` then `GOOGLE_API_KEY`.
+        backend: Backend to use instead of Gemini (e.g. `LocalImageBackend` offline).
+        cache: Optional image cache; a hit makes no API call.
 
     Returns:
         Path to the written image.
 
     Raises:
-        RuntimeError: If the response contains no inline image data.
+        ImageGenerationError: If the response contains no inline image data.
     """
-    key = api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
-    client = genai.Client(api_key=key) if key else genai.Client()
-    response = client.models.generate_content(model=model, contents=[prompt])
-
-    for part in response.parts:
-        if getattr(part, "inline_data", None) is None:
-            continue
-        image: Image.Image = part.as_image()
-        path = Path(output_path)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        image.save(path)
+    path = Path(output_path)
+    key = ImageCache.key(prompt, model, None)
+    if cache is not None and cache.fetch(key, path):
         return path
-
-    raise RuntimeError("Gemini response contained no image data.")
+    image = _render(backend or GeminiImageBackend(api_key=api_key), prompt, model, None)
+    if cache is not None:
+        cache.save(key, image)
+    _save_image(image, path)
+    return path
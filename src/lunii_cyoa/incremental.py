@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+from itertools import accumulate
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from .expansion import ExpansionError, StoryExpander
+from .liveness import live_variables
+from .models import StoryDocument, StoryNode
+from .structures import Edge, ExpansionResult, PackedState, PhysicalNode
+
+StateKey = Tuple[str, PackedState]
+Successors = List[Tuple[StateKey, str | None]]
+
+# Node fields that can change the transitions of a node; assets and labels cannot.
+_TRANSITION_FIELDS: Dict[str, Any] = {
+    "kind": True,
+    "target": True,
+    "choices": {"__all__": {"id", "target", "effects", "guard"}},
+    "random": True,
+}
+
+
+@dataclass
+class IncrementalStats:
+    """What the last `IncrementalExpander.expand` call reused.
+
+    Attributes:
+        dirty_nodes: Logical nodes whose transitions had to be recomputed (new or edited).
+        spliced: Physical nodes (and their edges) taken verbatim from the previous result:
+            the prefix before the dirty frontier, plus later nodes whose id and successor
+            ids did not change.
+        reused: Physical nodes renumbered from stored successors, without evaluating guards.
+        recomputed: Physical nodes whose transitions were evaluated (the dirty frontier and
+            states first reached from it).
+    """
+
+    dirty_nodes: List[str] = field(default_factory=list)
+    spliced: int = 0
+    reused: int = 0
+    recomputed: int = 0
+
+
+def node_fingerprint(node: StoryNode) -> str:
+    return node.model_dump_json(include=_TRANSITION_FIELDS)
+
+
+class IncrementalExpander:
+    """Re-expand successive revisions of a story from the states an edit affects.
+
+    Each expansion keeps the successor list of every reached (logical node, packed
+    state). Between two calls, nodes are diffed on the fields that drive transitions
+    (kind, targets, choices, guards, effects). Successor lists are dropped for edited
+    or removed nodes, and for nodes whose live variables (or whose targets' live
+    variables) changed, since dead-state collapse rewrites those keys. The surviving
+    lists are valid as is.
+
+    The new result is then built in two parts. Physical nodes before the first
+    invalidated state, in the previous numbering, have the same ids and edges, so they
+    and their edges are spliced in unchanged. From that dirty frontier on, the
+    breadth-first walk resumes. Only states without a stored successor list are
+    re-expanded; the others are renumbered from the stored lists, and a node that keeps
+    its id and successor ids is reused with its edges. The result always
+    equals `expand_story(doc)` with the same settings.
+
+    Unchanged `PhysicalNode` and `Edge` objects, and state dicts, are shared between
+    the results of successive calls; treat results as read-only.
+    """
+
+    def __init__(self, max_states: int = 5000, collapse_dead_state: bool = True):
+        self.max_states = max_states
+        self.collapse_dead_state = collapse_dead_state
+        self.stats = IncrementalStats()
+        self._signature: str | None = None
+        self._fingerprints: Dict[str, str] = {}
+        self._live: Dict[str, FrozenSet[str]] = {}
+        self._successors: Dict[StateKey, Successors] = {}
+        self._previous: ExpansionResult | None = None
+        self._previous_keys: List[StateKey] = []
+
+    def expand(self, doc: StoryDocument) -> ExpansionResult:
+        expander = StoryExpander(doc, max_states=self.max_states, collapse_dead_state=self.collapse_dead_state)
+        start_key = expander.start_key()
+        self.stats = IncrementalStats(dirty_nodes=self._invalidate(doc, expander))
+        try:
+            result = self._walk(doc, expander, (doc.story.start_node, start_key % expander.layout.size))
+        except BaseException:
+            # Stored successors stay valid for this revision; only the numbering is lost.
+            self._previous, self._previous_keys = None, []
+            raise
+        return result
+
+    def _invalidate(self, doc: StoryDocument, expander: StoryExpander) -> List[str]:
+        # Declaration order fixes the digit of each variable; the initial state is the
+        # fallback value of collapsed variables. Either change makes packed keys meaningless.
+        signature = json.dumps(
+            [[[name, decl.model_dump()] for name, decl in doc.state.items()], expander.initial_state_builder.build()],
+            sort_keys=True,
+            default=str,
+        )
+        if signature != self._signature:
+            self._signature = signature
+            self._fingerprints, self._live, self._successors = {}, {}, {}
+            self._previous, self._previous_keys = None, []
+
+        fingerprints = {node.id: node_fingerprint(node) for node in doc.nodes}
+        dirty = [node_id for node_id, fingerprint in fingerprints.items() if self._fingerprints.get(node_id) != fingerprint]
+        live = live_variables(doc, expander.guard.variables) if self.collapse_dead_state else {}
+        relabeled = {node_id for node_id in set(live) | set(self._live) if live.get(node_id) != self._live.get(node_id)}
+        stale = set(dirty) | (set(self._fingerprints) - set(fingerprints)) | relabeled
+        if stale:
+            self._successors = {key: successors for key, successors in self._successors.items() if key[0] not in stale and not any(target[0] in relabeled for target, label in successors)}
+        self._fingerprints, self._live = fingerprints, live
+        return dirty
+
+    def _walk(self, doc: StoryDocument, expander: StoryExpander, start: StateKey) -> ExpansionResult:
+        previous, previous_keys = self._previous, self._previous_keys
+        table = self._successors
+        splice = 0
+        if previous is not None and previous_keys and previous_keys[0] == start:
+            splice = next((pid for pid, key in enumerate(previous_keys) if key not in table), len(previous_keys))
+
+        physical_nodes: List[PhysicalNode] = []
+        edges: List[Edge] = []
+        order: List[StateKey] = [start]
+        if splice and previous is not None:
+            # Breadth-first numbering only depends on the successors of already processed
+            # nodes, so this prefix (and every id it discovered) is unchanged.
+            physical_nodes = previous.physical_nodes[:splice]
+            discovered = max(splice, 1 + max((target for node in physical_nodes for target in node.outgoing), default=0))
+            order = previous_keys[:discovered]
+            edges = previous.edges[: sum(len(node.outgoing) for node in physical_nodes)]
+        ids: Dict[StateKey, int] = {key: pid for pid, key in enumerate(order)}
+        previous_ids: Dict[StateKey, int] = {key: pid for pid, key in enumerate(previous_keys)} if previous is not None else {}
+        self.stats.spliced = splice
+
+        previous_nodes = previous.physical_nodes if previous is not None else []
+        previous_edges = previous.edges if previous is not None else []
+        # Edge offsets of the previous result, to reuse the edges of unchanged nodes.
+        previous_offsets = [0, *accumulate(len(node.outgoing) for node in previous_nodes)]
+        node_map = doc.node_map
+        pid = splice
+        while pid < len(order):
+            if pid >= self.max_states:
+                raise ExpansionError(f"Reached max_states ({self.max_states}) during expansion")
+            key = order[pid]
+            successors = table.get(key)
+            if successors is None:
+                successors = table[key] = self._successors_of(expander, node_map[key[0]], key[1])
+                self.stats.recomputed += 1
+            else:
+                self.stats.reused += 1
+            outgoing: List[int] = []
+            for target, label in successors:
+                target_pid = ids.get(target)
+                if target_pid is None:
+                    target_pid = ids[target] = len(order)
+                    order.append(target)
+                outgoing.append(target_pid)
+            if pid < len(previous_nodes) and previous_keys[pid] == key and previous_nodes[pid].outgoing == outgoing:
+                # Same id and same successor ids: the previous node and its edges still hold.
+                physical_nodes.append(previous_nodes[pid])
+                edges.extend(previous_edges[previous_offsets[pid] : previous_offsets[pid + 1]])
+                self.stats.spliced += 1
+            else:
+                previous_pid = previous_ids.get(key)
+                state = previous_nodes[previous_pid].state if previous_pid is not None else expander.layout.decode(key[1])
+                physical_nodes.append(PhysicalNode(physical_id=pid, logical_id=key[0], kind=node_map[key[0]].kind, state=state, outgoing=outgoing))
+                edges.extend(Edge(source=pid, target=target_pid, label=label) for target_pid, (target, label) in zip(outgoing, successors))
+            pid += 1
+
+        result = expander.build_result(physical_nodes, edges)
+        # Keep only what this revision reaches, so the table does not grow across edits.
+        self._successors = {key: table[key] for key in order}
+        self._previous, self._previous_keys = result, order
+        return result
+
+    def _successors_of(self, expander: StoryExpander, node: StoryNode, state: PackedState) -> Successors:
+        successors: Successors = []
+        for target_id, label, next_state in expander._transitions(node, state):
+            if target_id not in expander.logical_map:
+                raise ExpansionError(f"Node '{node.id}' references unknown target '{target_id}'")
+            successors.append(((target_id, next_state), label))
+        return successors
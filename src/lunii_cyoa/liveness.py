@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Deque, Dict, FrozenSet, List, Set
+
+from .models import Choice, StoryDocument, StoryNode
+
+GuardVariables = Callable[[str], FrozenSet[str]]
+
+
+def _live_through_choice(choice: Choice, live_at_target: FrozenSet[str], guard_variables: GuardVariables) -> Set[str]:
+    needed = set(live_at_target)
+    for eff in reversed(choice.effects):
+        if eff.op == "=":
+            needed.discard(eff.var)
+        else:
+            needed.add(eff.var)
+    if choice.guard:
+        needed |= guard_variables(choice.guard)
+    return needed
+
+
+def _targets(node: StoryNode) -> List[str]:
+    if node.kind == "random":
+        return [option.target for option in node.random.get("options", [])]
+    if node.kind in ("menu", "branch"):
+        return [choice.target for choice in node.choices]
+    return [node.target] if node.target else []
+
+
+def _live_in(node: StoryNode, live: Dict[str, FrozenSet[str]], guard_variables: GuardVariables) -> FrozenSet[str]:
+    needed: Set[str] = set()
+    if node.kind in ("menu", "branch"):
+        for choice in node.choices:
+            needed |= _live_through_choice(choice, live.get(choice.target, frozenset()), guard_variables)
+    else:
+        for target in _targets(node):
+            needed |= live.get(target, frozenset())
+    return frozenset(needed)
+
+
+def live_variables(doc: StoryDocument, guard_variables: GuardVariables) -> Dict[str, FrozenSet[str]]:
+    """Compute, for every logical node, the state variables live on entry.
+
+    A variable is live at a node when some path from it may read the variable (in a
+    guard, or through a `+=`/`-=` effect) before an `=` effect overwrites it. This is
+    a backward may-analysis iterated to a fixpoint over the logical graph.
+
+    Args:
+        doc: Validated story document.
+        guard_variables: Returns the variables a guard expression reads
+            (`GuardEvaluator.variables`).
+
+    Returns:
+        Mapping of logical node id to the frozenset of live variable names.
+    """
+    node_map = doc.node_map
+    predecessors: Dict[str, Set[str]] = {node_id: set() for node_id in node_map}
+    for node in doc.nodes:
+        for target in _targets(node):
+            if target in predecessors:
+                predecessors[target].add(node.id)
+
+    live: Dict[str, FrozenSet[str]] = {node_id: frozenset() for node_id in node_map}
+    worklist: Deque[str] = deque(reversed(list(node_map)))
+    queued = set(node_map)
+    while worklist:
+        node_id = worklist.popleft()
+        queued.discard(node_id)
+        updated = _live_in(node_map[node_id], live, guard_variables)
+        if updated == live[node_id]:
+            continue
+        live[node_id] = updated
+        for predecessor in predecessors[node_id]:
+            if predecessor not in queued:
+                worklist.append(predecessor)
+                queued.add(predecessor)
+    return live
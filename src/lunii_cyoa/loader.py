@@ -1,22 +1,45 @@
 from __future__ import annotations
 
+import tomllib
 from pathlib import Path
+from typing import Any, Literal
+
 import tomlkit
 from pydantic import ValidationError
 
+from .binary import COMPILED_SUFFIX, CompiledStoryError, load_compiled_story
 from .models import StoryDocument
 
+TomlParser = Literal["tomllib", "tomlkit"]
+
 
 class StoryLoadError(Exception):
     """Raised when a TOML story cannot be loaded or validated."""
 
 
-def load_story(path: Path) -> StoryDocument:
+def parse_toml(content: str, parser: TomlParser = "tomllib") -> Any:
+    """
+    Parse TOML text.
+
+    `tomllib` (stdlib) returns plain dicts and is the fast path used for compilation.
+    `tomlkit` returns a style-preserving document, for tooling that edits and writes
+    the story back.
+    """
+    if parser == "tomlkit":
+        return tomlkit.parse(content)
+    return tomllib.loads(content)
+
+
+def load_story(path: Path, parser: TomlParser = "tomllib") -> StoryDocument:
     """
     Load and validate a story TOML file into a StoryDocument.
 
+    Files with the `.cyoab` suffix are read as compiled stories (see `compile_story`);
+    they were validated when compiled, so this skips parsing and validation.
+
     Args:
         path: Path to the TOML file.
+        parser: "tomllib" (default, fast, read-only) or "tomlkit" (style-preserving).
 
     Returns:
         StoryDocument parsed from the TOML.
@@ -24,13 +47,20 @@ def load_story(path: Path) -> StoryDocument:
     Raises:
         StoryLoadError: if the file cannot be read or validation fails.
     """
+    if path.suffix == COMPILED_SUFFIX:
+        try:
+            with load_compiled_story(path) as compiled:
+                return compiled.document()
+        except CompiledStoryError as exc:
+            raise StoryLoadError(str(exc)) from exc
+
     try:
         content = path.read_text(encoding="utf-8")
     except OSError as exc:
         raise StoryLoadError(f"Failed to read TOML file '{path}': {exc}") from exc
 
     try:
-        parsed = tomlkit.parse(content)
+        parsed = parse_toml(content, parser)
     except Exception as exc:  # tomlkit raises generic Exception subclasses
         raise StoryLoadError(f"Failed to parse TOML file '{path}': {exc}") from exc
 
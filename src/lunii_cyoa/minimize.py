@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Set, Tuple
+
+from .structures import Edge, ExpansionResult, PhysicalNode
+
+
+@dataclass
+class MinimizationResult:
+    """Minimized expansion plus the mapping from original to merged physical ids.
+
+    Attributes:
+        expansion: Graph with one physical node per equivalence class, renumbered so
+            that classes keep the order of their smallest original id (the start stays 0).
+        merged_id: Original physical id -> physical id in `expansion`.
+        original_nodes: Physical node count before minimization.
+        original_edges: Edge count before minimization.
+    """
+
+    expansion: ExpansionResult
+    merged_id: Dict[int, int] = field(default_factory=dict)
+    original_nodes: int = 0
+    original_edges: int = 0
+
+    @property
+    def minimized_nodes(self) -> int:
+        return len(self.expansion.physical_nodes)
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of physical nodes removed (0.0 when nothing could be merged)."""
+        if not self.original_nodes:
+            return 0.0
+        return 1 - self.minimized_nodes / self.original_nodes
+
+
+def _initial_blocks(result: ExpansionResult, labels: Dict[int, Tuple[str | None, ...]]) -> List[Set[int]]:
+    blocks: Dict[Tuple[str, Tuple[str | None, ...]], Set[int]] = {}
+    for node in result.physical_nodes:
+        blocks.setdefault((node.logical_id, labels[node.physical_id]), set()).add(node.physical_id)
+    return list(blocks.values())
+
+
+def _refine(result: ExpansionResult, blocks: List[Set[int]]) -> List[Set[int]]:
+    """Hopcroft partition refinement; the alphabet is the option index of an outgoing edge."""
+    alphabet = max((len(node.outgoing) for node in result.physical_nodes), default=0)
+    inverse: List[Dict[int, List[int]]] = [{} for index_symbol in range(alphabet)]
+    for node in result.physical_nodes:
+        for symbol, target in enumerate(node.outgoing):
+            inverse[symbol].setdefault(target, []).append(node.physical_id)
+
+    block_of: Dict[int, int] = {pid: index for index, members in enumerate(blocks) for pid in members}
+    pending: Deque[Tuple[int, int]] = deque((index, symbol) for index in range(len(blocks)) for symbol in range(alphabet))
+    queued = set(pending)
+    while pending:
+        splitter = pending.popleft()
+        queued.discard(splitter)
+        block_index, symbol = splitter
+        touched: Dict[int, Set[int]] = {}
+        for target in list(blocks[block_index]):
+            for source in inverse[symbol].get(target, ()):
+                touched.setdefault(block_of[source], set()).add(source)
+        for split_index, inside in touched.items():
+            if len(inside) == len(blocks[split_index]):
+                continue
+            blocks[split_index] -= inside
+            new_index = len(blocks)
+            blocks.append(inside)
+            for pid in inside:
+                block_of[pid] = new_index
+            for next_symbol in range(alphabet):
+                if (split_index, next_symbol) in queued:
+                    added = (new_index, next_symbol)
+                elif len(inside) <= len(blocks[split_index]):
+                    added = (new_index, next_symbol)
+                else:
+                    added = (split_index, next_symbol)
+                pending.append(added)
+                queued.add(added)
+    return blocks
+
+
+def minimize_expansion(result: ExpansionResult) -> MinimizationResult:
+    """Merge physical nodes that the device cannot tell apart.
+
+    Two physical nodes are equivalent when they share a logical node (hence kind and
+    assets) and their outgoing choices carry the same labels and lead, option by option,
+    to equivalent nodes. The coarsest such partition is the bisimulation computed by
+    Hopcroft-style refinement, starting from blocks keyed by logical id and labels.
+
+    Args:
+        result: Expansion to minimize; left untouched.
+
+    Returns:
+        MinimizationResult holding the merged graph and the reduction ratio.
+    """
+    labels: Dict[int, List[str | None]] = {node.physical_id: [] for node in result.physical_nodes}
+    for edge in result.edges:
+        labels[edge.source].append(edge.label)
+    frozen_labels = {pid: tuple(node_labels) for pid, node_labels in labels.items()}
+    blocks = _refine(result, _initial_blocks(result, frozen_labels))
+
+    representatives = sorted(min(members) for members in blocks if members)
+    rank = {pid: index for index, pid in enumerate(representatives)}
+    merged_id = {pid: rank[min(members)] for members in blocks if members for pid in members}
+
+    by_id = {node.physical_id: node for node in result.physical_nodes}
+    physical_nodes: List[PhysicalNode] = []
+    edges: List[Edge] = []
+    for new_id, pid in enumerate(representatives):
+        original = by_id[pid]
+        outgoing = [merged_id[target] for target in original.outgoing]
+        physical_nodes.append(PhysicalNode(physical_id=new_id, logical_id=original.logical_id, kind=original.kind, state=dict(original.state), outgoing=outgoing))
+        edges.extend(Edge(source=new_id, target=target, label=label) for target, label in zip(outgoing, frozen_labels[pid]))
+
+    expansion = ExpansionResult(
+        physical_nodes=physical_nodes,
+        edges=edges,
+        unreachable_logical=list(result.unreachable_logical),
+        dead_ends=[node.physical_id for node in physical_nodes if not node.outgoing],
+        stats=result.stats,
+    )
+    return MinimizationResult(expansion=expansion, merged_id=merged_id, original_nodes=len(result.physical_nodes), original_edges=len(result.edges))
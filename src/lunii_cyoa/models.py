@@ -121,11 +121,28 @@ class StoryDocument(BaseModel):
     state: Dict[str, StateDeclaration] = Field(default_factory=dict)
     nodes: List[StoryNode]
 
+    @property
+    def node_map(self) -> Dict[str, StoryNode]:
+        """Node id -> node index, built fresh on each access.
+
+        `nodes` and the nodes themselves stay editable (e.g. while editing a story in
+        place), so no index is cached on the document. Consumers fetch the map once
+        per call and reuse it.
+        """
+        return {n.id: n for n in self.nodes}
+
     @model_validator(mode="after")
     def check_uniqueness_and_references(self) -> "StoryDocument":
-        node_ids = [n.id for n in self.nodes]
-        if len(set(node_ids)) != len(node_ids):
-            raise ValueError("Duplicate node ids found")
+        node_map: Dict[str, StoryNode] = {}
+        duplicates: List[str] = []
+        for node in self.nodes:
+            if node.id not in node_map:
+                node_map[node.id] = node
+            elif node.id not in duplicates:
+                duplicates.append(node.id)
+        errors: List[str] = []
+        if duplicates:
+            errors.append(f"Duplicate node ids found: {', '.join(duplicates)}")
         for node in self.nodes:
             if node.kind == "random":
                 targets = [opt.target for opt in node.random.get("options", [])]
@@ -134,12 +151,14 @@ class StoryDocument(BaseModel):
             else:
                 targets = [node.target] if node.target else []
             for target in targets:
-                if target and target not in node_ids:
-                    raise ValueError(f"Node '{node.id}' references unknown target '{target}'")
+                if target and target not in node_map:
+                    errors.append(f"Node '{node.id}' references unknown target '{target}'")
             if node.kind in ("menu", "branch"):
-                choice_ids = [c.id for c in node.choices]
-                if len(set(choice_ids)) != len(choice_ids):
-                    raise ValueError(f"Node '{node.id}' has duplicate choice ids")
-        if self.story.start_node not in node_ids:
-            raise ValueError("start_node must reference an existing node")
+                choice_ids = {c.id for c in node.choices}
+                if len(choice_ids) != len(node.choices):
+                    errors.append(f"Node '{node.id}' has duplicate choice ids")
+        if self.story.start_node not in node_map:
+            errors.append("start_node must reference an existing node")
+        if errors:
+            raise ValueError("; ".join(errors))
         return self
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Literal, Tuple
+
+from .models import StateBool, StateDeclaration, StateEnum, StateInt
+from .structures import PackedState, StateSnapshot
+
+
+class StateLayoutError(Exception):
+    """Raised when a state value cannot be represented in the packed layout."""
+
+
+@dataclass(frozen=True)
+class VarSlot:
+    """Position of one declared variable inside the packed mixed-radix integer."""
+
+    name: str
+    kind: Literal["int", "bool", "enum"]
+    stride: int
+    radix: int
+    offset: int = 0
+    values: Tuple[Any, ...] | None = None  # bool/enum symbols indexed by digit; None for ints
+
+    def digit_of(self, packed: PackedState) -> int:
+        return (packed // self.stride) % self.radix
+
+    def value_of(self, packed: PackedState) -> Any:
+        digit = (packed // self.stride) % self.radix
+        if self.values is None:
+            return digit + self.offset
+        return self.values[digit]
+
+
+class StateLayout:
+    """Mixed-radix encoding of state snapshots compiled from the story declarations.
+
+    Each declared variable owns one digit whose radix is its cardinality
+    (`max - min + 1` for ints, 2 for bools, the number of values for enums), so
+    every snapshot maps to a unique integer in `[0, size)`. Variables are laid out
+    in declaration order, the first one being the least significant digit.
+    """
+
+    def __init__(self, state_decl: Dict[str, StateDeclaration]):
+        self.slots: Dict[str, VarSlot] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {}
+        stride = 1
+        for name, decl in state_decl.items():
+            slot: VarSlot
+            if isinstance(decl, StateInt):
+                slot = VarSlot(name=name, kind="int", stride=stride, radix=decl.max - decl.min + 1, offset=decl.min)
+            elif isinstance(decl, StateBool):
+                slot = VarSlot(name=name, kind="bool", stride=stride, radix=2, values=(False, True))
+            elif isinstance(decl, StateEnum):
+                slot = VarSlot(name=name, kind="enum", stride=stride, radix=len(decl.values), values=tuple(decl.values))
+                self._codes[name] = {value: index for index, value in enumerate(decl.values)}
+            else:
+                raise StateLayoutError(f"Unsupported declaration for state var '{name}'")
+            self.slots[name] = slot
+            stride *= slot.radix
+        self.size = stride
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.slots)
+
+    def digit(self, name: str, value: Any) -> int:
+        """Return the digit encoding `value` for variable `name`."""
+        slot = self.slots[name]
+        if slot.kind == "int":
+            if not isinstance(value, int):
+                raise StateLayoutError(f"Int var '{name}' requires integer value, got {value!r}")
+            digit = value - slot.offset
+            if not 0 <= digit < slot.radix:
+                raise StateLayoutError(f"Value {value} out of bounds for '{name}'")
+            return digit
+        if slot.kind == "bool":
+            if not isinstance(value, bool):
+                raise StateLayoutError(f"Bool var '{name}' requires boolean value, got {value!r}")
+            return int(value)
+        code = self._codes[name].get(value)
+        if code is None:
+            raise StateLayoutError(f"Enum var '{name}' value {value!r} not in {list(slot.values or ())}")
+        return code
+
+    def encode(self, state: StateSnapshot) -> PackedState:
+        packed = 0
+        for name, slot in self.slots.items():
+            if name not in state:
+                raise StateLayoutError(f"State is missing declared var '{name}'")
+            packed += self.digit(name, state[name]) * slot.stride
+        return packed
+
+    def decode(self, packed: PackedState) -> StateSnapshot:
+        return {name: slot.value_of(packed) for name, slot in self.slots.items()}
+
+    def value_of(self, packed: PackedState, name: str) -> Any:
+        return self.slots[name].value_of(packed)
+
+    def getter(self, name: str) -> Callable[[PackedState], Any]:
+        """Return a closure reading `name` straight from a packed state."""
+        return self.slots[name].value_of
+
+    def projector(self, names: Iterable[str]) -> Callable[[PackedState], int]:
+        """Return a function keeping only the digits of `names` (others read as zero)."""
+        wanted = set(names)
+        digits = tuple((slot.stride, slot.radix) for name, slot in self.slots.items() if name in wanted)
+        if not digits:
+            return lambda packed: 0
+        if len(digits) == 1:
+            stride, radix = digits[0]
+            return lambda packed: (packed // stride) % radix
+        return lambda packed: sum(((packed // stride) % radix) * stride for stride, radix in digits)
+
+    def canonicalizer(self, names: Iterable[str], fallback: PackedState) -> Callable[[PackedState], PackedState] | None:
+        """Return a function resetting every digit outside `names` to its value in `fallback`.
+
+        Returns None when `names` covers every variable (nothing to reset).
+        """
+        wanted = set(names)
+        kept = tuple((slot.stride, slot.radix) for name, slot in self.slots.items() if name in wanted)
+        if len(kept) == len(self.slots):
+            return None
+        base = sum(slot.digit_of(fallback) * slot.stride for name, slot in self.slots.items() if name not in wanted)
+        return lambda packed: base + sum(((packed // stride) % radix) * stride for stride, radix in kept)
+
+    def replace(self, packed: PackedState, name: str, value: Any) -> PackedState:
+        slot = self.slots[name]
+        return packed + (self.digit(name, value) - slot.digit_of(packed)) * slot.stride
@@ -4,9 +4,19 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List
 
 StateSnapshot = Dict[str, Any]
+PackedState = int  # mixed-radix encoding of a StateSnapshot, see state_layout.StateLayout
 
 @dataclass
 class PhysicalNode:
+    """One (logical node, state) pair of an expansion.
+
+    With dead-state collapse (the default), `state` holds the story's initial value
+    for every variable that is dead at `logical_id` (never read again before being
+    overwritten). Those entries are placeholders that keep equivalent nodes merged,
+    not values the story necessarily reaches on that path; `liveness.live_variables`
+    tells which entries are meaningful.
+    """
+
     physical_id: int
     logical_id: str
     kind: str
@@ -21,9 +31,25 @@ class Edge:
     label: str | None = None  # choice id or "random"
 
 
+@dataclass
+class ExpansionStats:
+    transition_cache_hits: int = 0
+    transition_cache_misses: int = 0
+
+
 @dataclass
 class ExpansionResult:
     physical_nodes: List[PhysicalNode]
     edges: List[Edge]
     unreachable_logical: List[str]
     dead_ends: List[int]
+    stats: ExpansionStats = field(default_factory=ExpansionStats, compare=False)
+
+
+@dataclass
+class ExpansionSummary:
+    node_count: int = 0
+    edge_count: int = 0
+    unreachable_logical: List[str] = field(default_factory=list)
+    dead_ends: List[int] = field(default_factory=list)
+    stats: ExpansionStats = field(default_factory=ExpansionStats)
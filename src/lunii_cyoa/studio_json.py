@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from types import ModuleType
+from typing import Any, BinaryIO, Callable, Iterable, Literal
+
+from pkg.api.studio_builder import ActionNodeSpec, StageNodeSpec
+
+orjson: ModuleType | None
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install lunii-cyoa[fast]
+    orjson = None
+
+JsonBackend = Literal["json", "orjson"]
+
+
+class StudioJsonError(Exception):
+    """Raised when story.json cannot be written."""
+
+
+def _encoder(backend: JsonBackend, indent: int | None) -> Callable[[Any], bytes]:
+    if backend == "orjson":
+        if orjson is None:
+            raise StudioJsonError("The orjson backend was requested but orjson is not installed")
+        if indent not in (None, 2):
+            raise StudioJsonError("The orjson backend only supports indent=2 or compact output")
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return lambda value: orjson.dumps(value, option=option)
+    if indent is None:
+        return lambda value: json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return lambda value: json.dumps(value, indent=indent).encode("utf-8")
+
+
+class StudioJsonWriter:
+    """Write a Studio story.json incrementally, one stage/action node at a time.
+
+    With the default `json` backend and `indent=2`, the output is byte-identical to
+    `StudioStory.to_json()` for the same nodes, including the `global_index` that
+    `StudioStory.load` assigns to action nodes. `indent=None` writes compact JSON;
+    the `orjson` backend (if installed) encodes faster but emits non-ASCII characters
+    as UTF-8 instead of `\\u` escapes.
+    """
+
+    def __init__(self, handle: BinaryIO, indent: int | None = 2, backend: JsonBackend = "json"):
+        self.handle = handle
+        self.indent = indent
+        self._encode = _encoder(backend, indent)
+        self.stage_count = 0
+        self.action_count = 0
+
+    def write(
+        self,
+        title: str,
+        description: str,
+        format_version: int | str,
+        pack_version: int,
+        stage_nodes: Iterable[StageNodeSpec],
+        action_nodes: Iterable[ActionNodeSpec],
+    ) -> None:
+        """Write the whole document; both node iterables are consumed lazily, in order."""
+        header = {"format": format_version, "version": pack_version, "title": title, "description": description}
+        if self.indent is None:
+            self.handle.write(self._encode(header)[:-1] + b",")
+        else:
+            self.handle.write(self._encode(header)[:-2] + b",\n")
+        self.stage_count = self._write_array("stageNodes", stage_nodes, last=False)
+        self.action_count = self._write_array("actionNodes", self._with_global_index(action_nodes), last=True)
+        self.handle.write(b"}")
+
+    def _with_global_index(self, action_nodes: Iterable[ActionNodeSpec]) -> Iterable[ActionNodeSpec]:
+        global_index = 0
+        for action in action_nodes:
+            yield {**action, "global_index": global_index}
+            global_index += len(action["options"])
+
+    def _write_array(self, key: str, items: Iterable[Any], last: bool) -> int:
+        count = 0
+        if self.indent is None:
+            self.handle.write(self._encode(key) + b":[")
+            for item in items:
+                self.handle.write(b"," + self._encode(item) if count else self._encode(item))
+                count += 1
+            self.handle.write(b"]" if last else b"],")
+            return count
+
+        pad = b" " * self.indent
+        item_pad = pad * 2
+        self.handle.write(pad + self._encode(key) + b": [")
+        for item in items:
+            self.handle.write((b",\n" if count else b"\n") + item_pad + self._encode(item).replace(b"\n", b"\n" + item_pad))
+            count += 1
+        self.handle.write((b"\n" + pad + b"]" if count else b"]") + (b"\n" if last else b",\n"))
+        return count
@@ -1,16 +1,31 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Protocol, runtime_checkable
+from typing import BinaryIO, Callable, Iterable, List, Protocol, Sequence, runtime_checkable
 
+import httpx
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
+from elevenlabs.core.api_error import ApiError
+
+from .assets import link_or_copy
+from .audio import AudioTarget, transcode_stream
+from .content_store import CacheStats, ContentStore, atomic_write
 
 AudioContent = bytes | bytearray | Iterable[bytes]
 
 DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
 
+# HTTP statuses worth retrying: timeouts, conflicts, rate limiting and server errors.
+TRANSIENT_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
 
 @runtime_checkable
 class TextToSpeechAPI(Protocol):
@@ -41,6 +56,45 @@ def build_elevenlabs_client(api_key: str | None = None) -> ElevenLabsClient:
     return ElevenLabs(api_key=resolved_key)
 
 
+class TTSCache:
+    """Persistent cache of synthesized clips, addressed by (text, voice, model, format).
+
+    Clips are stored atomically in a `ContentStore` (optionally bounded by `max_bytes`,
+    least recently used first) and materialized at the requested path as a hardlink,
+    or a copy when linking is not possible.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.store = ContentStore(root, max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+    @staticmethod
+    def key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+        payload = json.dumps([text, voice_id, model_id, output_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, key: str, output_path: Path) -> bool:
+        """Materialize a cached clip at `output_path`; False on a miss."""
+        cached = self.store.lookup(key, count=False)
+        hit = False
+        if cached is not None:
+            try:
+                link_or_copy(cached, output_path)
+                hit = True
+            except FileNotFoundError:
+                pass  # evicted concurrently; treat as a miss
+        self.stats.record(hit)
+        return hit
+
+    def save(self, key: str, content: AudioContent) -> Path:
+        if isinstance(content, (bytes, bytearray)):
+            return self.store.put(key, bytes(content))
+        return self.store.put_chunks(key, content)
+
+
 def synthesize_to_file(
     text: str,
     voice_id: str,
@@ -48,23 +102,236 @@ def synthesize_to_file(
     output_path: Path,
     output_format: str = DEFAULT_OUTPUT_FORMAT,
     client: ElevenLabsClient | None = None,
+    cache: TTSCache | None = None,
+    audio_target: str | None = None,
+    ffmpeg: str = "ffmpeg",
 ) -> Path:
-    """Generate speech audio to a file using ElevenLabs."""
+    """Generate speech audio to a file using ElevenLabs.
+
+    With a `cache`, a clip already synthesized with the same text, voice, model and
+    format is reused without building a client or calling the API.
+
+    With an `audio_target` (e.g. `mp3_44k1_mono_64kbps`), the API chunks are piped into
+    ffmpeg as they arrive and `output_path` receives the device-ready encoding directly.
+    """
 
-    tts_client = client or build_elevenlabs_client()
-    audio = tts_client.text_to_speech.convert(text=text, voice_id=voice_id, model_id=model_id, output_format=output_format)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    _write_audio_content(audio, output_path)
+    if cache is not None and cache.fetch(TTSCache.key(text, voice_id, model_id, _cache_format(output_format, audio_target)), output_path):
+        return output_path
+    return _synthesize(text, voice_id, model_id, output_path, output_format, client or build_elevenlabs_client(), cache, audio_target, ffmpeg)
+
+
+def _cache_format(output_format: str, audio_target: str | None) -> str:
+    return output_format if audio_target is None else f"{output_format}|{audio_target}"
+
+
+def _synthesize(
+    text: str,
+    voice_id: str,
+    model_id: str,
+    output_path: Path,
+    output_format: str,
+    client: ElevenLabsClient,
+    cache: TTSCache | None,
+    audio_target: str | None = None,
+    ffmpeg: str = "ffmpeg",
+) -> Path:
+    """Call the API and write the clip, through `cache` when given (the caller already missed it)."""
+
+    target = AudioTarget.parse(audio_target) if audio_target is not None else None
+    audio = client.text_to_speech.convert(text=text, voice_id=voice_id, model_id=model_id, output_format=output_format)
+    key = TTSCache.key(text, voice_id, model_id, _cache_format(output_format, audio_target))
+    if target is not None:
+        transcode_stream([bytes(audio)] if isinstance(audio, (bytes, bytearray)) else audio, output_path, target, ffmpeg)
+        if cache is not None:
+            cache.save(key, output_path.read_bytes())
+        return output_path
+    if cache is None:
+        _write_audio_content(audio, output_path)
+        return output_path
+    link_or_copy(cache.save(key, audio), output_path)
     return output_path
 
 
 def _write_audio_content(content: AudioContent, output_path: Path) -> None:
-    """Write the provided audio content (bytes or iterable of bytes) to the given path."""
+    """Write the provided audio content (bytes or iterable of bytes) to the given path.
 
-    with output_path.open("wb") as output_file:
+    The clip is written to a temporary file and moved in place, so a previous file at
+    `output_path` (possibly a hardlink to a cached clip) is replaced, never rewritten.
+    """
+
+    def write(output_file: BinaryIO) -> None:
         if isinstance(content, (bytes, bytearray)):
             output_file.write(content)
             return
-
         for chunk in content:
             output_file.write(chunk)
+
+    atomic_write(output_path, write)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the time waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+@dataclass
+class SynthesisRequest:
+    text: str
+    voice_id: str
+    model_id: str
+    output_path: Path
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    audio_target: str | None = None
+
+
+@dataclass
+class SynthesisResult:
+    """Outcome of one `synthesize_batch` item.
+
+    Attributes:
+        request: The item as submitted.
+        output_path: Written file, or None when every attempt failed.
+        error: Last exception when the item failed.
+        attempts: API calls made (0 for a cache hit).
+        cached: Served from the TTS cache.
+        seconds: Wall time spent on the item, waits and retries included.
+    """
+
+    request: SynthesisRequest
+    output_path: Path | None
+    error: Exception | None = None
+    attempts: int = 0
+    cached: bool = False
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """True for rate limiting, server errors and network failures, which are worth retrying."""
+    if isinstance(exc, ApiError):
+        return exc.status_code in TRANSIENT_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(exc, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def synthesize_batch(
+    items: Sequence[SynthesisRequest],
+    client: ElevenLabsClient | None = None,
+    max_concurrency: int = 4,
+    rate_per_second: float | None = None,
+    max_attempts: int = 4,
+    backoff: float = 0.5,
+    max_backoff: float = 30.0,
+    cache: TTSCache | None = None,
+    ffmpeg: str = "ffmpeg",
+    sleep: Callable[[float], None] = time.sleep,
+) -> List[SynthesisResult]:
+    """Synthesize many clips concurrently with one shared client.
+
+    Items run on a thread pool of `max_concurrency` workers. Each API call first takes a
+    token from a `TokenBucket` when `rate_per_second` is set. Transient failures (see
+    `is_transient_error`) are retried up to `max_attempts` times with exponential
+    backoff, honouring `Retry-After` when the API sends it. Failures do not stop the
+    batch: they are reported on the item's result.
+
+    Args:
+        items: Clips to synthesize.
+        client: Shared client; built once from the environment when omitted.
+        max_concurrency: Maximum number of requests in flight.
+        rate_per_second: Sustained request rate (bursts up to `max_concurrency`).
+        max_attempts: Attempts per item, the first one included.
+        backoff: Delay before the first retry, doubled for each following one.
+        max_backoff: Upper bound for a single retry delay.
+        cache: Optional TTS cache consulted before calling the API.
+        ffmpeg: ffmpeg executable used for items with an `audio_target`.
+        sleep: Sleep function, replaceable in tests.
+
+    Returns:
+        One SynthesisResult per item, in input order.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if not items:
+        return []
+    shared_client: List[ElevenLabsClient] = [client] if client is not None else []
+    client_lock = threading.Lock()
+
+    def get_client() -> ElevenLabsClient:
+        # Built on the first cache miss only, then shared by every worker.
+        with client_lock:
+            if not shared_client:
+                shared_client.append(build_elevenlabs_client())
+            return shared_client[0]
+
+    bucket = TokenBucket(rate_per_second, capacity=max_concurrency, sleep=sleep) if rate_per_second else None
+
+    def run(item: SynthesisRequest) -> SynthesisResult:
+        started = time.perf_counter()
+        result = SynthesisResult(request=item, output_path=None)
+        item.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if cache is not None and cache.fetch(TTSCache.key(item.text, item.voice_id, item.model_id, _cache_format(item.output_format, item.audio_target)), item.output_path):
+            result.output_path, result.cached = item.output_path, True
+            result.seconds = time.perf_counter() - started
+            return result
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            result.attempts += 1
+            try:
+                result.output_path = _synthesize(item.text, item.voice_id, item.model_id, item.output_path, item.output_format, get_client(), cache, item.audio_target, ffmpeg)
+                result.error = None
+                break
+            except Exception as exc:  # reported per item
+                result.error = exc
+                if result.attempts >= max_attempts or not is_transient_error(exc):
+                    break
+                delay = _retry_after(exc)
+                sleep(min(max_backoff, delay if delay is not None else backoff * 2 ** (result.attempts - 1)))
+        result.seconds = time.perf_counter() - started
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        return list(pool.map(run, items))
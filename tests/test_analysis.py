@@ -0,0 +1,35 @@
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.analysis import estimate_state_space
+from lunii_cyoa.expansion import expand_story
+from lunii_cyoa.loader import load_story
+
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["story_minimal.toml", "story_with_choices.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"],
+)
+def test_estimate_bounds_actual_expansion(filename: str) -> None:
+    doc = load_story(FIXTURE_DIR / filename)
+    estimate = estimate_state_space(doc)
+    actual = Counter(node.logical_id for node in expand_story(doc).physical_nodes)
+    assert set(estimate.per_node) == set(actual)
+    for logical_id, count in actual.items():
+        assert estimate.per_node[logical_id] >= count
+    assert sum(actual.values()) <= estimate.estimate <= estimate.product_upper_bound
+
+
+def test_estimate_tracks_written_vars_only() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    estimate = estimate_state_space(doc)
+    assert estimate.declared_states == 3 * 4
+    assert estimate.per_node == {"gate": 1, "gate_after_purchase": 1, "inside": 1, "caught": 4, "end": 4}
+    assert estimate.estimate == 11
+    assert estimate.product_upper_bound == 5 * 12
+    assert estimate.fits(11) and not estimate.fits(10)
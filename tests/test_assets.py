@@ -0,0 +1,74 @@
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+import pytest
+
+from lunii_cyoa.assets import copy_assets, is_up_to_date, link_or_copy
+from lunii_cyoa.content_store import atomic_write
+
+
+def _source(tmp_path: Path, name: str, content: bytes) -> Path:
+    path = tmp_path / "src" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_copy_assets_dedupes_and_reports_bytes(tmp_path: Path) -> None:
+    image = _source(tmp_path, "a.png", b"image")
+    audio = _source(tmp_path, "a.mp3", b"audio-data")
+    out = tmp_path / "out"
+    pairs = [(image, out / "a.png"), (audio, out / "a.mp3")] * 10 + [(tmp_path / "src" / "gone.png", out / "gone.png")]
+    report = copy_assets(pairs, workers=4, link=False)
+    assert (report.requested, report.unique, report.copied, report.missing) == (21, 3, 2, 1)
+    assert report.bytes_written == len(b"image") + len(b"audio-data")
+    assert (out / "a.mp3").read_bytes() == b"audio-data"
+    assert not (out / "gone.png").exists()
+
+
+def test_copy_assets_skips_up_to_date_destinations(tmp_path: Path) -> None:
+    image = _source(tmp_path, "a.png", b"image")
+    out = tmp_path / "out"
+    copy_assets([(image, out / "a.png")], link=False)
+    again = copy_assets([(image, out / "a.png")], link=False)
+    assert (again.skipped, again.copied, again.bytes_written) == (1, 0, 0)
+
+    # same size but a different mtime: contents are compared, and the new bytes are copied
+    image.write_bytes(b"IMAGE")
+    stat = (out / "a.png").stat()
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert not is_up_to_date(image, out / "a.png")
+    assert copy_assets([(image, out / "a.png")], link=False).copied == 1
+    assert (out / "a.png").read_bytes() == b"IMAGE"
+
+
+def test_link_or_copy_prefers_hardlinks(tmp_path: Path) -> None:
+    image = _source(tmp_path, "a.png", b"image")
+    dest = tmp_path / "out" / "img" / "a.png"
+    method = link_or_copy(image, dest)
+    assert dest.read_bytes() == b"image"
+    if method == "hardlink":
+        assert dest.stat().st_ino == image.stat().st_ino
+    assert is_up_to_date(image, dest)
+    assert link_or_copy(image, dest, link=False) == "copy"
+    assert [path.name for path in dest.parent.iterdir()] == ["a.png"]
+
+
+def test_atomic_write_keeps_destination_on_failure(tmp_path: Path) -> None:
+    image = _source(tmp_path, "a.png", b"image")
+    dest = tmp_path / "out" / "a.png"
+    link_or_copy(image, dest)
+
+    def fail(handle: BinaryIO) -> None:
+        handle.write(b"partial")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(dest, fail)
+    assert dest.read_bytes() == b"image"
+    assert [path.name for path in dest.parent.iterdir()] == ["a.png"]
+
+    atomic_write(dest, lambda handle: handle.write(b"fresh"))
+    assert dest.read_bytes() == b"fresh"
+    assert image.read_bytes() == b"image"
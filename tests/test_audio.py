@@ -0,0 +1,93 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.audio import AudioTarget, AudioTranscodeError, transcode_stream
+from lunii_cyoa.tts import TTSCache, synthesize_to_file
+
+# Stand-in for ffmpeg: records its arguments and the bytes read from stdin in the output file.
+FAKE_FFMPEG = """#!{python}
+import json, sys
+data = sys.stdin.buffer.read()
+with open(sys.argv[-1], "w") as handle:
+    json.dump({{"args": sys.argv[1:-1], "data": data.decode()}}, handle)
+"""
+
+FAILING_FFMPEG = """#!{python}
+import sys
+sys.stdin.buffer.read()
+sys.stderr.write("Invalid data found when processing input")
+sys.exit(1)
+"""
+
+
+def _script(tmp_path: Path, name: str, source: str) -> str:
+    path = tmp_path / name
+    path.write_text(source.format(python=sys.executable))
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_parse_audio_target() -> None:
+    assert AudioTarget.parse("mp3_44k1_mono_64kbps") == AudioTarget("mp3", 44100, 1, 64)
+    assert AudioTarget.parse("ogg_22k05_stereo_96kbps") == AudioTarget("ogg", 22050, 2, 96)
+    assert AudioTarget.parse("mp3_48k_mono_128kbps").sample_rate == 48000
+    with pytest.raises(AudioTranscodeError):
+        AudioTarget.parse("wav_44k1_mono")
+
+
+def test_transcode_stream_pipes_chunks_to_ffmpeg(tmp_path: Path) -> None:
+    ffmpeg = _script(tmp_path, "ffmpeg", FAKE_FFMPEG)
+    output = tmp_path / "out" / "clip.mp3"
+    transcode_stream(iter([b"abc", b"def"]), output, AudioTarget.parse("mp3_44k1_mono_64kbps"), ffmpeg)
+    recorded = json.loads(output.read_text())
+    assert recorded["data"] == "abcdef"
+    assert recorded["args"][recorded["args"].index("-i") + 1] == "pipe:0"
+    assert recorded["args"][-11:] == ["-vn", "-codec:a", "libmp3lame", "-ar", "44100", "-ac", "1", "-b:a", "64k", "-f", "mp3"]
+    assert [path.name for path in output.parent.iterdir()] == ["clip.mp3"]
+
+
+def test_transcode_stream_failure_leaves_no_output(tmp_path: Path) -> None:
+    ffmpeg = _script(tmp_path, "ffmpeg", FAILING_FFMPEG)
+    output = tmp_path / "out" / "clip.mp3"
+    with pytest.raises(AudioTranscodeError, match="Invalid data"):
+        transcode_stream([b"abc"], output, AudioTarget.parse("mp3_44k1_mono_64kbps"), ffmpeg)
+    assert list(output.parent.iterdir()) == []
+
+
+def test_transcode_stream_missing_ffmpeg(tmp_path: Path) -> None:
+    with pytest.raises(AudioTranscodeError, match="Failed to start"):
+        transcode_stream([b"abc"], tmp_path / "clip.mp3", AudioTarget.parse("mp3_44k1_mono_64kbps"), str(tmp_path / "missing"))
+
+
+class _FakeTextToSpeech:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def convert(self, *, text: str, voice_id: str, model_id: str, output_format: str) -> list[bytes]:
+        self.calls += 1
+        return [text.encode(), b"!"]
+
+
+class _FakeClient:
+    def __init__(self) -> None:
+        self.text_to_speech = _FakeTextToSpeech()
+
+
+def test_synthesize_to_file_transcodes_and_caches_target(tmp_path: Path) -> None:
+    ffmpeg = _script(tmp_path, "ffmpeg", FAKE_FFMPEG)
+    cache = TTSCache(tmp_path / "cache")
+    client = _FakeClient()
+    kwargs = dict(client=client, cache=cache, audio_target="mp3_44k1_mono_64kbps", ffmpeg=ffmpeg)
+    first = synthesize_to_file("Hello", "voice", "model", tmp_path / "a.mp3", **kwargs)
+    second = synthesize_to_file("Hello", "voice", "model", tmp_path / "b.mp3", **kwargs)
+    assert json.loads(first.read_text())["data"] == "Hello!"
+    assert first.read_bytes() == second.read_bytes()
+    assert client.text_to_speech.calls == 1
+
+    # The untranscoded clip is cached under a different key.
+    synthesize_to_file("Hello", "voice", "model", tmp_path / "raw.mp3", client=client, cache=cache)
+    assert (tmp_path / "raw.mp3").read_bytes() == b"Hello!"
+    assert client.text_to_speech.calls == 2
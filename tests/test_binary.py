@@ -0,0 +1,77 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.binary import CompiledStoryError, compile_story, load_compiled_story
+from lunii_cyoa.expansion import expand_story
+from lunii_cyoa.loader import StoryLoadError, load_story
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+@pytest.mark.parametrize("filename", ["story_minimal.toml", "story_with_choices.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"])
+def test_compiled_story_round_trips(tmp_path: Path, filename: str) -> None:
+    doc = load_story(FIXTURE_DIR / filename)
+    path = compile_story(doc, tmp_path / "story.cyoab")
+    loaded = load_story(path)
+    assert loaded.model_dump() == doc.model_dump()
+    assert list(loaded.state) == list(doc.state)
+    assert expand_story(loaded) == expand_story(doc)
+
+
+def test_compiled_story_decodes_nodes_lazily(tmp_path: Path) -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    with load_compiled_story(compile_story(doc, tmp_path / "story.cyoab")) as compiled:
+        assert len(compiled) == len(doc.nodes)
+        assert compiled.story.start_node == "gate"
+        assert compiled._nodes == [None] * len(doc.nodes)
+        gate = compiled.node("gate")
+        assert gate == doc.nodes[0]
+        assert compiled.node("gate") is gate
+        assert sum(node is not None for node in compiled._nodes) == 1
+        assert compiled.node_ids == [node.id for node in doc.nodes]
+        with pytest.raises(CompiledStoryError):
+            compiled.node("missing")
+
+
+def test_compiled_story_keeps_effect_value_types(tmp_path: Path) -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    with load_compiled_story(compile_story(doc, tmp_path / "story.cyoab")) as compiled:
+        value = compiled.node("entrance").choices[0].effects[0].value
+    assert value is True
+
+
+def test_corrupt_compiled_story_raises(tmp_path: Path) -> None:
+    path = tmp_path / "story.cyoab"
+    path.write_bytes(b"CYOAB\x00garbage")
+    with pytest.raises(StoryLoadError):
+        load_story(path)
+    path.write_bytes(b"")
+    with pytest.raises(CompiledStoryError):
+        load_compiled_story(path)
+
+
+# (table, field offset in the row, struct format, bad value)
+CORRUPT_ROWS = {
+    "node kind": ("_node_table", 4, "<B", 9),
+    "node id": ("_node_table", 0, "<I", 0xFFFFFF),
+    "missing node bg": ("_node_table", 5, "<I", 0xFFFFFFFF),
+    "choice range": ("_node_table", 21, "<I", 1000),
+    "effect range": ("_choice_table", 24, "<I", 1000),
+    "effect operator": ("_effect_table", 4, "<B", 7),
+    "effect value tag": ("_effect_table", 5, "<B", 9),
+}
+
+
+@pytest.mark.parametrize("case", sorted(CORRUPT_ROWS))
+def test_corrupt_compiled_rows_raise(tmp_path: Path, case: str) -> None:
+    path = compile_story(load_story(FIXTURE_DIR / "story_with_choices.toml"), tmp_path / "story.cyoab")
+    table, offset, fmt, value = CORRUPT_ROWS[case]
+    with load_compiled_story(path) as compiled:
+        position = getattr(compiled, table) + offset
+    data = bytearray(path.read_bytes())
+    struct.pack_into(fmt, data, position, value)
+    path.write_bytes(bytes(data))
+    with pytest.raises(StoryLoadError, match="Corrupt compiled story"):
+        load_story(path)
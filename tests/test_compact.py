@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.compact import CompactExpansionResult, expand_story_compact
+from lunii_cyoa.expansion import expand_story
+from lunii_cyoa.loader import load_story
+
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["story_minimal.toml", "story_with_choices.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"],
+)
+def test_compact_result_round_trips(filename: str) -> None:
+    doc = load_story(FIXTURE_DIR / filename)
+    expected = expand_story(doc)
+    compact = expand_story_compact(doc)
+    assert len(compact) == len(expected.physical_nodes)
+    assert compact.to_expansion_result() == expected
+    assert CompactExpansionResult.make_from_expansion_result(expected, doc).to_expansion_result() == expected
+
+
+@pytest.mark.parametrize("collapse_dead_state", [True, False])
+def test_compact_result_matches_expand_story_collapse_setting(collapse_dead_state: bool) -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    expected = expand_story(doc, collapse_dead_state=collapse_dead_state)
+    compact = expand_story_compact(doc, collapse_dead_state=collapse_dead_state)
+    assert compact.to_expansion_result() == expected
+    assert len(expand_story_compact(doc, collapse_dead_state=False)) > len(expand_story_compact(doc))
+
+
+def test_compact_node_view_reads_columns() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    compact = expand_story_compact(doc)
+    entrance = compact[0]
+    assert entrance.logical_id == "entrance"
+    assert entrance.kind == "menu"
+    assert entrance.state == {"key": False}
+    assert entrance.labels == ["take_key", "ignore_key"]
+    assert [compact[target].state for target in entrance.outgoing] == [{"key": True}, {"key": False}]
+    assert not hasattr(entrance, "__dict__")
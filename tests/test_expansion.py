@@ -3,7 +3,9 @@ from pathlib import Path
 import pytest
 
 from lunii_cyoa.loader import load_story
-from lunii_cyoa.expansion import expand_story, ExpansionError
+from lunii_cyoa.expansion import EffectApplicationError, EffectApplier, FifoFrontier, GuardEvaluationError, GuardEvaluator, StoryExpander, compile_guards, expand_story, iter_expand, ExpansionError
+from lunii_cyoa.structures import Edge, ExpansionResult, PhysicalNode
+from lunii_cyoa.models import Effect, StateBool, StateEnum, StateInt
 
 
 FIXTURE_DIR = Path(__file__).parent
@@ -121,5 +123,144 @@ audio = "audio/b.mp3"
         encoding="utf-8",
     )
     doc = load_story(bad)
-    with pytest.raises(ExpansionError):
+    with pytest.raises(ExpansionError, match="Effect error in node 'start', choice 'hurt': Value -7 out of bounds for 'hp'"):
         expand_story(doc)
+
+
+@pytest.mark.parametrize(
+    "expr,expected",
+    [
+        ("hp >= 2 && key", True),
+        ("!key || hp < 1", False),
+        ('0 < hp <= 3 && mood != "calm"', True),
+        ('(hp == 1 || hp == 2) && !(mood == "alert")', False),
+    ],
+)
+def test_compiled_guard_evaluates(expr: str, expected: bool) -> None:
+    evaluator = GuardEvaluator(
+        {
+            "hp": StateInt(type="int", min=0, max=3),
+            "key": StateBool(type="bool"),
+            "mood": StateEnum(type="enum", values=["calm", "alert"]),
+        }
+    )
+    state = {"hp": 2, "key": True, "mood": "alert"}
+    guard = evaluator.compile(expr)
+    assert guard(state) is expected
+    assert evaluator.compile(expr) is guard
+    assert evaluator.evaluate(expr, state) is expected
+
+
+@pytest.mark.parametrize("expr", ["missing > 0", "hp + 1 > 2", "len(hp) > 0", "hp >"])
+def test_malformed_guard_fails_at_compile_time(expr: str) -> None:
+    evaluator = GuardEvaluator({"hp": StateInt(type="int", min=0, max=3)})
+    with pytest.raises(GuardEvaluationError):
+        evaluator.compile(expr)
+
+
+def test_compile_guards_collects_story_guards() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    compiled = compile_guards(doc)
+    assert set(compiled) == {'ticket == "bronze"', 'ticket == "none"'}
+    assert compiled['ticket == "bronze"']({"ticket": "bronze", "hp": 2}) is True
+
+
+def _graph_signature(result: ExpansionResult) -> set[tuple[str, str, str | None]]:
+    keys = {node.physical_id: f"{node.logical_id}{sorted(node.state.items())}" for node in result.physical_nodes}
+    return {(keys[edge.source], keys[edge.target], edge.label) for edge in result.edges}
+
+
+def test_frontier_orders_expand_same_graph() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    bfs = expand_story(doc)
+    dfs = expand_story(doc, frontier="dfs")
+    best_first = expand_story(doc, frontier="priority", priority_key=lambda node_id, state: (-state["hp"], node_id))
+    assert [node.logical_id for node in bfs.physical_nodes] == ["gate", "gate_after_purchase", "caught", "inside", "end"]
+    assert _graph_signature(dfs) == _graph_signature(bfs)
+    assert _graph_signature(best_first) == _graph_signature(bfs)
+    assert expand_story(doc, frontier="dfs") == dfs
+
+
+def test_fifo_frontier_pops_in_push_order() -> None:
+    frontier = FifoFrontier()
+    for pid in range(3):
+        frontier.push(("node", 0, pid))
+    assert [frontier.pop()[2] for index_pop in range(len(frontier))] == [0, 1, 2]
+
+
+def test_priority_frontier_requires_key() -> None:
+    doc = load_story(FIXTURE_DIR / "story_minimal.toml")
+    with pytest.raises(ExpansionError):
+        expand_story(doc, frontier="priority")
+
+
+@pytest.mark.parametrize(
+    "effects",
+    [
+        [],
+        [Effect(var="hp", op="+=", value=1)],
+        [Effect(var="hp", op="-=", value=2), Effect(var="key", op="=", value=True)],
+        [Effect(var="hp", op="=", value=3), Effect(var="mood", op="=", value="alert"), Effect(var="hp", op="-=", value=1)],
+    ],
+)
+def test_compiled_effects_match_dict_application(effects: list[Effect]) -> None:
+    applier = EffectApplier(
+        {
+            "hp": StateInt(type="int", min=0, max=3),
+            "key": StateBool(type="bool"),
+            "mood": StateEnum(type="enum", values=["calm", "alert"]),
+        }
+    )
+    program = applier.compile(effects)
+    for packed in range(applier.layout.size):
+        state = applier.layout.decode(packed)
+        try:
+            expected = applier.apply(effects, state)
+        except EffectApplicationError as exc:
+            with pytest.raises(EffectApplicationError, match=str(exc)):
+                program(packed)
+            continue
+        assert applier.layout.decode(program(packed)) == expected
+
+
+@pytest.mark.parametrize(
+    "effect,message",
+    [
+        (Effect(var="missing", op="=", value=1), "unknown var 'missing'"),
+        (Effect(var="key", op="+=", value=True), "only supports '='"),
+        (Effect(var="mood", op="=", value="angry"), "not in"),
+        (Effect(var="hp", op="=", value="full"), "requires integer value"),
+    ],
+)
+def test_invalid_effects_fail_at_compile_time(effect: Effect, message: str) -> None:
+    applier = EffectApplier({"hp": StateInt(type="int", min=0, max=3), "key": StateBool(type="bool"), "mood": StateEnum(type="enum", values=["calm"])})
+    with pytest.raises(EffectApplicationError, match=message):
+        applier.compile([effect])
+
+
+def test_transition_cache_reuses_projected_states() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    result = expand_story(doc, collapse_dead_state=False)
+    # both "end" states only differ on vars that "end" never reads
+    assert result.stats.transition_cache_misses == 5
+    assert result.stats.transition_cache_hits == 1
+
+
+def test_iter_expand_streams_the_expansion() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    expected = expand_story(doc)
+    items = list(iter_expand(doc))
+    assert [item for item in items if isinstance(item, PhysicalNode)] == expected.physical_nodes
+    assert [item for item in items if isinstance(item, Edge)] == expected.edges
+    # a node is always emitted before its outgoing edges
+    assert isinstance(items[0], PhysicalNode) and isinstance(items[1], Edge)
+
+
+def test_summarize_matches_full_expansion() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_random.toml")
+    expected = expand_story(doc)
+    summary = StoryExpander(doc).summarize()
+    assert summary.node_count == len(expected.physical_nodes)
+    assert summary.edge_count == len(expected.edges)
+    assert summary.dead_ends == expected.dead_ends
+    assert summary.unreachable_logical == expected.unreachable_logical
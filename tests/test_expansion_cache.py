@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.content_store import ContentStore
+from lunii_cyoa.expansion import expand_story
+from lunii_cyoa.expansion_cache import ExpansionCache, decode_expansion, encode_expansion, story_digest
+from lunii_cyoa.exporter import StudioExporter
+from lunii_cyoa.loader import load_story
+from lunii_cyoa.state_layout import StateLayout
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+def test_encode_decode_round_trips_every_fixture() -> None:
+    for path in sorted(FIXTURE_DIR.glob("story_*.toml")):
+        doc = load_story(path)
+        for collapse in (True, False):
+            result = expand_story(doc, collapse_dead_state=collapse)
+            assert decode_expansion(encode_expansion(result, StateLayout(doc.state)), doc) == result
+
+
+def test_story_digest_tracks_content_and_options() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    assert story_digest(doc, max_states=10) == story_digest(load_story(FIXTURE_DIR / "story_with_choices.toml"), max_states=10)
+    assert story_digest(doc, max_states=10) != story_digest(doc, max_states=11)
+    edited = doc.model_copy(deep=True)
+    edited.nodes[1].choices[0].guard = "key == false"
+    assert story_digest(edited, max_states=10) != story_digest(doc, max_states=10)
+
+
+def test_expansion_cache_hits_on_unchanged_story(tmp_path: Path) -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    cache = ExpansionCache(tmp_path)
+    first = cache.expand(doc)
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+    assert ExpansionCache(tmp_path).expand(doc) == first
+    assert cache.expand(doc, max_states=100) == first
+    assert cache.stats.misses == 2
+
+
+def test_expansion_cache_drops_corrupt_entries(tmp_path: Path) -> None:
+    doc = load_story(FIXTURE_DIR / "story_minimal.toml")
+    cache = ExpansionCache(tmp_path)
+    path = cache.put(doc, expand_story(doc))
+    path.write_bytes(b"LCYX garbage")
+    assert cache.get(doc) is None
+    assert not path.exists()
+    assert cache.expand(doc) == expand_story(doc)
+
+
+def test_content_store_evicts_least_recently_used(tmp_path: Path) -> None:
+    store = ContentStore(tmp_path, max_bytes=250)
+    for index, key in enumerate(["aa01", "bb02", "cc03"]):
+        path = store.put(key, b"x" * 100)
+        os.utime(path, (1000 + index, 1000 + index))
+    assert store.get("aa01") is None and store.get("bb02") is not None
+    os.utime(store.path_for("cc03"), (900, 900))
+    store.put("dd04", b"y" * 100)
+    assert store.lookup("cc03") is None
+    assert store.get("bb02") == b"x" * 100
+    assert store.stats.evictions == 2
+
+
+def test_content_store_only_scans_when_over_budget(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store = ContentStore(tmp_path, max_bytes=500)
+    store.put("aa01", b"x" * 100)
+    scans = []
+    scan = store._scan
+    monkeypatch.setattr(store, "_scan", lambda: scans.append(1) or scan())
+    for key in ["bb02", "cc03", "dd04"]:
+        store.put(key, b"x" * 100)
+    store.put("bb02", b"y" * 50)
+    store.discard("cc03")
+    assert scans == [] and store._size == 250
+    os.utime(store.path_for("aa01"), (900, 900))
+    store.put("ee05", b"z" * 300)
+    assert scans == [1] and store.stats.evictions == 1
+    assert store._size == 450 and store.lookup("aa01") is None
+
+
+def test_exporter_reuses_cached_expansion(tmp_path: Path) -> None:
+    story_path = FIXTURE_DIR / "story_with_choices.toml"
+    cache = ExpansionCache(tmp_path / "cache")
+    first = StudioExporter(story_path=story_path, output_dir=tmp_path / "a", copy_assets=False, expansion_cache=cache)
+    first.export()
+    second = StudioExporter(story_path=story_path, output_dir=tmp_path / "b", copy_assets=False, expansion_cache=cache)
+    second.export()
+    assert not first.report.expansion_cached
+    assert second.report.expansion_cached
+    assert second.report.stage_nodes == first.report.stage_nodes
@@ -1,9 +1,14 @@
 import json
 from pathlib import Path
+from uuid import UUID
 
 import pytest
+from PIL import Image
 
-from lunii_cyoa.exporter import StudioExporter
+from lunii_cyoa.exporter import StudioExporter, node_uuid, story_namespace
+from lunii_cyoa.image_convert import image_to_bitmap_rle4
+from lunii_cyoa.loader import load_story
+from lunii_cyoa.structures import PhysicalNode
 
 
 FIXTURE_DIR = Path(__file__).parent
@@ -30,8 +35,123 @@ def test_export_creates_story_json(tmp_path: Path) -> None:
     # assets copied
     assert (tmp_path / "assets" / "img" / "crossroad.png").exists()
     assert (tmp_path / "assets" / "audio" / "crossroad.mp3").exists()
+    assert exporter.report.assets.missing == 0
+    assert exporter.report.assets.unique <= exporter.report.assets.requested
+    # a second export finds every asset already in place
+    exporter.export()
+    assert exporter.report.assets.skipped == exporter.report.assets.unique
+    assert exporter.report.assets.bytes_written == 0
 
 
 def test_export_fails_on_missing_story(tmp_path: Path) -> None:
     with pytest.raises(Exception):
         StudioExporter(story_path=tmp_path / "missing.toml", output_dir=tmp_path).export()
+
+
+def test_export_merges_equivalent_stage_nodes(tmp_path: Path) -> None:
+    # Without dead-state collapse, two physical nodes of this story are bisimilar.
+    story_path = FIXTURE_DIR / "story_with_assets_and_guard.toml"
+    exporter = StudioExporter(story_path=story_path, output_dir=tmp_path / "min", copy_assets=False, collapse_dead_state=False)
+    data = json.loads(exporter.export().read_text(encoding="utf-8"))
+    assert (exporter.report.physical_nodes, exporter.report.stage_nodes) == (6, 5)
+    assert len(data["stageNodes"]) == 5
+    assert exporter.report.reduction_ratio == 1 - 5 / 6
+
+    unminimized = StudioExporter(story_path=story_path, output_dir=tmp_path / "full", copy_assets=False, collapse_dead_state=False, minimize=False)
+    unminimized.export()
+    assert (unminimized.report.physical_nodes, unminimized.report.stage_nodes) == (6, 6)
+
+
+def test_export_node_ids_are_stable_across_builds(tmp_path: Path) -> None:
+    story_path = FIXTURE_DIR / "story_with_assets_and_guard.toml"
+    first = StudioExporter(story_path=story_path, output_dir=tmp_path / "a", copy_assets=False).export()
+    second = StudioExporter(story_path=story_path, output_dir=tmp_path / "b", copy_assets=False).export()
+    assert first.read_bytes() == second.read_bytes()
+    data = json.loads(first.read_text(encoding="utf-8"))
+    stage_ids = [stage["uuid"] for stage in data["stageNodes"]]
+    assert len(set(stage_ids)) == len(stage_ids)
+    assert all(stage_id == stage_id.upper() and UUID(stage_id).version == 5 for stage_id in stage_ids)
+
+
+def test_node_uuid_depends_on_story_identity() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    node = PhysicalNode(physical_id=0, logical_id="hall", kind="branch", state={"key": True})
+    renamed = doc.model_copy(deep=True)
+    renamed.story.id = "another-story"
+    pinned = doc.model_copy(deep=True)
+    pinned.story.output_uuid = "0f6ee2d5-6b6b-4e5c-9d3b-6c4a4b1f3e10"
+    ids = {node_uuid(story_namespace(variant), "stage", node) for variant in (doc, renamed, pinned)}
+    assert len(ids) == 3
+    assert node_uuid(story_namespace(doc), "stage", node) != node_uuid(story_namespace(doc), "action", node)
+    moved = PhysicalNode(physical_id=7, logical_id="hall", kind="branch", state={"key": True}, outgoing=[1])
+    assert node_uuid(story_namespace(doc), "stage", moved) == node_uuid(story_namespace(doc), "stage", node)
+
+
+@pytest.mark.parametrize("filename", ["story_minimal.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"])
+def test_streaming_export_matches_builder_output(tmp_path: Path, filename: str) -> None:
+    story_path = FIXTURE_DIR / filename
+    streamed = StudioExporter(story_path=story_path, output_dir=tmp_path / "stream", copy_assets=False).export()
+    built = StudioExporter(story_path=story_path, output_dir=tmp_path / "builder", copy_assets=False, stream=False).export()
+    assert streamed.read_bytes() == built.read_bytes()
+
+
+@pytest.mark.parametrize("share_action_nodes", [True, False])
+@pytest.mark.parametrize("filename", ["story_with_choices.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"])
+def test_unminimized_export_streams_from_the_walk(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, filename: str, share_action_nodes: bool) -> None:
+    story_path = FIXTURE_DIR / filename
+    options = dict(copy_assets=False, minimize=False, share_action_nodes=share_action_nodes)
+    walked = StudioExporter(story_path=story_path, output_dir=tmp_path / "walk", **options)
+    # No ExpansionResult is built on this path.
+    monkeypatch.setattr(walked, "_expand", None)
+    built = StudioExporter(story_path=story_path, output_dir=tmp_path / "builder", stream=False, **options)
+    assert walked.export().read_bytes() == built.export().read_bytes()
+    assert walked.report == built.report
+
+
+def test_compact_export_holds_the_same_document(tmp_path: Path) -> None:
+    story_path = FIXTURE_DIR / "story_with_choices.toml"
+    compact = StudioExporter(story_path=story_path, output_dir=tmp_path / "compact", copy_assets=False, json_indent=None).export()
+    indented = StudioExporter(story_path=story_path, output_dir=tmp_path / "indented", copy_assets=False).export()
+    assert b"\n" not in compact.read_bytes()
+    assert json.loads(compact.read_bytes()) == json.loads(indented.read_bytes())
+    assert [path.name for path in (tmp_path / "compact").iterdir()] == ["story.json"]
+
+
+def test_export_shares_action_nodes_with_identical_options(tmp_path: Path) -> None:
+    story_path = FIXTURE_DIR / "story_with_random.toml"
+    exporter = StudioExporter(story_path=story_path, output_dir=tmp_path / "shared", copy_assets=False)
+    data = json.loads(exporter.export().read_text(encoding="utf-8"))
+    option_lists = [tuple(action["options"]) for action in data["actionNodes"]]
+    assert len(set(option_lists)) == len(option_lists)
+    referenced = {stage["okTransition"]["actionNode"] for stage in data["stageNodes"] if stage.get("okTransition")}
+    assert referenced == {action["id"] for action in data["actionNodes"]}
+    assert exporter.report.action_nodes < exporter.report.action_references
+    assert exporter.report.action_dedup_ratio == 1 - exporter.report.action_nodes / exporter.report.action_references
+
+    unshared = StudioExporter(story_path=story_path, output_dir=tmp_path / "unshared", copy_assets=False, share_action_nodes=False)
+    unshared_data = json.loads(unshared.export().read_text(encoding="utf-8"))
+    assert len(unshared_data["actionNodes"]) == exporter.report.action_references
+    assert unshared.report.action_dedup_ratio == 0.0
+
+
+def test_export_converts_images_to_device_bitmaps(tmp_path: Path) -> None:
+    story_path = tmp_path / "story.toml"
+    story_path.write_text((FIXTURE_DIR / "story_with_assets_and_guard.toml").read_text(encoding="utf-8"), encoding="utf-8")
+    for name in ["gate", "gate2", "inside", "caught", "end"]:
+        (tmp_path / "assets" / "img").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "assets" / "audio").mkdir(parents=True, exist_ok=True)
+        Image.new("RGB", (64, 48), (40 * len(name), 90, 160)).save(tmp_path / "assets" / "img" / f"{name}.png")
+        (tmp_path / "assets" / "audio" / f"{name}.mp3").write_bytes(b"aud")
+
+    exporter = StudioExporter(story_path=story_path, output_dir=tmp_path / "out", convert_images=True)
+    data = json.loads(exporter.export().read_text(encoding="utf-8"))
+
+    assert {stage["image"] for stage in data["stageNodes"]} <= {f"img/{name}.bmp" for name in ["gate", "gate2", "inside", "caught", "end"]}
+    bitmap = tmp_path / "out" / "assets" / "img" / "gate.bmp"
+    assert bitmap.read_bytes() == image_to_bitmap_rle4((tmp_path / "assets" / "img" / "gate.png").read_bytes())
+    assert not (tmp_path / "out" / "assets" / "img" / "gate.png").exists()
+    assert exporter.report.images.converted == exporter.report.images.requested - exporter.report.images.skipped > 0
+    assert exporter.report.assets.missing == 0
+
+    exporter.export()
+    assert exporter.report.images.converted == 0
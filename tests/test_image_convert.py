@@ -0,0 +1,58 @@
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+from pkg.api.convert_image import image_to_bitmap_rle4 as reference_rle4
+
+from lunii_cyoa.image_convert import ImageConvertError, ImageTarget, convert_images, encode_rle4, image_to_bitmap_rle4
+
+
+def _encoded(image: Image.Image, image_format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def _images() -> list[Image.Image]:
+    rng = np.random.default_rng(7)
+    noise = Image.fromarray(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    blocks = Image.fromarray((rng.integers(0, 4, (24, 32, 3)) * 80).astype(np.uint8)).resize((320, 240), Image.Resampling.NEAREST)
+    return [noise, blocks, Image.new("RGB", (320, 240), (10, 200, 30)), noise.convert("L"), noise.convert("1"), noise.convert("P"), noise.convert("RGBA")]
+
+
+@pytest.mark.parametrize("image_format", ["PNG", "BMP"])
+def test_matches_reference_encoder(image_format: str) -> None:
+    for image in _images():
+        data = _encoded(image, image_format)
+        assert image_to_bitmap_rle4(data) == reference_rle4(data)
+
+
+def test_device_bitmap_is_returned_unchanged() -> None:
+    bitmap = image_to_bitmap_rle4(_encoded(_images()[1]))
+    assert image_to_bitmap_rle4(bitmap) == bitmap
+    with Image.open(io.BytesIO(bitmap)) as image:
+        assert image.size == (320, 240)
+
+
+def test_encode_rle4_splits_long_runs() -> None:
+    gray = np.zeros((2, 300), dtype=np.uint8)
+    gray[1, 100:] = 15
+    assert encode_rle4(gray) == bytes([255, 0x00, 45, 0x00, 0, 0, 100, 0x00, 200, 0xFF, 0, 1])
+
+
+def test_parse_image_target() -> None:
+    assert ImageTarget.parse("bmp_320x240_4bpp").size == (320, 240)
+    with pytest.raises(ImageConvertError):
+        ImageTarget.parse("png_320x240")
+
+
+def test_convert_images_skips_up_to_date_outputs(tmp_path: Path) -> None:
+    source = tmp_path / "menu.png"
+    _images()[0].save(source)
+    pairs = [(source, tmp_path / "out" / "menu.bmp")] * 3 + [(tmp_path / "missing.png", tmp_path / "out" / "missing.bmp")]
+    report = convert_images(pairs)
+    assert (report.requested, report.converted, report.missing) == (4, 1, 1)
+    assert (tmp_path / "out" / "menu.bmp").read_bytes() == reference_rle4(source.read_bytes())
+    assert convert_images(pairs).skipped == 1
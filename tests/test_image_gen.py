@@ -0,0 +1,122 @@
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from lunii_cyoa.image_gen import (
+    ImageBackend,
+    ImageCache,
+    ImageGenerationError,
+    ImageRequest,
+    LocalImageBackend,
+    generate_gemini_image,
+    generate_images,
+)
+
+
+class CountingBackend:
+    def __init__(self, delay: float = 0.0, fail_on: str | None = None) -> None:
+        self.local = LocalImageBackend(size=(64, 48))
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls: list[tuple[str, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, model: str) -> Image.Image:
+        with self._lock:
+            self.calls.append((prompt, model))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if prompt == self.fail_on:
+                raise ImageGenerationError("no image")
+            return self.local.generate(prompt, model)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_local_backend_is_deterministic() -> None:
+    backend = LocalImageBackend(size=(32, 24))
+    assert isinstance(backend, ImageBackend)
+    first = backend.generate("a robot", "model")
+    assert first.size == (32, 24)
+    assert first.tobytes() == backend.generate("a robot", "model").tobytes()
+    assert first.tobytes() != backend.generate("a garden", "model").tobytes()
+
+
+def test_generate_images_caps_concurrency_and_resizes(tmp_path: Path) -> None:
+    backend = CountingBackend(delay=0.02)
+    items = [ImageRequest(f"prompt {index}", tmp_path / f"menu_{index}.png", size=(32, 24)) for index in range(8)]
+    results = generate_images(items, backend=backend, max_concurrency=3)
+    assert all(result.ok for result in results)
+    assert [result.request for result in results] == items
+    assert 1 < backend.max_in_flight <= 3
+    with Image.open(tmp_path / "menu_0.png") as image:
+        assert image.size == (32, 24)
+
+
+def test_generate_images_uses_cache_and_reports_failures(tmp_path: Path) -> None:
+    cache = ImageCache(tmp_path / "cache")
+    backend = CountingBackend(fail_on="broken")
+    items = [ImageRequest("castle", tmp_path / "a.png"), ImageRequest("broken", tmp_path / "b.png")]
+    first = generate_images(items, backend=backend, cache=cache)
+    assert [result.ok for result in first] == [True, False]
+    assert isinstance(first[1].error, ImageGenerationError)
+
+    again = generate_images([ImageRequest("castle", tmp_path / "c.jpg")], backend=backend, cache=cache)
+    assert again[0].cached and again[0].ok
+    assert backend.calls.count(("castle", "gemini-2.5-flash-image")) == 1
+    with Image.open(tmp_path / "c.jpg") as image:
+        assert image.format == "JPEG"
+
+
+def test_generating_over_a_linked_output_keeps_the_cache_intact(tmp_path: Path) -> None:
+    cache = ImageCache(tmp_path / "cache")
+    backend = CountingBackend()
+    output = tmp_path / "menu.png"
+    generate_gemini_image("castle", tmp_path / "first.png", backend=backend, cache=cache)
+    generate_gemini_image("castle", output, backend=backend, cache=cache)
+    blob = cache.store.path_for(ImageCache.key("castle", "gemini-2.5-flash-image", None))
+    cached = blob.read_bytes()
+
+    for items, options in [([ImageRequest("garden", output)], {}), ([ImageRequest("forest", output)], {"image_target": "bmp_320x240_4bpp"})]:
+        generate_images(items, backend=backend, cache=cache, **options)
+        assert output.read_bytes() != cached
+        assert blob.read_bytes() == cached
+        generate_gemini_image("castle", output, backend=backend, cache=cache)
+    assert backend.calls.count(("castle", "gemini-2.5-flash-image")) == 1
+
+
+def test_cache_key_includes_model_and_size() -> None:
+    keys = {ImageCache.key("castle", "m1", None), ImageCache.key("castle", "m2", None), ImageCache.key("castle", "m1", (320, 240))}
+    assert len(keys) == 3
+
+
+def test_generate_gemini_image_with_backend_and_cache(tmp_path: Path) -> None:
+    cache = ImageCache(tmp_path / "cache")
+    backend = CountingBackend()
+    first = generate_gemini_image("castle", tmp_path / "out" / "a.png", backend=backend, cache=cache)
+    second = generate_gemini_image("castle", tmp_path / "out" / "b.png", backend=backend, cache=cache)
+    assert first.read_bytes() == second.read_bytes()
+    assert len(backend.calls) == 1
+
+
+def test_generate_images_writes_device_bitmaps(tmp_path: Path) -> None:
+    cache = ImageCache(tmp_path / "cache")
+    backend = CountingBackend()
+    items = [ImageRequest("castle", tmp_path / "menu.bmp")]
+    first = generate_images(items, backend=backend, cache=cache, image_target="bmp_320x240_4bpp")
+    assert first[0].ok and not first[0].cached
+    with Image.open(tmp_path / "menu.bmp") as image:
+        assert (image.format, image.size, image.info["compression"]) == ("BMP", (320, 240), 2)
+    bitmap = (tmp_path / "menu.bmp").read_bytes()
+
+    again = generate_images(items, backend=backend, cache=cache, image_target="bmp_320x240_4bpp")
+    assert again[0].cached
+    assert (tmp_path / "menu.bmp").read_bytes() == bitmap
+    assert len(backend.calls) == 1
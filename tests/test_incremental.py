@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+
+from lunii_cyoa.expansion import ExpansionError, expand_story
+from lunii_cyoa.incremental import IncrementalExpander
+from lunii_cyoa.loader import load_story
+from lunii_cyoa.models import StateInt, StoryDocument
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+def _with_guard(doc: StoryDocument, node_id: str, choice_id: str, guard: str | None) -> StoryDocument:
+    edited = doc.model_copy(deep=True)
+    node = next(node for node in edited.nodes if node.id == node_id)
+    next(choice for choice in node.choices if choice.id == choice_id).guard = guard
+    return edited
+
+
+def test_incremental_first_run_equals_full_expansion() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    incremental = IncrementalExpander()
+    assert incremental.expand(doc) == expand_story(doc)
+    assert incremental.stats.reused == 0
+    assert incremental.stats.dirty_nodes == [node.id for node in doc.nodes]
+
+
+def test_incremental_reexpands_only_edited_nodes() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    incremental = IncrementalExpander()
+    incremental.expand(doc)
+    edited = _with_guard(doc, "gate_after_purchase", "denied_no_ticket", None)
+    assert incremental.expand(edited) == expand_story(edited)
+    assert incremental.stats.dirty_nodes == ["gate_after_purchase"]
+    assert incremental.stats.recomputed == 1
+    assert incremental.stats.reused > 0
+    # reverting is an edit too, and still matches
+    assert incremental.expand(doc) == expand_story(doc)
+
+
+def test_incremental_ignores_asset_only_edits() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    incremental = IncrementalExpander()
+    before = incremental.expand(doc)
+    edited = doc.model_copy(deep=True)
+    edited.nodes[0].bg = "img/other.png"
+    edited.nodes[0].choices[0].label_text = "Grab the key"
+    assert incremental.expand(edited) == expand_story(edited)
+    assert incremental.stats.dirty_nodes == []
+    assert incremental.stats.recomputed == 0
+    assert incremental.stats.spliced == len(before.physical_nodes)
+
+
+def test_incremental_resets_on_state_layout_change() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    incremental = IncrementalExpander()
+    incremental.expand(doc)
+    edited = doc.model_copy(deep=True)
+    edited.state["hp"] = StateInt(type="int", min=0, max=5, default=2)
+    assert incremental.expand(edited) == expand_story(edited)
+    assert incremental.stats.reused == 0
+
+
+def test_incremental_surfaces_errors_of_edited_nodes() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    incremental = IncrementalExpander()
+    incremental.expand(doc)
+    with pytest.raises(ExpansionError, match="Guard error"):
+        incremental.expand(_with_guard(doc, "gate_after_purchase", "denied_no_ticket", "missing == 1"))
+
+
+def test_incremental_splices_the_prefix_before_the_edit() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    incremental = IncrementalExpander()
+    before = incremental.expand(doc)
+    edited = _with_guard(doc, "gate_after_purchase", "denied_no_ticket", None)
+    after = incremental.expand(edited)
+    assert after == expand_story(edited)
+    first_dirty = next(node.physical_id for node in before.physical_nodes if node.logical_id == "gate_after_purchase")
+    assert incremental.stats.spliced >= first_dirty > 0
+    assert after.physical_nodes[0] is before.physical_nodes[0]
+
+
+def test_incremental_follows_liveness_changes() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    incremental = IncrementalExpander()
+    incremental.expand(doc)
+    # Without guards in "hall", key is dead everywhere and entrance's two choices merge.
+    edited = _with_guard(_with_guard(doc, "hall", "locked_door", None), "hall", "blocked", None)
+    assert incremental.expand(edited) == expand_story(edited)
+    assert incremental.expand(doc) == expand_story(doc)
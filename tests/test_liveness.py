@@ -0,0 +1,61 @@
+from pathlib import Path
+from typing import Set, Tuple
+
+from lunii_cyoa.expansion import GuardEvaluator, expand_story
+from lunii_cyoa.liveness import live_variables
+from lunii_cyoa.loader import load_story
+from lunii_cyoa.structures import ExpansionResult
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+def _assert_same_behavior(left: ExpansionResult, right: ExpansionResult) -> None:
+    """Walk both graphs in lockstep: every reachable pair must agree on node and choices."""
+    left_nodes = {node.physical_id: node for node in left.physical_nodes}
+    right_nodes = {node.physical_id: node for node in right.physical_nodes}
+    pending = [(0, 0)]
+    seen: Set[Tuple[int, int]] = set()
+    while pending:
+        pair = pending.pop()
+        if pair in seen:
+            continue
+        seen.add(pair)
+        left_node, right_node = left_nodes[pair[0]], right_nodes[pair[1]]
+        assert left_node.logical_id == right_node.logical_id
+        left_labels = [edge.label for edge in left.edges if edge.source == left_node.physical_id]
+        right_labels = [edge.label for edge in right.edges if edge.source == right_node.physical_id]
+        assert left_labels == right_labels
+        pending.extend(zip(left_node.outgoing, right_node.outgoing))
+
+
+def test_live_variables_stop_at_last_read() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    live = live_variables(doc, GuardEvaluator(doc.state).variables)
+    # "ignore_key" carries the initial value of key to the guards in "hall"
+    assert live == {"entrance": frozenset({"key"}), "hall": frozenset({"key"}), "treasure": frozenset(), "end": frozenset()}
+
+
+def test_live_variables_ignore_overwritten_values() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    live = live_variables(doc, GuardEvaluator(doc.state).variables)
+    # "buy_ticket" overwrites ticket; "sneak_in" reads hp through `-=`
+    assert live["gate"] == frozenset({"hp"})
+    assert live["gate_after_purchase"] == frozenset({"ticket"})
+    assert live["end"] == frozenset()
+
+
+def test_collapse_dead_state_merges_equivalent_nodes() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    full = expand_story(doc, collapse_dead_state=False)
+    collapsed = expand_story(doc)
+    assert len(collapsed.physical_nodes) < len(full.physical_nodes)
+    assert [node.logical_id for node in collapsed.physical_nodes].count("end") == 1
+    # dead variables are reset to their initial value
+    assert collapsed.physical_nodes[-1].state == {"ticket": "none", "hp": 2}
+    _assert_same_behavior(full, collapsed)
+
+
+def test_collapse_dead_state_keeps_behavior_on_every_fixture() -> None:
+    for path in sorted(FIXTURE_DIR.glob("story_*.toml")):
+        doc = load_story(path)
+        _assert_same_behavior(expand_story(doc, collapse_dead_state=False), expand_story(doc))
@@ -3,6 +3,7 @@ from pathlib import Path
 import pytest
 
 from lunii_cyoa.loader import load_story, StoryLoadError
+from lunii_cyoa.expansion import expand_story
 from lunii_cyoa.models import StoryDocument
 
 
@@ -62,3 +63,84 @@ target = "missing"
     with pytest.raises(StoryLoadError):
         load_story(bad_toml)
     bad_toml.unlink()
+
+
+@pytest.mark.parametrize("filename", ["story_minimal.toml", "story_with_choices.toml", "story_with_random.toml", "story_with_assets_and_guard.toml"])
+def test_tomllib_and_tomlkit_load_the_same_story(filename: str) -> None:
+    path = FIXTURE_DIR / filename
+    assert load_story(path) == load_story(path, parser="tomlkit")
+
+
+@pytest.mark.parametrize("parser", ["tomllib", "tomlkit"])
+def test_malformed_toml_raises_load_error(tmp_path: Path, parser: str) -> None:
+    path = tmp_path / "broken.toml"
+    path.write_text("[story\nid = ", encoding="utf-8")
+    with pytest.raises(StoryLoadError, match="Failed to parse TOML"):
+        load_story(path, parser=parser)  # type: ignore[arg-type]
+
+
+def test_validation_reports_every_reference_error() -> None:
+    data = {
+        "story": {"id": "bad", "start_node": "nowhere"},
+        "assets": {"base_dir": "assets", "audio_ext": "mp3", "image_ext": "png"},
+        "nodes": [
+            {"id": "a", "kind": "story", "bg": "a.png", "audio": "a.mp3", "target": "missing"},
+            {"id": "a", "kind": "story", "bg": "a.png", "audio": "a.mp3"},
+            {
+                "id": "b",
+                "kind": "menu",
+                "bg": "b.png",
+                "audio": "b.mp3",
+                "choices": [{"id": "x", "target": "a"}, {"id": "x", "target": "gone"}],
+            },
+        ],
+    }
+    with pytest.raises(ValueError) as excinfo:
+        StoryDocument.model_validate(data)
+    message = str(excinfo.value)
+    assert "Duplicate node ids found: a" in message
+    assert "Node 'a' references unknown target 'missing'" in message
+    assert "Node 'b' references unknown target 'gone'" in message
+    assert "Node 'b' has duplicate choice ids" in message
+    assert "start_node must reference an existing node" in message
+
+
+def test_document_exposes_node_map() -> None:
+    story = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    assert list(story.node_map) == [node.id for node in story.nodes]
+    assert story.node_map["hall"] is story.nodes[1]
+    assert story.model_copy(deep=True).node_map["hall"].id == "hall"
+
+
+def test_node_map_follows_replaced_nodes() -> None:
+    story = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    trimmed = story.model_copy(update={"nodes": story.nodes[:-1]})
+    assert "end" not in trimmed.node_map
+    assert "end" in story.node_map
+
+    copied = story.model_copy(deep=True)
+    assert copied.node_map["hall"] is copied.nodes[1]
+
+    extra = story.nodes[-1].model_copy(update={"id": "epilogue"})
+    story.nodes.append(extra)
+    assert story.node_map["epilogue"] is extra
+
+    renamed = story.nodes[0].model_copy(update={"id": "zzz"})
+    story.nodes[0] = renamed
+    assert list(story.node_map)[0] == "zzz" and "entrance" not in story.node_map
+    assert story.node_map["zzz"] is renamed
+
+
+def test_expansion_sees_nodes_replaced_in_place() -> None:
+    story = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    assert "entrance" in story.node_map  # an earlier read must not pin the old nodes
+    story.nodes[0] = story.nodes[0].model_copy(update={"choices": story.nodes[0].choices[1:]})
+    assert [node.logical_id for node in expand_story(story).physical_nodes] == ["entrance", "hall", "end"]
+
+
+def test_expansion_uses_nodes_of_model_copy() -> None:
+    story = load_story(FIXTURE_DIR / "story_with_choices.toml")
+    assert len(expand_story(story).physical_nodes) == 5
+    shortcut = story.nodes[0].model_copy(update={"choices": story.nodes[0].choices[1:]})
+    edited = story.model_copy(update={"nodes": [shortcut, *story.nodes[1:]]})
+    assert [node.logical_id for node in expand_story(edited).physical_nodes] == ["entrance", "hall", "end"]
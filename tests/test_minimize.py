@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from lunii_cyoa.expansion import expand_story
+from lunii_cyoa.loader import load_story
+from lunii_cyoa.minimize import minimize_expansion
+from lunii_cyoa.structures import Edge, ExpansionResult, PhysicalNode
+
+FIXTURE_DIR = Path(__file__).parent
+
+
+def _result(nodes: list) -> ExpansionResult:
+    physical_nodes = [PhysicalNode(physical_id=pid, logical_id=logical_id, kind="menu", state={"n": pid}, outgoing=list(targets)) for pid, (logical_id, targets) in enumerate(nodes)]
+    edges = [Edge(source=node.physical_id, target=target, label=f"c{index}") for node in physical_nodes for index, target in enumerate(node.outgoing)]
+    return ExpansionResult(physical_nodes=physical_nodes, edges=edges, unreachable_logical=[], dead_ends=[node.physical_id for node in physical_nodes if not node.outgoing])
+
+
+def test_minimize_merges_bisimilar_nodes() -> None:
+    # 1 and 2 are copies of "room" leading to copies of "end"; 5 loops back instead
+    result = _result([("start", [1, 2, 5]), ("room", [3]), ("room", [4]), ("end", []), ("end", []), ("room", [0])])
+    minimized = minimize_expansion(result)
+    assert [(node.logical_id, node.outgoing) for node in minimized.expansion.physical_nodes] == [
+        ("start", [1, 1, 3]),
+        ("room", [2]),
+        ("end", []),
+        ("room", [0]),
+    ]
+    assert minimized.merged_id == {0: 0, 1: 1, 2: 1, 3: 2, 4: 2, 5: 3}
+    assert minimized.expansion.dead_ends == [2]
+    assert minimized.reduction_ratio == 1 - 4 / 6
+
+
+def test_minimize_keeps_distinct_cycles_apart() -> None:
+    # both "a" nodes loop, but only one of them can reach "end"
+    result = _result([("start", [1, 2]), ("a", [1, 3]), ("a", [2, 2]), ("end", [])])
+    assert minimize_expansion(result).minimized_nodes == 4
+
+
+def test_minimize_matches_dead_state_collapse_on_fixture() -> None:
+    doc = load_story(FIXTURE_DIR / "story_with_assets_and_guard.toml")
+    minimized = minimize_expansion(expand_story(doc, collapse_dead_state=False))
+    assert minimized.original_nodes == 6
+    assert [node.logical_id for node in minimized.expansion.physical_nodes] == ["gate", "gate_after_purchase", "caught", "inside", "end"]
+    assert [(edge.source, edge.target, edge.label) for edge in minimized.expansion.edges] == [(edge.source, edge.target, edge.label) for edge in expand_story(doc).edges]
+    assert minimize_expansion(minimized.expansion).reduction_ratio == 0.0
@@ -0,0 +1,46 @@
+import pytest
+
+from lunii_cyoa.models import StateBool, StateEnum, StateInt
+from lunii_cyoa.state_layout import StateLayout, StateLayoutError
+
+
+def _layout() -> StateLayout:
+    return StateLayout(
+        {
+            "hp": StateInt(type="int", min=-1, max=3),
+            "key": StateBool(type="bool"),
+            "mood": StateEnum(type="enum", values=["calm", "alert", "frightened"]),
+        }
+    )
+
+
+def test_layout_round_trips_every_state() -> None:
+    layout = _layout()
+    assert layout.size == 5 * 2 * 3
+    decoded = [layout.decode(packed) for packed in range(layout.size)]
+    assert len({tuple(state.items()) for state in decoded}) == layout.size
+    for packed, state in enumerate(decoded):
+        assert layout.encode(state) == packed
+    assert layout.decode(0) == {"hp": -1, "key": False, "mood": "calm"}
+
+
+def test_layout_replace_updates_single_var() -> None:
+    layout = _layout()
+    packed = layout.encode({"hp": 2, "key": True, "mood": "alert"})
+    updated = layout.replace(packed, "mood", "frightened")
+    assert layout.decode(updated) == {"hp": 2, "key": True, "mood": "frightened"}
+    assert layout.value_of(updated, "hp") == 2
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        {"hp": 4, "key": False, "mood": "calm"},
+        {"hp": 0, "key": 1, "mood": "calm"},
+        {"hp": 0, "key": False, "mood": "angry"},
+        {"hp": 0, "key": False},
+    ],
+)
+def test_layout_rejects_unrepresentable_states(state: dict[str, object]) -> None:
+    with pytest.raises(StateLayoutError):
+        _layout().encode(state)
@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+
+from lunii_cyoa.studio_json import StudioJsonError, StudioJsonWriter, orjson
+from pkg.api.studio_builder import StudioStoryBuilder
+
+STAGE_A = "8E1F5E5C-6B59-5C47-9A5D-2B0B6C1E7A01"
+STAGE_B = "0D3C7A2E-1F4B-5E86-8C3A-9B7D6E5F4A02"
+STAGES = [
+    {"uuid": STAGE_A, "image": "img/é.png", "audio": None, "okTransition": {"actionNode": "X", "optionIndex": 0}},
+    {"uuid": STAGE_B, "image": None, "audio": "audio/b.mp3"},
+]
+ACTIONS = [{"id": "X", "options": [STAGE_A, STAGE_B]}, {"id": "Y", "options": [STAGE_B]}]
+
+
+def _reference(stages: list, actions: list) -> str:
+    builder = StudioStoryBuilder(title="Titré", description="", format_version=1, pack_version=1)
+    builder.stage_nodes = json.loads(json.dumps(stages))
+    builder.action_nodes = json.loads(json.dumps(actions))
+    return builder.to_studio_story().to_json()
+
+
+def _write(stages: list, actions: list, **options: object) -> bytes:
+    buffer = io.BytesIO()
+    StudioJsonWriter(buffer, **options).write("Titré", "", 1, 1, iter(stages), iter(actions))  # type: ignore[arg-type]
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("stages,actions", [(STAGES, ACTIONS), (STAGES, []), ([], [])])
+def test_writer_matches_studio_story_json(stages: list, actions: list) -> None:
+    assert _write(stages, actions).decode("utf-8") == _reference(stages, actions)
+
+
+def test_compact_writer_has_no_whitespace() -> None:
+    output = _write(STAGES, ACTIONS, indent=None)
+    assert output == json.dumps(json.loads(_reference(STAGES, ACTIONS)), separators=(",", ":")).encode("utf-8")
+
+
+def test_orjson_backend() -> None:
+    if orjson is None:
+        with pytest.raises(StudioJsonError):
+            StudioJsonWriter(io.BytesIO(), backend="orjson")
+        return
+    assert json.loads(_write(STAGES, ACTIONS, backend="orjson")) == json.loads(_reference(STAGES, ACTIONS))
+    assert json.loads(_write(STAGES, ACTIONS, backend="orjson", indent=None)) == json.loads(_reference(STAGES, ACTIONS))
@@ -1,7 +1,13 @@
+import threading
+import time
 from pathlib import Path
 from typing import Iterable
 
-from lunii_cyoa.tts import DEFAULT_OUTPUT_FORMAT, synthesize_to_file
+import pytest
+from elevenlabs.core.api_error import ApiError
+
+from lunii_cyoa import tts
+from lunii_cyoa.tts import DEFAULT_OUTPUT_FORMAT, SynthesisRequest, TokenBucket, TTSCache, synthesize_batch, synthesize_to_file
 
 
 class FakeTextToSpeech:
@@ -41,3 +47,166 @@ def test_synthesize_to_file_writes_output(tmp_path: Path) -> None:
     assert client.text_to_speech.calls == [
         {"text": "Hello!", "voice_id": "voice-123", "model_id": "eleven_multilingual_v2", "output_format": DEFAULT_OUTPUT_FORMAT},
     ]
+
+
+def test_synthesize_to_file_reuses_cached_audio(tmp_path: Path) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    client = FakeElevenLabsClient([b"hello ", b"world"])
+    first = synthesize_to_file("Hello!", "voice-123", "model", tmp_path / "a.mp3", client=client, cache=cache)
+    second = synthesize_to_file("Hello!", "voice-123", "model", tmp_path / "b.mp3", client=client, cache=cache)
+    assert first.read_bytes() == second.read_bytes() == b"hello world"
+    assert len(client.text_to_speech.calls) == 1
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    # any part of the key produces a different clip
+    synthesize_to_file("Hello!", "voice-456", "model", tmp_path / "c.mp3", client=client, cache=cache)
+    assert len(client.text_to_speech.calls) == 2
+
+
+def test_cache_hit_needs_no_client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    cache.save(TTSCache.key("Hi", "voice", "model", DEFAULT_OUTPUT_FORMAT), b"cached")
+
+    def no_client(api_key: str | None = None) -> None:
+        raise AssertionError("client must not be built on a cache hit")
+
+    monkeypatch.setattr(tts, "build_elevenlabs_client", no_client)
+    output = synthesize_to_file("Hi", "voice", "model", tmp_path / "out" / "hi.mp3", cache=cache)
+    assert output.read_bytes() == b"cached"
+
+
+def test_blob_evicted_before_link_counts_as_miss(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    key = TTSCache.key("Hi", "voice", "model", DEFAULT_OUTPUT_FORMAT)
+    cache.save(key, b"cached")
+    seen = []
+
+    def evicted(src: Path, dest: Path) -> None:
+        seen.append((cache.stats.hits, cache.stats.misses))
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(tts, "link_or_copy", evicted)
+    assert not cache.fetch(key, tmp_path / "hi.mp3")
+    assert seen == [(0, 0)]
+    assert (cache.stats.hits, cache.stats.misses) == (0, 1)
+
+
+def test_failed_synthesis_is_not_cached(tmp_path: Path) -> None:
+    def broken_stream() -> Iterable[bytes]:
+        yield b"partial"
+        raise ConnectionError("stream interrupted")
+
+    cache = TTSCache(tmp_path / "cache")
+    client = FakeElevenLabsClient([])
+    client.text_to_speech.chunks = broken_stream()  # type: ignore[assignment]
+    with pytest.raises(ConnectionError):
+        synthesize_to_file("Hi", "voice", "model", tmp_path / "hi.mp3", client=client, cache=cache)
+    assert cache.store.lookup(TTSCache.key("Hi", "voice", "model", DEFAULT_OUTPUT_FORMAT)) is None
+    assert not (tmp_path / "hi.mp3").exists()
+
+
+def test_uncached_write_leaves_linked_cache_blob_intact(tmp_path: Path) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    output = tmp_path / "hi.mp3"
+    synthesize_to_file("Hi", "voice", "model", output, client=FakeElevenLabsClient([b"cached"]), cache=cache)
+    blob = cache.store.path_for(TTSCache.key("Hi", "voice", "model", DEFAULT_OUTPUT_FORMAT))
+
+    synthesize_to_file("Bye", "voice", "model", output, client=FakeElevenLabsClient([b"fresh"]))
+    assert output.read_bytes() == b"fresh"
+    assert blob.read_bytes() == b"cached"
+    assert synthesize_to_file("Hi", "voice", "model", tmp_path / "again.mp3", cache=cache).read_bytes() == b"cached"
+
+
+class FlakyTextToSpeech:
+    """Fails the first `failures[text]` calls for a text, tracks concurrency."""
+
+    def __init__(self, failures: dict[str, Exception | int], delay: float = 0.01) -> None:
+        self.failures = dict(failures)
+        self.delay = delay
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def convert(self, *, text: str, voice_id: str, model_id: str, output_format: str) -> bytes:
+        with self._lock:
+            self.calls.append(text)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            remaining = self.failures.get(text, 0)
+            if isinstance(remaining, int) and remaining > 0:
+                self.failures[text] = remaining - 1
+        try:
+            time.sleep(self.delay)
+            if isinstance(remaining, Exception):
+                raise remaining
+            if remaining:
+                raise ApiError(status_code=429, headers={}, body="slow down")
+            return f"audio:{text}".encode()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class FlakyClient:
+    def __init__(self, api: FlakyTextToSpeech) -> None:
+        self._api = api
+
+    @property
+    def text_to_speech(self) -> FlakyTextToSpeech:
+        return self._api
+
+
+def _requests(tmp_path: Path, count: int) -> list[SynthesisRequest]:
+    return [SynthesisRequest(text=f"clip {index}", voice_id="voice", model_id="model", output_path=tmp_path / f"clip{index}.mp3") for index in range(count)]
+
+
+def test_synthesize_batch_caps_concurrency(tmp_path: Path) -> None:
+    api = FlakyTextToSpeech({})
+    results = synthesize_batch(_requests(tmp_path, 12), client=FlakyClient(api), max_concurrency=3)
+    assert [result.output_path.read_bytes() for result in results if result.output_path] == [f"audio:clip {index}".encode() for index in range(12)]
+    assert all(result.ok and result.attempts == 1 and result.seconds > 0 for result in results)
+    assert 1 < api.max_in_flight <= 3
+
+
+def test_synthesize_batch_retries_transient_errors(tmp_path: Path) -> None:
+    api = FlakyTextToSpeech({"clip 0": 2, "clip 1": ApiError(status_code=401, headers={}, body="bad key"), "clip 2": 9})
+    delays: list[float] = []
+    results = synthesize_batch(_requests(tmp_path, 3), client=FlakyClient(api), max_concurrency=1, backoff=0.5, max_attempts=3, sleep=delays.append)
+    assert results[0].ok and results[0].attempts == 3
+    assert not results[1].ok and results[1].attempts == 1 and results[1].output_path is None
+    assert not results[2].ok and results[2].attempts == 3
+    assert isinstance(results[2].error, ApiError) and results[2].error.status_code == 429
+    assert delays == [0.5, 1.0, 0.5, 1.0]
+
+
+def test_synthesize_batch_uses_cache_before_client(tmp_path: Path) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    api = FlakyTextToSpeech({})
+    requests = _requests(tmp_path / "first", 4)
+    synthesize_batch(requests, client=FlakyClient(api), cache=cache)
+    again = synthesize_batch(_requests(tmp_path / "second", 4), client=FlakyClient(api), cache=cache)
+    assert len(api.calls) == 4
+    assert all(result.cached and result.attempts == 0 for result in again)
+    assert (tmp_path / "second" / "clip3.mp3").read_bytes() == b"audio:clip 3"
+
+
+def test_synthesize_batch_counts_cache_stats_across_workers(tmp_path: Path) -> None:
+    cache = TTSCache(tmp_path / "cache")
+    api = FlakyTextToSpeech({}, delay=0.0)
+    synthesize_batch(_requests(tmp_path / "first", 64), client=FlakyClient(api), cache=cache, max_concurrency=8)
+    synthesize_batch(_requests(tmp_path / "second", 64), client=FlakyClient(api), cache=cache, max_concurrency=8)
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.writes) == (64, 64, 64)
+
+
+def test_token_bucket_limits_rate() -> None:
+    now = [0.0]
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: now[0], sleep=sleep)
+    waits = [bucket.acquire() for index_acquire in range(6)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.5, 0.5, 0.5, 0.5])
+    assert now[0] == pytest.approx(2.0)